@@ -6,7 +6,7 @@ from alembic import context
 
 from app.core.config import settings
 from app.models.base import Base
-from app.models import user, equipment, counter, session, doc_number, document, audit
+from app.models import user, equipment, counter, session, doc_number, document, audit, import_run, doc_name_usage
 
 config = context.config
 
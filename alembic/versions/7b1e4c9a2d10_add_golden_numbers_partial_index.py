@@ -0,0 +1,30 @@
+"""Add partial index on golden doc numbers
+
+Revision ID: 7b1e4c9a2d10
+Revises: 13c426e84b5f
+Create Date: 2026-10-18 10:12:41.318204
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '7b1e4c9a2d10'
+down_revision = '13c426e84b5f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Поиск свободных "золотых" номеров делает anti-join generate_series по этому индексу
+    op.create_index(
+        'ix_doc_numbers_golden_numeric',
+        'doc_numbers',
+        ['numeric'],
+        postgresql_where=sa.text('is_golden'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_doc_numbers_golden_numeric', table_name='doc_numbers')
@@ -0,0 +1,40 @@
+"""Add pg_trgm GIN indexes for substring (ILIKE '%q%') filters
+
+Revision ID: a6d1c84e29f0
+Revises: f3b9d27a6e41
+Create Date: 2026-10-18 19:12:40.218304
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'a6d1c84e29f0'
+down_revision = 'f3b9d27a6e41'
+branch_labels = None
+depends_on = None
+
+# Индексы строятся по col::text: ILIKE над CITEXT — оператор citext, gin_trgm_ops его не поддерживает,
+# поэтому запросы (app.utils.text_filters.contains) сравнивают col::text ILIKE '%q%'
+TRGM_INDEXES = (
+    ('ix_equipment_station_object_trgm', 'equipment', 'station_object'),
+    ('ix_equipment_station_no_trgm', 'equipment', 'station_no'),
+    ('ix_equipment_label_trgm', 'equipment', 'label'),
+    ('ix_equipment_factory_no_trgm', 'equipment', 'factory_no'),
+    ('ix_equipment_order_no_trgm', 'equipment', 'order_no'),
+    ('ix_documents_doc_name_trgm', 'documents', 'doc_name'),
+    ('ix_users_username_trgm', 'users', 'username'),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(name, table, [sa.text(f"({column}::text) gin_trgm_ops")], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(TRGM_INDEXES):
+        op.drop_index(name, table_name=table)
+    # расширение не удаляем: им могут пользоваться объекты вне этой миграции
@@ -0,0 +1,51 @@
+"""Add generated tsvector columns and GIN indexes for full-text search
+
+Revision ID: b84e0f6c1d37
+Revises: a6d1c84e29f0
+Create Date: 2026-10-18 20:41:05.730912
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'b84e0f6c1d37'
+down_revision = 'a6d1c84e29f0'
+branch_labels = None
+depends_on = None
+
+# Генерируемая колонка не может ссылаться на другую таблицу, поэтому вектор у документа и у оборудования свой,
+# а /search объединяет совпадения через ix_documents_equipment_id
+DOCUMENTS_VECTOR = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(doc_name::text, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(note::text, '')), 'B')"
+)
+EQUIPMENT_VECTOR = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(label::text, '') || ' ' || "
+    "coalesce(factory_no::text, '') || ' ' || coalesce(order_no::text, '') || ' ' || "
+    "coalesce(station_no::text, '')), 'B') || "
+    "setweight(to_tsvector('russian'::regconfig, eq_type || ' ' || coalesce(station_object::text, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        'documents',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(DOCUMENTS_VECTOR, persisted=True)),
+    )
+    op.add_column(
+        'equipment',
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(EQUIPMENT_VECTOR, persisted=True)),
+    )
+    op.create_index('ix_documents_search_vector', 'documents', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_equipment_search_vector', 'equipment', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_documents_equipment_id', 'documents', ['equipment_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_equipment_id', table_name='documents')
+    op.drop_index('ix_equipment_search_vector', table_name='equipment')
+    op.drop_index('ix_documents_search_vector', table_name='documents')
+    op.drop_column('equipment', 'search_vector')
+    op.drop_column('documents', 'search_vector')
@@ -0,0 +1,74 @@
+"""Add doc name usage statistics for ranked suggestions
+
+Revision ID: c1f7a05e93b2
+Revises: b84e0f6c1d37
+Create Date: 2026-10-18 22:15:33.604817
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'c1f7a05e93b2'
+down_revision = 'b84e0f6c1d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "doc_name_usage",
+        sa.Column("station_object", postgresql.CITEXT(), nullable=False),
+        sa.Column("eq_type", sa.String(200), nullable=False),
+        sa.Column("doc_name", postgresql.CITEXT(), nullable=False),
+        sa.Column("uses", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("station_object", "eq_type", "doc_name"),
+    )
+    op.create_index(
+        "ix_doc_name_usage_context_uses",
+        "doc_name_usage",
+        ["station_object", "eq_type", sa.text("uses DESC")],
+        postgresql_include=["doc_name"],
+    )
+
+    op.create_table(
+        "user_doc_name_usage",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("doc_name", postgresql.CITEXT(), nullable=False),
+        sa.Column("uses", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("user_id", "doc_name"),
+    )
+    op.create_index(
+        "ix_user_doc_name_usage_recent",
+        "user_doc_name_usage",
+        ["user_id", sa.text("last_used_at DESC")],
+        postgresql_include=["doc_name", "uses"],
+    )
+
+    # Статистика по уже зарегистрированным документам
+    op.execute(
+        """
+        INSERT INTO doc_name_usage (station_object, eq_type, doc_name, uses, last_used_at)
+        SELECT coalesce(e.station_object, ''), e.eq_type, d.doc_name, count(*), max(d.reg_date)
+        FROM documents d JOIN equipment e ON e.id = d.equipment_id
+        GROUP BY coalesce(e.station_object, ''), e.eq_type, d.doc_name;
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO user_doc_name_usage (user_id, doc_name, uses, last_used_at)
+        SELECT d.user_id, d.doc_name, count(*), max(d.reg_date)
+        FROM documents d
+        GROUP BY d.user_id, d.doc_name;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_doc_name_usage_recent", table_name="user_doc_name_usage")
+    op.drop_table("user_doc_name_usage")
+    op.drop_index("ix_doc_name_usage_context_uses", table_name="doc_name_usage")
+    op.drop_table("doc_name_usage")
@@ -0,0 +1,46 @@
+"""Add partial indexes for doc_numbers reservation and TTL hot paths
+
+Revision ID: c52d8f03e6a7
+Revises: 7b1e4c9a2d10
+Create Date: 2026-10-18 11:03:27.904512
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'c52d8f03e6a7'
+down_revision = '7b1e4c9a2d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # release_expired: status='reserved' AND expires_at < now
+    op.create_index(
+        'ix_doc_numbers_reserved_expires_at',
+        'doc_numbers',
+        ['expires_at'],
+        postgresql_where=sa.text("status = 'reserved'"),
+    )
+    # get_reserved_for_session / release_session: session_id = ? AND status='reserved' ORDER BY numeric
+    op.create_index(
+        'ix_doc_numbers_reserved_session',
+        'doc_numbers',
+        ['session_id', 'numeric'],
+        postgresql_where=sa.text("status = 'reserved'"),
+    )
+    # fetch_released_for_update: status='released' AND numeric >= ? ORDER BY numeric
+    op.create_index(
+        'ix_doc_numbers_released_numeric',
+        'doc_numbers',
+        ['numeric'],
+        postgresql_where=sa.text("status = 'released'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_doc_numbers_released_numeric', table_name='doc_numbers')
+    op.drop_index('ix_doc_numbers_reserved_session', table_name='doc_numbers')
+    op.drop_index('ix_doc_numbers_reserved_expires_at', table_name='doc_numbers')
@@ -0,0 +1,28 @@
+"""Add index for report ordering and keyset pagination
+
+Revision ID: e8a41b7d5c23
+Revises: c52d8f03e6a7
+Create Date: 2026-10-18 14:26:09.551730
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'e8a41b7d5c23'
+down_revision = 'c52d8f03e6a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_documents_reg_date_numeric',
+        'documents',
+        [sa.text('reg_date DESC'), sa.text('numeric DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_reg_date_numeric', table_name='documents')
@@ -0,0 +1,58 @@
+"""Add import runs and per-chunk checkpoints
+
+Revision ID: f3b9d27a6e41
+Revises: e8a41b7d5c23
+Create Date: 2026-10-18 16:02:47.318204
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = 'f3b9d27a6e41'
+down_revision = 'e8a41b7d5c23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    import_run_status = postgresql.ENUM("running", "completed", "failed", name="import_run_status")
+    import_run_status.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "import_runs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("file_hash", sa.String(64), nullable=False, unique=True),
+        sa.Column(
+            "status",
+            postgresql.ENUM("running", "completed", "failed", name="import_run_status", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("total_rows", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("processed_rows", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("imported", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("max_numeric", sa.Integer(), nullable=False, server_default=sa.text("0")),
+        sa.Column("errors", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column("started_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    op.create_table(
+        "import_run_chunks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("import_runs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chunk_no", sa.Integer(), nullable=False),
+        sa.Column("row_offset", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.Integer(), nullable=False),
+        sa.Column("imported", sa.Integer(), nullable=False),
+        sa.Column("committed_at", sa.DateTime(timezone=True), server_default=sa.text("now()")),
+        sa.UniqueConstraint("run_id", "chunk_no", name="uq_import_run_chunks_run_chunk"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("import_run_chunks")
+    op.drop_table("import_runs")
+    op.execute("DROP TYPE IF EXISTS import_run_status;")
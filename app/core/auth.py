@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -9,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
 from app.core.db import lifespan_session
 from app.services.users import UsersService
+from app.utils.cache import TTLCache
 
 # Указываем URL логина (для Swagger UI)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="http://localhost:8001/auth/login")
@@ -20,12 +23,22 @@ class CurrentUser(BaseModel):
     is_admin: bool
 
 
+# Список администраторов приводится к нижнему регистру один раз при старте
+_admin_usernames = frozenset(u.lower() for u in settings.admin_users)
+
+# (sub, exp) -> CurrentUser; запись живет не дольше самого токена
+_user_cache: TTLCache[CurrentUser] = TTLCache(
+    maxsize=settings.auth_cache_size, ttl_seconds=settings.auth_cache_ttl_seconds
+)
+
+
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
         session: AsyncSession = Depends(lifespan_session),
 ) -> CurrentUser:
     """
     Проверяет JWT токен, извлекает username и находит пользователя в БД.
+    Результат кешируется по (sub, exp), поэтому повторные запросы с тем же токеном не обращаются к БД.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,12 +54,20 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    exp = payload.get("exp")
+    cache_key = (username, exp)
+    cached = _user_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     svc = UsersService(session)
     user = await svc.get_or_create_by_username(username)
 
-    is_admin = user.username.lower() in [u.lower() for u in settings.admin_users]
+    is_admin = user.username.lower() in _admin_usernames
 
-    return CurrentUser(id=user.id, username=user.username, is_admin=is_admin)
+    current = CurrentUser(id=user.id, username=user.username, is_admin=is_admin)
+    _user_cache.set(cache_key, current, ttl_seconds=exp - time.time() if exp else None)
+    return current
 
 
 async def get_current_admin_user(
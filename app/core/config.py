@@ -1,16 +1,49 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import List
+from typing import List, Literal
 
 
 class Settings(BaseSettings):
     app_env: str = Field(default="dev", alias="APP_ENV")
     database_url: str = Field(alias="DATABASE_URL")
     default_ttl_seconds: int = Field(default=1800, alias="DEFAULT_TTL_SECONDS")
+    # Просроченные резервы не чистятся при каждом резервировании, а подбираются как свободные;
+    # массовая очистка остается фоновой задаче
+    reservation_lazy_expiry: bool = Field(default=False, alias="RESERVATION_LAZY_EXPIRY")
+    # Выделение новых номеров: "lock" — SELECT ... FOR UPDATE строки doc_counter до коммита,
+    # "claim" — атомарный захват блока UPDATE ... RETURNING в отдельной короткой транзакции,
+    # "block" — каждый воркер держит в памяти заранее захваченный блок и дозаполняет его в фоне
+    number_allocator: Literal["lock", "claim", "block"] = Field(default="lock", alias="NUMBER_ALLOCATOR")
+    number_block_size: int = Field(default=200, alias="NUMBER_BLOCK_SIZE")
+    number_block_low_water: int = Field(default=50, alias="NUMBER_BLOCK_LOW_WATER")
 
     # Ключ для валидации JWT (совпадает с auth-service)
     SECRET_KEY: str = Field(..., alias="SECRET_KEY")
     ALGORITHM: str = "HS256"
+    # Кеш аутентифицированных пользователей (в памяти воркера), чтобы не ходить в БД на каждый запрос
+    auth_cache_ttl_seconds: int = Field(default=300, alias="AUTH_CACHE_TTL_SECONDS")
+    auth_cache_size: int = Field(default=1024, alias="AUTH_CACHE_SIZE")
+
+    # Кеш готовых выгрузок отчетов в var/exports/cache
+    export_cache_enabled: bool = Field(default=True, alias="EXPORT_CACHE_ENABLED")
+    export_cache_max_bytes: int = Field(default=1024 * 1024 * 1024, alias="EXPORT_CACHE_MAX_BYTES")
+    export_cache_max_age_seconds: int = Field(default=24 * 3600, alias="EXPORT_CACHE_MAX_AGE_SECONDS")
+
+    # Фоновые выгрузки: число одновременно собираемых файлов и время хранения завершенных задач
+    export_job_workers: int = Field(default=2, alias="EXPORT_JOB_WORKERS")
+    export_job_ttl_seconds: int = Field(default=3600, alias="EXPORT_JOB_TTL_SECONDS")
+
+    # Пулы для блокирующей работы (сборка и разбор Excel): процессы, потоки и сколько задач может ждать в очереди
+    executor_process_workers: int = Field(default=2, alias="EXECUTOR_PROCESS_WORKERS")
+    executor_thread_workers: int = Field(default=4, alias="EXECUTOR_THREAD_WORKERS")
+    executor_max_queue: int = Field(default=16, alias="EXECUTOR_MAX_QUEUE")
+
+    # Импорт журнала из Excel: строк на один пакетный INSERT и коммит
+    import_chunk_size: int = Field(default=1000, alias="IMPORT_CHUNK_SIZE")
+    import_max_upload_bytes: int = Field(default=50 * 1024 * 1024, alias="IMPORT_MAX_UPLOAD_BYTES")
+
+    # Автодополнение /suggest из индекса в памяти воркера (загружается при старте); False — запросы к БД
+    suggest_index_enabled: bool = Field(default=True, alias="SUGGEST_INDEX_ENABLED")
 
     # Список администраторов системы
     admin_users: List[str] = ["vgrubtsov", "yuaalekseeva", "lrshlyogin", "pyagavrilov", "mabaturin"]
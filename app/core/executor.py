@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Literal, TypeVar
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class ExecutorMetrics:
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    running: int = 0
+    # ждут свободного места: число задач в пуле уже равно max_workers + max_queue
+    waiting: int = 0
+    wait_seconds_total: float = 0.0
+    busy_seconds_total: float = 0.0
+
+
+class BlockingExecutor:
+    """
+    Ограниченный пул для блокирующей работы (openpyxl, pyarrow, разбор Excel) вне цикла событий.
+    В пуле одновременно не больше max_workers + max_queue задач, остальные вызовы ждут в run(),
+    поэтому тяжелые выгрузки и импорт не вытесняют короткие запросы вроде /sessions/reserve.
+
+    kind="process" — функции и аргументы должны быть picklable (функции уровня модуля);
+    kind="thread" — для работы с объектами, которые нельзя передать в другой процесс (открытая книга, файл).
+    """
+
+    def __init__(self, name: str, kind: Literal["thread", "process"], max_workers: int, max_queue: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.metrics = ExecutorMetrics()
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        """Задачи, которые еще не начали выполняться: в очереди пула и ожидающие места в ней."""
+        return max(self.metrics.running - self.max_workers, 0) + self.metrics.waiting
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+        m = self.metrics
+        m.waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            m.waiting -= 1
+        m.wait_seconds_total += time.perf_counter() - started
+
+        m.submitted += 1
+        m.running += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), partial(fn, *args, **kwargs)
+            )
+        except BaseException:
+            m.failed += 1
+            raise
+        else:
+            m.completed += 1
+            return result
+        finally:
+            m.running -= 1
+            m.busy_seconds_total += time.perf_counter() - started
+            self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self.queue_depth,
+            **self.metrics.__dict__,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("Executor %s shut down", self.name)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: дочерние процессы не наследуют потоки и цикл событий uvicorn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+
+# Сборка книг целиком и разбор загруженных файлов
+cpu_executor = BlockingExecutor(
+    "cpu", "process", max_workers=settings.executor_process_workers, max_queue=settings.executor_max_queue
+)
+# Потоковая запись пачек в открытые файлы выгрузок
+io_executor = BlockingExecutor(
+    "io", "thread", max_workers=settings.executor_thread_workers, max_queue=settings.executor_max_queue
+)
+
+
+def executors_snapshot() -> list[dict]:
+    return [cpu_executor.snapshot(), io_executor.snapshot()]
+
+
+def shutdown_executors() -> None:
+    cpu_executor.shutdown()
+    io_executor.shutdown()
@@ -6,8 +6,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core import db
+from app.core.executor import shutdown_executors
 from app.tasks.cleanup import start_scheduler, stop_scheduler
-from app.routers import equipment, documents, sessions, reports, suggest, admin, importer, users
+from app.services.number_blocks import number_blocks
+from app.services.export_jobs import export_jobs
+from app.services.suggest_index import suggest_index
+from app.routers import equipment, documents, sessions, reports, suggest, admin, importer, users, search
 from app.middleware.log_requests import LogRequestsMiddleware
 
 # Основной логгер
@@ -28,7 +32,13 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     start_scheduler(db.SessionLocal)
     logger.info("Scheduler started.")
+    export_jobs.start(db.SessionLocal)
+    suggest_index.start(db.SessionLocal)
     yield
+    await suggest_index.stop()
+    await export_jobs.stop()
+    await number_blocks.release_unused()
+    shutdown_executors()
     stop_scheduler()
     logger.info("Scheduler stopped.")
 
@@ -57,6 +67,7 @@ api_router.include_router(documents.router, prefix="/documents", tags=["document
 api_router.include_router(sessions.router, prefix="/sessions", tags=["sessions"])
 api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
 api_router.include_router(suggest.router, prefix="/suggest", tags=["suggest"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
 api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
 api_router.include_router(importer.router, prefix="/import", tags=["import"])
 
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, DateTime, Integer, String, Index, func
+from sqlalchemy.dialects.postgresql import CITEXT
+
+from app.models.base import Base
+
+
+class DocNameUsage(Base):
+    """
+    Частота наименований документов по станции/объекту и типу оборудования — для ранжирования подсказок.
+    Пополняется инкрементально при назначении номера и импорте; станция без значения хранится как ''.
+    """
+    __tablename__ = "doc_name_usage"
+
+    station_object: Mapped[str] = mapped_column(CITEXT, primary_key=True)
+    eq_type: Mapped[str] = mapped_column(String(200), primary_key=True)
+    doc_name: Mapped[str] = mapped_column(CITEXT, primary_key=True)
+    uses: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_used_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserDocNameUsage(Base):
+    """Какие наименования пользователь регистрировал и когда последний раз — для подъема его недавних в подсказках."""
+    __tablename__ = "user_doc_name_usage"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    doc_name: Mapped[str] = mapped_column(CITEXT, primary_key=True)
+    uses: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_used_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
+# Покрывающие индексы: подсказки читаются index-only scan в порядке частоты/давности
+Index(
+    "ix_doc_name_usage_context_uses",
+    DocNameUsage.station_object, DocNameUsage.eq_type, DocNameUsage.uses.desc(),
+    postgresql_include=["doc_name"],
+)
+Index(
+    "ix_user_doc_name_usage_recent",
+    UserDocNameUsage.user_id, UserDocNameUsage.last_used_at.desc(),
+    postgresql_include=["doc_name", "uses"],
+)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import BigInteger, ForeignKey, DateTime, func, Enum, Boolean
+from sqlalchemy import BigInteger, ForeignKey, DateTime, func, Enum, Boolean, Index, text
 import enum
 
 from app.models.base import Base
@@ -15,6 +15,12 @@ class DocNumStatus(str, enum.Enum):
 
 class DocNumber(Base):
     __tablename__ = "doc_numbers"
+    __table_args__ = (
+        Index("ix_doc_numbers_golden_numeric", "numeric", postgresql_where=text("is_golden")),
+        Index("ix_doc_numbers_reserved_expires_at", "expires_at", postgresql_where=text("status = 'reserved'")),
+        Index("ix_doc_numbers_reserved_session", "session_id", "numeric", postgresql_where=text("status = 'reserved'")),
+        Index("ix_doc_numbers_released_numeric", "numeric", postgresql_where=text("status = 'released'")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     numeric: Mapped[int] = mapped_column(BigInteger, nullable=False, unique=True)
@@ -3,8 +3,8 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, DateTime, func, Index
-from sqlalchemy.dialects.postgresql import CITEXT
+from sqlalchemy import Computed, ForeignKey, DateTime, Text, cast, func, Index
+from sqlalchemy.dialects.postgresql import CITEXT, TSVECTOR
 
 from app.models.base import Base
 
@@ -22,6 +22,16 @@ class Document(Base):
     note: Mapped[str | None] = mapped_column(CITEXT, nullable=True)
     equipment_id: Mapped[int] = mapped_column(ForeignKey("equipment.id", ondelete="RESTRICT"), nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="RESTRICT"), nullable=False)
+    # Полнотекстовый поиск (/search): вычисляется в БД, в ORM-запросах не загружается
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian'::regconfig, coalesce(doc_name::text, '')), 'A') || "
+            "setweight(to_tsvector('russian'::regconfig, coalesce(note::text, '')), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
     equipment: Mapped["Equipment"] = relationship("Equipment", back_populates="documents", lazy="joined")
 
 
@@ -32,3 +42,19 @@ Index(
     func.coalesce(Document.note, ''),
     unique=True
 )
+
+# Порядок отчетов и keyset-пагинация: ORDER BY reg_date DESC, numeric DESC
+Index('ix_documents_reg_date_numeric', Document.reg_date.desc(), Document.numeric.desc())
+
+# Документы по оборудованию: JOIN в /search и отчетах
+Index('ix_documents_equipment_id', Document.equipment_id)
+
+Index('ix_documents_search_vector', Document.search_vector, postgresql_using='gin')
+
+# Поиск подстроки по наименованию (app.utils.text_filters.contains): doc_name::text ILIKE '%q%'
+Index(
+    'ix_documents_doc_name_trgm',
+    cast(Document.doc_name, Text).label('doc_name_text'),
+    postgresql_using='gin',
+    postgresql_ops={'doc_name_text': 'gin_trgm_ops'},
+)
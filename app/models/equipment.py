@@ -3,8 +3,8 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, UniqueConstraint
-from sqlalchemy.dialects.postgresql import CITEXT
+from sqlalchemy import Computed, Index, String, Text, UniqueConstraint, cast
+from sqlalchemy.dialects.postgresql import CITEXT, TSVECTOR
 from app.models.base import Base, TimestampMixin
 
 if TYPE_CHECKING:
@@ -25,6 +25,30 @@ class Equipment(Base, TimestampMixin):
     station_no: Mapped[str | None] = mapped_column(CITEXT)
     station_object: Mapped[str | None] = mapped_column(CITEXT)
     notes: Mapped[str | None] = mapped_column(String(500))
+    # Полнотекстовый поиск (/search) по текстовым полям оборудования
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('russian'::regconfig, coalesce(label::text, '') || ' ' || "
+            "coalesce(factory_no::text, '') || ' ' || coalesce(order_no::text, '') || ' ' || "
+            "coalesce(station_no::text, '')), 'B') || "
+            "setweight(to_tsvector('russian'::regconfig, eq_type || ' ' || coalesce(station_object::text, '')), 'C')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     # Используем строковую ссылку на модель вместо прямого импорта
     documents: Mapped[list["Document"]] = relationship("Document", back_populates="equipment")
+
+
+Index("ix_equipment_search_vector", Equipment.search_vector, postgresql_using="gin")
+
+# Поиск подстроки (app.utils.text_filters.contains): col::text ILIKE '%q%' — фильтры отчетов и глобальный поиск q
+for _field in ("station_object", "station_no", "label", "factory_no", "order_no"):
+    Index(
+        f"ix_equipment_{_field}_trgm",
+        cast(getattr(Equipment, _field), Text).label(f"{_field}_text"),
+        postgresql_using="gin",
+        postgresql_ops={f"{_field}_text": "gin_trgm_ops"},
+    )
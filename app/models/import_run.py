@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, DateTime, func, Integer, Enum, String, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+import enum
+
+from app.models.base import Base
+
+
+class ImportRunStatus(str, enum.Enum):
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class ImportRun(Base):
+    """Запуск импорта файла: по хешу файла повторный запуск продолжает с последнего закоммиченного чанка."""
+    __tablename__ = "import_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    file_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    status: Mapped[ImportRunStatus] = mapped_column(
+        Enum(ImportRunStatus, name="import_run_status"), nullable=False, default=ImportRunStatus.running
+    )
+    total_rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # сколько разобранных строк файла уже закоммичено — с этого смещения продолжается повторный запуск
+    processed_rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    imported: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_numeric: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    errors: Mapped[list] = mapped_column(JSONB, nullable=False, default=list)
+    started_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now(),
+                                                   onupdate=func.now())
+    finished_at: Mapped["DateTime | None"] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class ImportRunChunk(Base):
+    """Закоммиченный чанк импорта; пишется в той же транзакции, что и данные чанка."""
+    __tablename__ = "import_run_chunks"
+    __table_args__ = (
+        UniqueConstraint("run_id", "chunk_no", name="uq_import_run_chunks_run_chunk"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("import_runs.id", ondelete="CASCADE"), nullable=False)
+    chunk_no: Mapped[int] = mapped_column(Integer, nullable=False)
+    row_offset: Mapped[int] = mapped_column(Integer, nullable=False)
+    row_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    imported: Mapped[int] = mapped_column(Integer, nullable=False)
+    committed_at: Mapped["DateTime"] = mapped_column(DateTime(timezone=True), server_default=func.now())
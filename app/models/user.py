@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from sqlalchemy import Index, Text, cast
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import CITEXT
 
@@ -15,3 +16,12 @@ class User(Base, TimestampMixin):
     first_name: Mapped[str | None] = mapped_column(nullable=True)
     middle_name: Mapped[str | None] = mapped_column(nullable=True)
     department: Mapped[str | None] = mapped_column(nullable=True)
+
+
+# Фильтр отчетов по имени пользователя: username::text ILIKE '%q%'
+Index(
+    'ix_users_username_trgm',
+    cast(User.username, Text).label('username_text'),
+    postgresql_using='gin',
+    postgresql_ops={'username_text': 'gin_trgm_ops'},
+)
@@ -1,15 +1,50 @@
 from __future__ import annotations
 
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 
 from app.models.counter import DocCounter
+from app.utils.numbering import is_golden
+
+# Атомарно сдвигает next_normal_start на блок из :n номеров и возвращает границы блока [start, end).
+# Для обычных пользователей "золотые" номера в блок не входят: через N(x) = x - ceil(x / 100)
+# (количество не-"золотых" чисел в [0, x)) находится наименьший end, для которого N(end) = N(start) + n.
+_CLAIM_BLOCK_SQL = text(
+    """
+    WITH cur AS (
+        SELECT GREATEST(next_normal_start, base_start) AS start
+        FROM doc_counter
+        WHERE id = 1
+        FOR UPDATE
+    ),
+    tgt AS (
+        SELECT start, start - (start + 99) / 100 + :n AS t FROM cur
+    )
+    UPDATE doc_counter
+    SET next_normal_start = CASE
+            WHEN NOT :skip_golden THEN tgt.start + :n
+            WHEN tgt.t % 99 = 0 THEN tgt.t / 99 * 100
+            ELSE tgt.t / 99 * 100 + tgt.t % 99 + 1
+        END,
+        updated_at = now()
+    FROM tgt
+    WHERE doc_counter.id = 1
+    RETURNING tgt.start, doc_counter.next_normal_start
+    """
+)
 
 
 class CounterRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def get(self) -> DocCounter:
+        """Читает счетчик без блокировки строки."""
+        res = await self.session.execute(
+            select(DocCounter).where(DocCounter.id == 1).execution_options(populate_existing=True)
+        )
+        return res.scalars().first() or DocCounter(id=1, base_start=1, next_normal_start=1)
+
     async def get_for_update(self) -> DocCounter:
         res = await self.session.execute(
             select(DocCounter).where(DocCounter.id == 1).with_for_update()
@@ -21,7 +56,31 @@ class CounterRepository:
             await self.session.flush()
         return counter
 
+    async def claim_block(self, count: int, skip_golden: bool = True) -> list[int]:
+        """
+        Выделяет count новых номеров одним UPDATE ... RETURNING в отдельной короткой транзакции,
+        поэтому блокировка строки doc_counter не удерживается до коммита запроса.
+        Если транзакция запроса откатится, выделенный блок останется пропуском в нумерации.
+        """
+        return await claim_counter_block(self.session.bind, count, skip_golden=skip_golden)
+
     async def set_after_import(self, base_start: int) -> None:
         await self.session.execute(
             update(DocCounter).where(DocCounter.id == 1).values(base_start=base_start, next_normal_start=base_start)
         )
+
+
+async def claim_counter_block(bind: AsyncEngine, count: int, skip_golden: bool = True) -> list[int]:
+    """Захватывает блок номеров на собственном соединении и сразу коммитит сдвиг счетчика."""
+    async with bind.begin() as conn:
+        row = (await conn.execute(_CLAIM_BLOCK_SQL, {"n": count, "skip_golden": skip_golden})).first()
+        if row is None:
+            await conn.execute(
+                text(
+                    "INSERT INTO doc_counter (id, base_start, next_normal_start) "
+                    "VALUES (1, 1, 1) ON CONFLICT (id) DO NOTHING"
+                )
+            )
+            row = (await conn.execute(_CLAIM_BLOCK_SQL, {"n": count, "skip_golden": skip_golden})).first()
+    start, end = row
+    return [n for n in range(start, end) if not (skip_golden and is_golden(n))]
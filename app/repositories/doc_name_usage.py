@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.doc_name_usage import DocNameUsage, UserDocNameUsage
+from app.utils.text_filters import contains
+
+
+def _aggregate(rows: list[tuple], key) -> list[tuple]:
+    """
+    Сворачивает повторы ключа (ON CONFLICT DO UPDATE не может дважды обновить строку в одном INSERT)
+    и сортирует по ключу, чтобы параллельные транзакции блокировали строки в одном порядке.
+    rows: (*ключ, used_at); возвращает (*ключ, число, последний used_at).
+    """
+    merged: dict[tuple, list] = {}
+    for *fields, used_at in rows:
+        item = merged.setdefault(key(fields), [fields, 0, used_at])
+        item[1] += 1
+        if used_at is not None and (item[2] is None or used_at > item[2]):
+            item[2] = used_at
+    return [(*fields, count, used_at) for _, (fields, count, used_at) in sorted(merged.items())]
+
+
+class DocNameUsageRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_context_uses(self, rows: list[tuple[str | None, str, str, datetime | None]]) -> None:
+        """rows: (station_object, eq_type, doc_name, used_at); used_at=None — момент транзакции."""
+        merged = _aggregate(
+            [((station_object or ""), eq_type, doc_name, used_at) for station_object, eq_type, doc_name, used_at in rows],
+            key=lambda f: (f[0].casefold(), f[1], f[2].casefold()),
+        )
+        if not merged:
+            return
+        stmt = pg_insert(DocNameUsage).values([
+            {"station_object": so, "eq_type": et, "doc_name": name, "uses": count, "last_used_at": used_at or func.now()}
+            for so, et, name, count, used_at in merged
+        ])
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[DocNameUsage.station_object, DocNameUsage.eq_type, DocNameUsage.doc_name],
+            set_={
+                "uses": DocNameUsage.uses + stmt.excluded.uses,
+                "last_used_at": func.greatest(DocNameUsage.last_used_at, stmt.excluded.last_used_at),
+            },
+        ))
+
+    async def add_user_uses(self, rows: list[tuple[int, str, datetime | None]]) -> None:
+        """rows: (user_id, doc_name, used_at)."""
+        merged = _aggregate(rows, key=lambda f: (f[0], f[1].casefold()))
+        if not merged:
+            return
+        stmt = pg_insert(UserDocNameUsage).values([
+            {"user_id": user_id, "doc_name": name, "uses": count, "last_used_at": used_at or func.now()}
+            for user_id, name, count, used_at in merged
+        ])
+        await self.session.execute(stmt.on_conflict_do_update(
+            index_elements=[UserDocNameUsage.user_id, UserDocNameUsage.doc_name],
+            set_={
+                "uses": UserDocNameUsage.uses + stmt.excluded.uses,
+                "last_used_at": func.greatest(UserDocNameUsage.last_used_at, stmt.excluded.last_used_at),
+            },
+        ))
+
+    async def top_for_context(self, station_object: str | None, eq_type: str, q: str | None,
+                              limit: int) -> list[tuple[str, int]]:
+        """Самые частые наименования для станции и типа оборудования (index-only scan по ix_doc_name_usage_context_uses)."""
+        stmt = select(DocNameUsage.doc_name, DocNameUsage.uses).where(
+            DocNameUsage.station_object == (station_object or ""),
+            DocNameUsage.eq_type == eq_type,
+        )
+        if q:
+            stmt = stmt.where(contains(DocNameUsage.doc_name, q))
+        res = await self.session.execute(stmt.order_by(DocNameUsage.uses.desc()).limit(limit))
+        return [tuple(r) for r in res.fetchall()]
+
+    async def recent_for_user(self, user_id: int, q: str | None, limit: int) -> list[tuple[str, int, datetime]]:
+        """Недавние наименования пользователя (index-only scan по ix_user_doc_name_usage_recent)."""
+        stmt = select(UserDocNameUsage.doc_name, UserDocNameUsage.uses, UserDocNameUsage.last_used_at).where(
+            UserDocNameUsage.user_id == user_id
+        )
+        if q:
+            stmt = stmt.where(contains(UserDocNameUsage.doc_name, q))
+        res = await self.session.execute(stmt.order_by(UserDocNameUsage.last_used_at.desc()).limit(limit))
+        return [tuple(r) for r in res.fetchall()]
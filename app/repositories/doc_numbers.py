@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 
-from sqlalchemy import select, update, and_
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, update, and_, or_, any_, bindparam, Integer, BigInteger, func, column, exists
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.doc_number import DocNumber, DocNumStatus
@@ -23,10 +23,19 @@ class DocNumbersRepository:
         )
         return len(res.fetchall())
 
-    async def fetch_released_for_update(self, base_start: int, limit: int, skip_golden: bool = True) -> list[DocNumber]:
+    async def fetch_released_for_update(self, base_start: int, limit: int, skip_golden: bool = True,
+                                        include_expired: bool = False) -> list[DocNumber]:
+        """
+        Блокирует свободные номера из пула released.
+        include_expired=True дополнительно считает свободными просроченные резервы (reserved AND expires_at < now).
+        """
+        free = DocNumber.status == DocNumStatus.released
+        if include_expired:
+            now = datetime.utcnow()
+            free = or_(free, and_(DocNumber.status == DocNumStatus.reserved, DocNumber.expires_at < now))
         stmt = (
             select(DocNumber)
-            .where(DocNumber.status == DocNumStatus.released, DocNumber.numeric >= base_start)
+            .where(free, DocNumber.numeric >= base_start)
             .order_by(DocNumber.numeric.asc())
             .with_for_update(skip_locked=True)
             .limit(limit * 2)
@@ -39,91 +48,168 @@ class DocNumbersRepository:
 
     async def reserve_existing(self, numbers: list[DocNumber], user_id: int, session_id: str, ttl_seconds: int) -> list[
         int]:
+        """Резервирует весь отобранный набор одним UPDATE ... WHERE id = ANY(...) RETURNING numeric."""
+        if not numbers:
+            return []
         now = datetime.utcnow()
         expires_at = now + timedelta(seconds=ttl_seconds)
-        reserved = []
-        for row in numbers:
-            await self.session.execute(
-                update(DocNumber)
-                .where(DocNumber.id == row.id)
-                .values(
-                    status=DocNumStatus.reserved,
-                    reserved_by=user_id,
-                    session_id=session_id,
-                    reserved_at=now,
-                    expires_at=expires_at,
-                    released_at=None,
-                )
+        ids = [row.id for row in numbers]
+        res = await self.session.execute(
+            update(DocNumber)
+            .where(DocNumber.id == any_(bindparam("ids", ids, type_=ARRAY(Integer))))
+            .values(
+                status=DocNumStatus.reserved,
+                reserved_by=user_id,
+                session_id=session_id,
+                reserved_at=now,
+                expires_at=expires_at,
+                released_at=None,
             )
-            await self.session.flush()
-            reserved.append(row.numeric)
-        return reserved
+            .returning(DocNumber.numeric)
+            .execution_options(synchronize_session="fetch")
+        )
+        return list(res.scalars().all())
 
     async def create_and_reserve_new(self, candidates: list[int], user_id: int, session_id: str, ttl_seconds: int) -> \
             list[int]:
-        from sqlalchemy.exc import IntegrityError
+        """
+        Вставляет кандидатов одним INSERT ... ON CONFLICT DO NOTHING RETURNING numeric.
+        Возвращает только реально вставленные номера; занятые пропускаются без отката транзакции.
+        """
+        if not candidates:
+            return []
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        rows = [
+            {
+                "numeric": num,
+                "is_golden": num % 100 == 0,
+                "status": DocNumStatus.reserved,
+                "reserved_by": user_id,
+                "session_id": session_id,
+                "reserved_at": now,
+                "expires_at": expires_at,
+            }
+            for num in candidates
+        ]
+        res = await self.session.execute(
+            pg_insert(DocNumber)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[DocNumber.numeric])
+            .returning(DocNumber.numeric)
+        )
+        return list(res.scalars().all())
 
+    async def reserve_specific_numbers(self, numbers: list[int], user_id: int, session_id: str, ttl_seconds: int) -> \
+    list[int]:
+        """
+        Резервирует конкретные номера: освобожденные переводятся в reserved одним UPDATE,
+        отсутствующие вставляются через ON CONFLICT DO NOTHING. Занятые номера пропускаются
+        без отката транзакции, в том числе при гонке с параллельным резервированием.
+        """
+        if not numbers:
+            return []
         now = datetime.utcnow()
         expires_at = now + timedelta(seconds=ttl_seconds)
-        reserved = []
-        for num in candidates:
-            dn = DocNumber(
-                numeric=num,
-                is_golden=(num % 100 == 0),
+
+        res = await self.session.execute(
+            update(DocNumber)
+            .where(
+                DocNumber.numeric == any_(bindparam("numerics", list(numbers), type_=ARRAY(BigInteger))),
+                DocNumber.status == DocNumStatus.released,
+            )
+            .values(
                 status=DocNumStatus.reserved,
                 reserved_by=user_id,
                 session_id=session_id,
                 reserved_at=now,
                 expires_at=expires_at,
+                released_at=None,
             )
-            self.session.add(dn)
-            try:
-                await self.session.flush()
-            except IntegrityError:
-                await self.session.rollback()
-                await self.session.begin()
-                continue
-            reserved.append(num)
-        return reserved
+            .returning(DocNumber.numeric)
+            .execution_options(synchronize_session="fetch")
+        )
+        reserved = list(res.scalars().all())
 
-    async def reserve_specific_numbers(self, numbers: list[int], user_id: int, session_id: str, ttl_seconds: int) -> \
-    list[int]:
+        missing = sorted(set(numbers) - set(reserved))
+        if missing:
+            res = await self.session.execute(
+                pg_insert(DocNumber)
+                .values([
+                    {
+                        "numeric": num,
+                        "is_golden": num % 100 == 0,
+                        "status": DocNumStatus.reserved,
+                        "reserved_by": user_id,
+                        "session_id": session_id,
+                        "reserved_at": now,
+                        "expires_at": expires_at,
+                    }
+                    for num in missing
+                ])
+                .on_conflict_do_nothing(index_elements=[DocNumber.numeric])
+                .returning(DocNumber.numeric)
+            )
+            reserved.extend(res.scalars().all())
+
+        return sorted(reserved)
+
+    async def find_free_golden(self, start: int, quantity: int, stop: int) -> list[int]:
+        """
+        Ищет свободные "золотые" номера в диапазоне [start, stop] одним запросом:
+        generate_series по кратным 100 с anti-join по частичному индексу doc_numbers(numeric) WHERE is_golden.
+        """
+        series = func.generate_series(start, stop, 100).table_valued(column("g", BigInteger)).alias("series")
+        g = series.c.g
+        occupied = exists().where(
+            DocNumber.is_golden.is_(True),
+            DocNumber.numeric == g,
+            DocNumber.status.in_([DocNumStatus.assigned, DocNumStatus.reserved]),
+        )
+        stmt = select(g).select_from(series).where(~occupied).order_by(g.asc()).limit(quantity)
+        res = await self.session.execute(stmt)
+        return list(res.scalars().all())
+
+    async def release_numbers(self, numbers: list[int]) -> int:
+        """Добавляет в пул released номера, которые ни разу не попадали в doc_numbers."""
+        if not numbers:
+            return 0
         now = datetime.utcnow()
-        expires_at = now + timedelta(seconds=ttl_seconds)
-        reserved: list[int] = []
-
-        for num in sorted(numbers):
-            stmt = select(DocNumber).where(DocNumber.numeric == num).with_for_update()
-            row = await self.session.scalar(stmt)
-
-            if row:
-                if row.status in (DocNumStatus.assigned, DocNumStatus.reserved):
-                    continue
-
-                row.status = DocNumStatus.reserved
-                row.reserved_by = user_id
-                row.session_id = session_id
-                row.reserved_at = now
-                row.expires_at = expires_at
-                row.released_at = None
-                reserved.append(num)
-
-            else:
-                dn = DocNumber(
-                    numeric=num, is_golden=(num % 100 == 0), status=DocNumStatus.reserved,
-                    reserved_by=user_id, session_id=session_id, reserved_at=now, expires_at=expires_at,
-                )
-                self.session.add(dn)
-                reserved.append(num)
-
-        try:
-            await self.session.flush()
-        except IntegrityError:
-            await self.session.rollback()
-            await self.session.begin()
-            return []
+        res = await self.session.execute(
+            pg_insert(DocNumber)
+            .values([
+                {"numeric": num, "is_golden": num % 100 == 0, "status": DocNumStatus.released, "released_at": now}
+                for num in numbers
+            ])
+            .on_conflict_do_nothing(index_elements=[DocNumber.numeric])
+            .returning(DocNumber.id)
+        )
+        return len(res.fetchall())
 
-        return reserved
+    async def upsert_assigned(self, assigned: list[tuple[int, datetime | None]]) -> None:
+        """
+        Отмечает импортированные номера (numeric, assigned_at) занятыми одним INSERT ... ON CONFLICT DO UPDATE:
+        уже существующий номер (резерв, released) переводится в assigned.
+        """
+        if not assigned:
+            return
+        stmt = pg_insert(DocNumber).values([
+            {"numeric": numeric, "is_golden": numeric % 100 == 0, "status": DocNumStatus.assigned,
+             "assigned_at": assigned_at}
+            for numeric, assigned_at in assigned
+        ])
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[DocNumber.numeric],
+                set_={
+                    "status": DocNumStatus.assigned,
+                    "assigned_at": stmt.excluded.assigned_at,
+                    "reserved_by": None,
+                    "session_id": None,
+                    "expires_at": None,
+                },
+            )
+        )
 
     async def get_reserved_for_session(self, session_id: str) -> list[DocNumber]:
         res = await self.session.execute(
@@ -132,6 +218,22 @@ class DocNumbersRepository:
         )
         return res.scalars().all()
 
+    async def lock_reserved_for_session(self, session_id: str, numbers: list[int]) -> set[int]:
+        """
+        Какие из numbers зарезервированы за сессией — одним запросом по ix_doc_numbers_reserved_session.
+        Строки блокируются до конца транзакции, чтобы их не освободил TTL между проверкой и mark_assigned.
+        """
+        res = await self.session.execute(
+            select(DocNumber.numeric)
+            .where(
+                DocNumber.session_id == session_id,
+                DocNumber.status == DocNumStatus.reserved,
+                DocNumber.numeric == any_(bindparam("numerics", list(numbers), type_=ARRAY(BigInteger))),
+            )
+            .with_for_update()
+        )
+        return set(res.scalars().all())
+
     async def mark_assigned(self, numbers: list[int]) -> None:
         now = datetime.utcnow()
         await self.session.execute(
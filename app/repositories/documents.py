@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.document import Document
+from app.utils.text_filters import contains
 
 
 class DocumentsRepository:
@@ -17,6 +19,44 @@ class DocumentsRepository:
         await self.session.flush()
         return doc
 
+    async def insert_many(self, rows: list[dict]) -> set[int]:
+        """
+        Вставляет документы одним INSERT ... ON CONFLICT DO NOTHING.
+        Возвращает номера вставленных документов; остальные конфликтуют по номеру или по (наименование, оборудование, примечание).
+        """
+        if not rows:
+            return set()
+        res = await self.session.execute(
+            pg_insert(Document).values(rows).on_conflict_do_nothing().returning(Document.numeric)
+        )
+        return set(res.scalars().all())
+
+    async def create_many(self, rows: list[dict]) -> list:
+        """
+        Многострочный INSERT ... ON CONFLICT DO NOTHING RETURNING id, numeric, reg_date.
+        Строки, конфликтующие по номеру или (наименование, оборудование, примечание), в результат не попадают.
+        """
+        if not rows:
+            return []
+        res = await self.session.execute(
+            pg_insert(Document).values(rows).on_conflict_do_nothing()
+            .returning(Document.id, Document.numeric, Document.reg_date)
+        )
+        return res.fetchall()
+
+    async def list_doc_names(self, q: str | None = None, limit: int = 20) -> list[str]:
+        """Различные наименования документов, содержащие q (по ix_documents_doc_name_trgm)."""
+        stmt = select(func.distinct(Document.doc_name))
+        if q:
+            stmt = stmt.where(contains(Document.doc_name, q))
+        res = await self.session.execute(stmt.order_by(Document.doc_name.asc()).limit(limit))
+        return [r[0] for r in res.fetchall() if r[0]]
+
+    async def count_doc_names(self) -> list[tuple[str, int]]:
+        """(наименование, число документов) — для загрузки индекса автодополнения."""
+        res = await self.session.execute(select(Document.doc_name, func.count()).group_by(Document.doc_name))
+        return [tuple(r) for r in res.fetchall()]
+
     async def get_by_numeric(self, numeric: int) -> Document | None:
         res = await self.session.execute(select(Document).where(Document.numeric == numeric))
         return res.scalars().first()
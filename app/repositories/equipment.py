@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from sqlalchemy import select, func, or_, and_
+from sqlalchemy import select, func, or_, and_, any_, bindparam, insert
+from sqlalchemy.dialects.postgresql import ARRAY, CITEXT, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.equipment import Equipment
+from app.utils.text_filters import contains
 
 
 class EquipmentRepository:
@@ -16,6 +18,46 @@ class EquipmentRepository:
         await self.session.flush()
         return eq
 
+    async def get_or_create_by_factory_no(self, items: dict[str, dict]) -> dict[str, int]:
+        """
+        items: заводской номер -> поля оборудования. Возвращает lower(factory_no) -> id.
+        Существующие записи берутся одним SELECT, недостающие вставляются одним INSERT ... ON CONFLICT.
+        """
+        if not items:
+            return {}
+        ids = await self._ids_by_factory_no(list(items))
+        missing = [no for no in items if no.lower() not in ids]
+        if missing:
+            res = await self.session.execute(
+                pg_insert(Equipment)
+                .values([items[no] for no in missing])
+                .on_conflict_do_nothing(index_elements=[Equipment.factory_no])
+                .returning(Equipment.id, Equipment.factory_no)
+            )
+            ids.update({factory_no.lower(): id_ for id_, factory_no in res.fetchall()})
+            lost = [no for no in missing if no.lower() not in ids]
+            if lost:
+                ids.update(await self._ids_by_factory_no(lost))
+        return ids
+
+    async def create_many(self, rows: list[dict]) -> list[int]:
+        """Многострочный INSERT ... RETURNING id; id возвращаются в порядке rows."""
+        if not rows:
+            return []
+        res = await self.session.execute(
+            insert(Equipment).values(rows).returning(Equipment.id, sort_by_parameter_order=True)
+        )
+        return list(res.scalars().all())
+
+    async def _ids_by_factory_no(self, factory_nos: list[str]) -> dict[str, int]:
+        # массив citext[]: с varchar[] сравнение = ANY(...) было бы чувствительно к регистру
+        res = await self.session.execute(
+            select(Equipment.id, Equipment.factory_no).where(
+                Equipment.factory_no == any_(bindparam("factory_nos", factory_nos, type_=ARRAY(CITEXT)))
+            )
+        )
+        return {factory_no.lower(): id_ for id_, factory_no in res.fetchall()}
+
     async def get(self, id_: int) -> Equipment | None:
         res = await self.session.execute(select(Equipment).where(Equipment.id == id_))
         return res.scalars().first()
@@ -33,7 +75,7 @@ class EquipmentRepository:
         conditions = []
 
         # Поиск по частичному совпадению для текстовых полей
-        if station_object: conditions.append(Equipment.station_object.ilike(f"%{station_object}%"))
+        if station_object: conditions.append(contains(Equipment.station_object, station_object))
         
         # Точное совпадение для идентификаторов
         if station_no: conditions.append(Equipment.station_no == station_no)
@@ -43,13 +85,13 @@ class EquipmentRepository:
 
         # Глобальный поиск по всем полям
         if q:
-            # Используем ilike для глобального поиска, так как это более ожидаемое поведение
+            # Подстрока в любом из полей: по каждому есть триграммный индекс, планировщик объединяет их через BitmapOr
             q_conditions = [
-                Equipment.station_object.ilike(f"%{q}%"),
-                Equipment.station_no.ilike(f"%{q}%"),
-                Equipment.label.ilike(f"%{q}%"),
-                Equipment.factory_no.ilike(f"%{q}%"),
-                Equipment.order_no.ilike(f"%{q}%")
+                contains(Equipment.station_object, q),
+                contains(Equipment.station_no, q),
+                contains(Equipment.label, q),
+                contains(Equipment.factory_no, q),
+                contains(Equipment.order_no, q),
             ]
             conditions.append(or_(*q_conditions))
 
@@ -92,11 +134,16 @@ class EquipmentRepository:
         res = await self.session.execute(stmt)
         return res.scalars().all()
 
+    async def list_suggest_fields(self, fields: tuple[str, ...]) -> list[tuple]:
+        """Значения полей автодополнения по всем записям — для загрузки индекса в памяти."""
+        res = await self.session.execute(select(*(getattr(Equipment, f) for f in fields)))
+        return [tuple(r) for r in res.fetchall()]
+
     async def list_distinct(self, field: str, q: str | None = None, station_object: str | None = None) -> list[str]:
         col = getattr(Equipment, field)
         stmt = select(func.distinct(col))
         if q:
-            stmt = stmt.where(col.ilike(f"%{q}%"))
+            stmt = stmt.where(contains(col, q))
         if station_object and field == "station_no":
             stmt = stmt.where(Equipment.station_object == station_object)
         if station_object and field == "label":
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import select, update, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.import_run import ImportRun, ImportRunChunk, ImportRunStatus
+
+
+class ImportRunsRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_hash(self, file_hash: str) -> ImportRun | None:
+        res = await self.session.execute(select(ImportRun).where(ImportRun.file_hash == file_hash))
+        return res.scalars().first()
+
+    async def start(self, file_hash: str, total_rows: int, parse_errors: list[dict]) -> ImportRun:
+        """Возвращает запуск для файла: существующий (для продолжения) или новый."""
+        await self.session.execute(
+            pg_insert(ImportRun)
+            .values(file_hash=file_hash, status=ImportRunStatus.running, total_rows=total_rows, errors=parse_errors)
+            .on_conflict_do_nothing(index_elements=[ImportRun.file_hash])
+        )
+        res = await self.session.execute(
+            select(ImportRun).where(ImportRun.file_hash == file_hash).execution_options(populate_existing=True)
+        )
+        run = res.scalars().one()
+        run.status = ImportRunStatus.running
+        run.finished_at = None
+        await self.session.flush()
+        return run
+
+    async def count_chunks(self, run: ImportRun) -> int:
+        res = await self.session.execute(
+            select(func.count()).select_from(ImportRunChunk).where(ImportRunChunk.run_id == run.id)
+        )
+        return res.scalar_one()
+
+    async def checkpoint(self, run: ImportRun, *, chunk_no: int, row_offset: int, row_count: int,
+                         imported: set[int], errors: list[dict]) -> None:
+        """Фиксирует чанк в той же транзакции, что и его данные: либо закоммичено и то и другое, либо ничего."""
+        self.session.add(ImportRunChunk(
+            run_id=run.id, chunk_no=chunk_no, row_offset=row_offset, row_count=row_count, imported=len(imported)
+        ))
+        run.processed_rows = row_offset + row_count
+        run.imported += len(imported)
+        if imported:
+            run.max_numeric = max(run.max_numeric, max(imported))
+        if errors:
+            run.errors = [*run.errors, *errors]
+        await self.session.flush()
+
+    async def finish(self, run_id: int, status: ImportRunStatus) -> None:
+        await self.session.execute(
+            update(ImportRun).where(ImportRun.id == run_id).values(status=status, finished_at=datetime.utcnow())
+        )
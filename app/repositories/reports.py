@@ -1,17 +1,31 @@
 from __future__ import annotations
 
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, and_, or_, tuple_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.models.audit import AuditLog
 from app.models.document import Document
 from app.models.equipment import Equipment
 from app.models.user import User
+from app.utils.text_filters import contains
 
 
 class ReportsRepository:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def data_version(self) -> tuple[int, int]:
+        """
+        Версия данных отчетов: последний документ и последняя правка (документы только добавляются,
+        а изменения идут через audit_logs). Оба max() берутся по первичным ключам.
+        """
+        stmt = select(
+            select(func.coalesce(func.max(Document.id), 0)).scalar_subquery(),
+            select(func.coalesce(func.max(AuditLog.id), 0)).scalar_subquery(),
+        )
+        res = await self.session.execute(stmt)
+        return tuple(res.one())
+
     async def fetch(self, station_objects: list[str] | None, date_from, date_to):
         stmt = (
             select(
@@ -47,9 +61,9 @@ class ReportsRepository:
         res = await self.session.execute(stmt)
         return res.fetchall()
 
-    async def fetch_extended(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
-                             factory_no: str | None, order_no: str | None, date_from, date_to, doc_name: str | None,
-                             username: str | None):
+    def _extended_stmt(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
+                       factory_no: str | None, order_no: str | None, date_from, date_to, doc_name: str | None,
+                       username: str | None):
         stmt = (
             select(
                 Document.numeric, Document.reg_date, Document.doc_name, Document.note,
@@ -62,25 +76,57 @@ class ReportsRepository:
         )
         where = []
         if station_objects:
-            station_object_conditions = [Equipment.station_object.ilike(f"%{so}%") for so in station_objects]
+            station_object_conditions = [contains(Equipment.station_object, so) for so in station_objects]
             where.append(or_(*station_object_conditions))
-        if label: where.append(Equipment.label.ilike(f"%{label}%"))
-        if doc_name: where.append(Document.doc_name.ilike(f"%{doc_name}%"))
-        if username: where.append(User.username.ilike(f"%{username}%"))
+        if label: where.append(contains(Equipment.label, label))
+        if doc_name: where.append(contains(Document.doc_name, doc_name))
+        if username: where.append(contains(User.username, username))
 
         if station_no: where.append(Equipment.station_no == station_no)
         if factory_no: where.append(Equipment.factory_no == factory_no)
-        if order_no: where.append(Equipment.order_no.ilike(f"%{order_no}%"))
+        if order_no: where.append(contains(Equipment.order_no, order_no))
 
         if date_from: where.append(Document.reg_date >= date_from)
         if date_to: where.append(Document.reg_date <= date_to)
         if where: stmt = stmt.where(and_(*where))
 
-        stmt = stmt.order_by(Document.reg_date.desc(), Document.numeric.desc())
+        return stmt.order_by(Document.reg_date.desc(), Document.numeric.desc())
+
+    async def fetch_extended(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
+                             factory_no: str | None, order_no: str | None, date_from, date_to, doc_name: str | None,
+                             username: str | None, *, after: tuple | None = None, limit: int | None = None):
+        """
+        after=(reg_date, numeric) — keyset-курсор: строки строго после него в порядке ORDER BY,
+        совпадающем с индексом ix_documents_reg_date_numeric.
+        """
+        stmt = self._extended_stmt(station_objects, station_no, label, factory_no, order_no, date_from, date_to,
+                                   doc_name, username)
+        if after:
+            stmt = stmt.where(tuple_(Document.reg_date, Document.numeric) < tuple_(*after))
+        if limit:
+            stmt = stmt.limit(limit)
 
         res = await self.session.execute(stmt)
         return res.fetchall()
 
+    async def count_extended(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
+                             factory_no: str | None, order_no: str | None, date_from, date_to,
+                             doc_name: str | None, username: str | None) -> int:
+        stmt = self._extended_stmt(station_objects, station_no, label, factory_no, order_no, date_from, date_to,
+                                   doc_name, username).order_by(None)
+        res = await self.session.execute(select(func.count()).select_from(stmt.subquery()))
+        return res.scalar_one()
+
+    async def stream_extended(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
+                              factory_no: str | None, order_no: str | None, date_from, date_to,
+                              doc_name: str | None, username: str | None, *, batch_size: int = 1000):
+        """Отдает строки через серверный курсор пачками по batch_size, не загружая результат целиком."""
+        stmt = self._extended_stmt(station_objects, station_no, label, factory_no, order_no, date_from, date_to,
+                                   doc_name, username)
+        result = await self.session.stream(stmt.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield row
+
     async def fetch_extended_admin(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
                                    factory_no: str | None, order_no: str | None, username: str | None, date_from,
                                    date_to, eq_type: str | None, doc_name: str | None):
@@ -99,15 +145,15 @@ class ReportsRepository:
         where = []
 
         if station_objects:
-            station_object_conditions = [Equipment.station_object.ilike(f"%{so}%") for so in station_objects]
+            station_object_conditions = [contains(Equipment.station_object, so) for so in station_objects]
             where.append(or_(*station_object_conditions))
-        if label: where.append(Equipment.label.ilike(f"%{label}%"))
-        if username: where.append(User.username.ilike(f"%{username}%"))
-        if doc_name: where.append(Document.doc_name.ilike(f"%{doc_name}%"))
+        if label: where.append(contains(Equipment.label, label))
+        if username: where.append(contains(User.username, username))
+        if doc_name: where.append(contains(Document.doc_name, doc_name))
 
         if station_no: where.append(Equipment.station_no == station_no)
         if factory_no: where.append(Equipment.factory_no == factory_no)
-        if order_no: where.append(Equipment.order_no.ilike(f"%{order_no}%"))
+        if order_no: where.append(contains(Equipment.order_no, order_no))
 
         if date_from: where.append(Document.reg_date >= date_from)
         if date_to: where.append(Document.reg_date <= date_to)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from sqlalchemy import select, func, union, literal_column, Text, cast
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+from app.models.equipment import Equipment
+from app.models.user import User
+
+TS_CONFIG = literal_column("'russian'::regconfig")
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=5"
+
+
+class SearchRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    @staticmethod
+    def _matched_ids(tsq):
+        """
+        id документов, у которых запросу соответствует свой вектор или вектор оборудования.
+        Обе ветки идут по GIN-индексам (ix_documents_search_vector, ix_equipment_search_vector),
+        вторая переходит к документам через ix_documents_equipment_id.
+        """
+        return union(
+            select(Document.id).where(Document.search_vector.op("@@")(tsq)),
+            select(Document.id)
+            .join(Equipment, Equipment.id == Document.equipment_id)
+            .where(Equipment.search_vector.op("@@")(tsq)),
+        ).subquery()
+
+    async def count(self, query: str) -> int:
+        matched = self._matched_ids(func.websearch_to_tsquery(TS_CONFIG, query))
+        res = await self.session.execute(select(func.count()).select_from(matched))
+        return res.scalar_one()
+
+    async def search(self, query: str, limit: int, offset: int):
+        """
+        Страница совпадений по убыванию ts_rank_cd. Ранг считается по всем совпадениям,
+        ts_headline — только для строк страницы.
+        """
+        tsq = func.websearch_to_tsquery(TS_CONFIG, query)
+        matched = self._matched_ids(tsq)
+        rank = func.ts_rank_cd(Document.search_vector.op("||")(Equipment.search_vector), tsq)
+        page = (
+            select(Document.id, rank.label("rank"))
+            .join(Equipment, Equipment.id == Document.equipment_id)
+            .where(Document.id.in_(select(matched.c.id)))
+            .order_by(rank.desc(), Document.id.desc())
+            .limit(limit)
+            .offset(offset)
+            .subquery()
+        )
+
+        equipment_text = func.concat_ws(
+            " · ", Equipment.eq_type, Equipment.label, Equipment.factory_no, Equipment.order_no,
+            Equipment.station_no, Equipment.station_object,
+        )
+        stmt = (
+            select(
+                Document.numeric, Document.reg_date, Document.doc_name, Document.note,
+                Equipment.eq_type, Equipment.factory_no, Equipment.order_no,
+                Equipment.label, Equipment.station_no, Equipment.station_object,
+                User.username,
+                page.c.rank,
+                func.ts_headline(TS_CONFIG, cast(Document.doc_name, Text), tsq, HEADLINE_OPTIONS).label("doc_name_hl"),
+                func.ts_headline(TS_CONFIG, func.coalesce(cast(Document.note, Text), ""), tsq, HEADLINE_OPTIONS)
+                .label("note_hl"),
+                func.ts_headline(TS_CONFIG, equipment_text, tsq, HEADLINE_OPTIONS).label("equipment_hl"),
+            )
+            .select_from(page)
+            .join(Document, Document.id == page.c.id)
+            .join(Equipment, Equipment.id == Document.equipment_id)
+            .join(User, User.id == Document.user_id)
+            .order_by(page.c.rank.desc(), Document.id.desc())
+        )
+        res = await self.session.execute(stmt)
+        return res.fetchall()
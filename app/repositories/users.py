@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import select, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, CITEXT, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.user import User
@@ -23,3 +24,35 @@ class UsersRepository:
         self.session.add(user)
         await self.session.flush()
         return user
+
+    async def get_or_create_many(self, users: dict[str, dict]) -> dict[str, int]:
+        """
+        users: username -> поля профиля для новых пользователей. Возвращает lower(username) -> id.
+        Один SELECT по всем именам и один INSERT ... ON CONFLICT DO NOTHING для недостающих.
+        """
+        if not users:
+            return {}
+        ids = await self._ids_by_username(list(users))
+        missing = [name for name in users if name.lower() not in ids]
+        if missing:
+            res = await self.session.execute(
+                pg_insert(User)
+                .values([{"username": name, **users[name]} for name in missing])
+                .on_conflict_do_nothing(index_elements=[User.username])
+                .returning(User.id, User.username)
+            )
+            ids.update({username.lower(): id_ for id_, username in res.fetchall()})
+            # параллельно созданные пользователи не вернулись из RETURNING — дочитываем их
+            lost = [name for name in missing if name.lower() not in ids]
+            if lost:
+                ids.update(await self._ids_by_username(lost))
+        return ids
+
+    async def _ids_by_username(self, usernames: list[str]) -> dict[str, int]:
+        # массив citext[]: с varchar[] сравнение = ANY(...) было бы чувствительно к регистру
+        res = await self.session.execute(
+            select(User.id, User.username).where(
+                User.username == any_(bindparam("usernames", usernames, type_=ARRAY(CITEXT)))
+            )
+        )
+        return {username.lower(): id_ for id_, username in res.fetchall()}
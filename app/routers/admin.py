@@ -3,6 +3,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from app.core.auth import get_current_user, CurrentUser
+from app.core.executor import executors_snapshot
 
 router = APIRouter()
 
@@ -15,3 +16,13 @@ async def check_access(
     if not user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ запрещен")
     return {"is_admin": True}
+
+
+@router.get("/executor-metrics", response_model=list[dict])
+async def executor_metrics(
+        user: CurrentUser = Depends(get_current_user),
+):
+    """Загрузка пулов блокирующей работы: выполняются, ждут в очереди, суммарное время ожидания."""
+    if not user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ запрещен")
+    return executors_snapshot()
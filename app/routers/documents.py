@@ -8,8 +8,8 @@ from app.core.db import lifespan_session
 from app.core.auth import get_current_user, CurrentUser
 from app.services.documents import DocumentsService
 from app.schemas.admin import AdminDocumentUpdate
-from app.schemas.documents import DocumentAssignOne
-from app.schemas.responses import AssignNumberOut, CreatedDocumentInfo
+from app.schemas.documents import DocumentAssignOne, DocumentAssignBatch
+from app.schemas.responses import AssignNumberOut, CreatedDocumentInfo, AssignBatchOut
 from app.utils.numbering import format_doc_no
 
 from app.services.reservation import ReservationService
@@ -52,6 +52,35 @@ async def assign_one(
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
 
+@router.post("/assign-batch", response_model=AssignBatchOut)
+async def assign_batch(
+        payload: DocumentAssignBatch,
+        session: AsyncSession = Depends(lifespan_session),
+        user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Назначение нескольких номеров одной сессии одним запросом (например, комплект листов чертежа).
+    Всё или ничего: при ошибке в любой позиции документы не создаются, в detail.errors — ошибки по номерам.
+    """
+    svc = DocumentsService(session)
+    try:
+        result = await svc.assign_batch(
+            session_id=payload.session_id,
+            user_id=user.id,
+            is_admin=user.is_admin,
+            items=[item.model_dump() for item in payload.items],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+    if result["created"] is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": result["message"], "errors": result["errors"]},
+        )
+    return AssignBatchOut.model_validate(result).model_dump()
+
+
 @router.patch("/{document_id}", response_model=dict)
 async def edit_document(
         document_id: int,
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+import os
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from pathlib import Path
 
+from app.core.config import settings
 from app.core.db import lifespan_session
 from app.core.auth import get_current_user, CurrentUser
 from app.services.importer import ExcelImporterService
+from app.utils.uploads import UploadTooLarge, save_upload
 
 router = APIRouter(prefix="/import", tags=["import"])
 
@@ -19,11 +22,17 @@ async def import_excel(
 ):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Только админ может импортировать Excel.")
-    path = Path("var/uploads")
-    path.mkdir(parents=True, exist_ok=True)
-    fpath = path / file.filename
-    with open(fpath, "wb") as f:
-        f.write(await file.read())
-    svc = ExcelImporterService(session)
-    result = await svc.import_file(str(fpath))
-    return result
+    try:
+        upload = await save_upload(file, max_bytes=settings.import_max_upload_bytes, suffix=".xlsx")
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    try:
+        # повторная загрузка того же файла вернет прежний результат или продолжит прерванный импорт
+        svc = ExcelImporterService(session)
+        return await svc.import_file(upload.path, file_hash=upload.sha256)
+    except ValueError as e:
+        # файл не того формата (нет обязательных колонок)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        os.remove(upload.path)
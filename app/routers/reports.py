@@ -2,18 +2,23 @@ from __future__ import annotations
 
 import os
 from datetime import datetime
-from typing import List
+from typing import List, Literal
+
+import orjson
 
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.background import BackgroundTask
-from starlette.responses import FileResponse
+from starlette.responses import FileResponse, StreamingResponse
 
 from app.core.auth import get_current_user, CurrentUser
 from app.core.db import lifespan_session
 from app.schemas.admin import AdminDocumentRow
-from app.schemas.reports import ReportRowOut
+from app.schemas.reports import ReportRowOut, ReportPageOut, ExportJobOut
+from app.services.export_jobs import export_jobs, ExportJob, ExportJobStatus
 from app.services.reports import ReportsService
+from app.utils.export_cache import export_cache
+from app.utils.exports import EXPORT_MEDIA_TYPES
 
 router = APIRouter()
 
@@ -39,8 +44,7 @@ def clean_param(p: str | None) -> str | None:
     return stripped if stripped else None
 
 
-@router.get("", response_model=list[ReportRowOut])
-async def get_report(
+def report_filters(
         station_object: list[str] | None = Query(default=None),
         station_no: str | None = Query(default=None),
         label: str | None = Query(default=None),
@@ -50,66 +54,129 @@ async def get_report(
         date_to: str | None = Query(default=None),
         doc_name: str | None = Query(default=None),
         username: str | None = Query(default=None),
-        session: AsyncSession = Depends(lifespan_session),
-        user: CurrentUser = Depends(get_current_user),
-):
-    """Получение отчета с фильтрами. Всегда возвращает JSON."""
-    svc = ReportsService(session)
-    df = _parse_dt(date_from)
-    dt = _parse_dt(date_to)
-    stations = _parse_stations(station_object)
-
-    rows = await svc.get_rows_extended(
-        station_objects=stations,
+) -> dict:
+    """Общие фильтры отчета, уже очищенные и приведенные к типам сервиса."""
+    return dict(
+        station_objects=_parse_stations(station_object),
         station_no=clean_param(station_no),
         label=clean_param(label),
         factory_no=clean_param(factory_no),
         order_no=clean_param(order_no),
-        date_from=df,
-        date_to=dt,
+        date_from=_parse_dt(date_from),
+        date_to=_parse_dt(date_to),
         doc_name=clean_param(doc_name),
-        username=clean_param(username)
+        username=clean_param(username),
     )
+
+
+@router.get("", response_model=list[ReportRowOut])
+async def get_report(
+        filters: dict = Depends(report_filters),
+        session: AsyncSession = Depends(lifespan_session),
+        user: CurrentUser = Depends(get_current_user),
+):
+    """Получение отчета с фильтрами. Всегда возвращает JSON."""
+    svc = ReportsService(session)
+    rows = await svc.get_rows_extended(**filters)
     return rows
 
 
+@router.get("/page", response_model=ReportPageOut)
+async def get_report_page(
+        limit: int = Query(default=100, ge=1, le=1000),
+        cursor: str | None = Query(default=None),
+        filters: dict = Depends(report_filters),
+        session: AsyncSession = Depends(lifespan_session),
+        user: CurrentUser = Depends(get_current_user),
+):
+    """Страница отчета с keyset-пагинацией. Следующая страница запрашивается по next_cursor."""
+    svc = ReportsService(session)
+    try:
+        return await svc.get_page_extended(limit=limit, cursor=clean_param(cursor), **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/stream")
+async def stream_report(
+        filters: dict = Depends(report_filters),
+        session: AsyncSession = Depends(lifespan_session),
+        user: CurrentUser = Depends(get_current_user),
+):
+    """Потоковая выдача отчета в формате NDJSON (одна строка отчета — одна строка JSON)."""
+    bind = session.bind
+
+    async def ndjson():
+        # Сессия зависимости закрывается до отправки тела ответа, поэтому поток открывает свою
+        async with AsyncSession(bind=bind) as stream_session:
+            svc = ReportsService(stream_session)
+            async for row in svc.stream_rows_extended(**filters):
+                yield orjson.dumps(row) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 @router.get("/export", response_class=FileResponse)
 async def export_report_excel(
-        station_object: list[str] | None = Query(default=None),
-        station_no: str | None = Query(default=None),
-        label: str | None = Query(default=None),
-        factory_no: str | None = Query(default=None),
-        order_no: str | None = Query(default=None),
-        date_from: str | None = Query(default=None),
-        date_to: str | None = Query(default=None),
-        doc_name: str | None = Query(default=None),
-        username: str | None = Query(default=None),
+        fmt: Literal["xlsx", "csv", "parquet"] = Query(default="xlsx", alias="format"),
+        filters: dict = Depends(report_filters),
         session: AsyncSession = Depends(lifespan_session),
         user: CurrentUser = Depends(get_current_user),
 ):
-    """Экспорт отчета в Excel. Возвращает файл."""
+    """Экспорт отчета в Excel, CSV или Parquet (параметр format). Возвращает файл."""
     svc = ReportsService(session)
-    df = _parse_dt(date_from)
-    dt = _parse_dt(date_to)
-    stations = _parse_stations(station_object)
+    fname = await svc.export_extended(fmt, **filters)
+    return _export_file_response(fname, fmt, remove_after=True)
 
-    fname = await svc.export_excel_extended(
-        station_objects=stations,
-        station_no=clean_param(station_no),
-        label=clean_param(label),
-        factory_no=clean_param(factory_no),
-        order_no=clean_param(order_no),
-        date_from=df,
-        date_to=dt,
-        doc_name=clean_param(doc_name),
-        username=clean_param(username)
+
+@router.post("/export-jobs", response_model=ExportJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+        fmt: Literal["xlsx", "csv", "parquet"] = Query(default="xlsx", alias="format"),
+        filters: dict = Depends(report_filters),
+        user: CurrentUser = Depends(get_current_user),
+):
+    """Ставит выгрузку отчета в фоновую очередь. Прогресс — GET /export-jobs/{id}, файл — /export-jobs/{id}/file."""
+    job = export_jobs.submit(user_id=user.id, fmt=fmt, filters=filters)
+    return _job_out(job)
+
+
+@router.get("/export-jobs/{job_id}", response_model=ExportJobOut)
+async def get_export_job(job_id: str, user: CurrentUser = Depends(get_current_user)):
+    return _job_out(_get_own_job(job_id, user))
+
+
+@router.get("/export-jobs/{job_id}/file", response_class=FileResponse)
+async def download_export_job(job_id: str, user: CurrentUser = Depends(get_current_user)):
+    job = _get_own_job(job_id, user)
+    if job.status != ExportJobStatus.done:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Выгрузка еще не готова.")
+    # файл задачи удаляется при очистке завершенных задач, а не после скачивания
+    return _export_file_response(job.path, job.fmt, remove_after=False)
+
+
+def _get_own_job(job_id: str, user: CurrentUser) -> ExportJob:
+    job = export_jobs.get(job_id)
+    if job is None or (job.user_id != user.id and not user.is_admin):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача выгрузки не найдена.")
+    return job
+
+
+def _job_out(job: ExportJob) -> ExportJobOut:
+    return ExportJobOut(
+        id=job.id, status=job.status.value, format=job.fmt, processed=job.processed, total=job.total,
+        progress=job.progress, error=job.error, created_at=job.created_at, finished_at=job.finished_at,
     )
 
+
+def _export_file_response(fname: str, fmt: str, *, remove_after: bool) -> FileResponse:
+    # файлы из кеша выгрузок остаются на диске до вытеснения
+    cached = export_cache.owns(fname)
+    download_name = f"report_extended_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
     return FileResponse(
         path=fname,
-        filename=os.path.basename(fname),
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        background=BackgroundTask(lambda: os.remove(fname))
+        filename=download_name if cached else os.path.basename(fname),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        background=BackgroundTask(lambda: os.remove(fname)) if remove_after and not cached else None,
     )
 
 
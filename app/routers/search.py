@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import get_current_user, CurrentUser
+from app.core.db import lifespan_session
+from app.schemas.search import SearchPageOut
+from app.services.search import SearchService
+
+router = APIRouter()
+
+
+@router.get("", response_model=SearchPageOut)
+async def search(
+        q: str = Query(min_length=1, max_length=200),
+        limit: int = Query(default=20, ge=1, le=100),
+        offset: int = Query(default=0, ge=0, le=10_000),
+        session: AsyncSession = Depends(lifespan_session),
+        user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Полнотекстовый поиск по журналу (синтаксис websearch: "фраза в кавычках", -исключить, or).
+    Результаты упорядочены по релевантности, найденные слова подсвечены в highlight.
+    """
+    return await SearchService(session).search(q.strip(), limit=limit, offset=offset)
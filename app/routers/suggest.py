@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth import get_current_user, CurrentUser
 from app.core.db import lifespan_session
-from app.models.document import Document
 from app.repositories.equipment import EquipmentRepository
+from app.services.suggest_index import suggest_index, EQUIPMENT_FIELDS
+from app.services.suggestions import SuggestionsService
 
 router = APIRouter()
 
@@ -14,15 +15,16 @@ router = APIRouter()
 @router.get("/doc-names", response_model=list[str])
 async def suggest_doc_names(
         q: str | None = None,
+        equipment_id: int | None = None,
         session: AsyncSession = Depends(lifespan_session),
+        user: CurrentUser = Depends(get_current_user),
 ):
-    """Автодополнение для наименований документов."""
-    stmt = select(func.distinct(Document.doc_name))
-    if q and q.strip():
-        stmt = stmt.where(Document.doc_name.ilike(f"%{q.strip()}%"))
-    stmt = stmt.order_by(Document.doc_name.asc()).limit(20)
-    res = await session.execute(stmt)
-    return [r[0] for r in res.fetchall() if r[0]]
+    """
+    Автодополнение для наименований документов по популярности: сначала частые для станции и типа
+    оборудования equipment_id и недавние у текущего пользователя, затем по алфавиту.
+    """
+    q = q.strip() if q else None
+    return await SuggestionsService(session).doc_names(user_id=user.id, q=q, equipment_id=equipment_id)
 
 
 @router.get("/equipment/{field}", response_model=list[str])
@@ -32,10 +34,11 @@ async def suggest_equipment_field(
         station_object: str | None = None,
         session: AsyncSession = Depends(lifespan_session),
 ):
-    """Автодополнение для полей оборудования."""
-    repo = EquipmentRepository(session)
-    allowed = {"eq_type", "factory_no", "order_no", "label", "station_no", "station_object"}
-    if field not in allowed:
+    """Автодополнение для полей оборудования: из индекса в памяти, пока он не загружен — из БД."""
+    if field not in EQUIPMENT_FIELDS:
         return []
+    if suggest_index.ready:
+        return suggest_index.suggest_equipment(field, q, station_object=station_object)
+    repo = EquipmentRepository(session)
     vals = await repo.list_distinct(field, q=q, station_object=station_object)
     return vals
@@ -11,6 +11,18 @@ class DocumentAssignOne(BaseModel):
     numeric: int
 
 
+class DocumentAssignItem(BaseModel):
+    numeric: int
+    doc_name: str = Field(min_length=1)
+    note: str | None = None
+
+
+class DocumentAssignBatch(BaseModel):
+    """Схема для назначения нескольких номеров одной сессии за один запрос."""
+    session_id: str
+    items: list[DocumentAssignItem] = Field(min_length=1, max_length=1000)
+
+
 class DocumentOut(BaseModel):
     """Базовая схема для представления документа."""
     id: int
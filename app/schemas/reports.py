@@ -43,4 +43,23 @@ class ReportRowOut(BaseModel):
     station_object: str | None
     username: str
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ReportPageOut(BaseModel):
+    """Страница отчета с курсором на следующую страницу (None — страниц больше нет)."""
+    items: list[ReportRowOut]
+    next_cursor: str | None
+
+
+class ExportJobOut(BaseModel):
+    """Состояние фоновой выгрузки отчета."""
+    id: str
+    status: str
+    format: str
+    processed: int
+    total: int | None
+    progress: float
+    error: str | None
+    created_at: datetime
+    finished_at: datetime | None
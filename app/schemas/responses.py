@@ -21,3 +21,22 @@ class CreatedDocumentInfo(BaseModel):
 class AssignNumberOut(BaseModel):
     created: CreatedDocumentInfo
     message: str
+
+
+class AssignedDocumentInfo(BaseModel):
+    id: int
+    numeric: int
+    formatted_no: str
+    doc_name: str
+    note: str | None
+    reg_date: datetime
+
+
+class AssignBatchOut(BaseModel):
+    """Документы, созданные одним запросом; оборудование и пользователь у всех общие."""
+    created: list[AssignedDocumentInfo]
+    equipment: EquipmentOut
+    user: UserInResponse
+    message: str
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+from app.schemas.reports import ReportRowOut
+
+
+class SearchHighlightOut(BaseModel):
+    """Фрагменты с найденными словами, обернутыми в <mark>...</mark>."""
+    doc_name: str
+    note: str
+    equipment: str
+
+
+class SearchHitOut(ReportRowOut):
+    rank: float
+    highlight: SearchHighlightOut
+
+
+class SearchPageOut(BaseModel):
+    total: int
+    items: list[SearchHitOut]
@@ -9,6 +9,8 @@ from app.repositories.sessions import SessionsRepository
 from app.repositories.audit import AuditRepository
 from app.repositories.equipment import EquipmentRepository
 from app.repositories.users import UsersRepository
+from app.repositories.doc_name_usage import DocNameUsageRepository
+from app.services.suggest_index import suggest_index, EQUIPMENT_FIELDS
 from app.utils.numbering import format_doc_no, is_golden
 from app.schemas.admin import AdminDocumentUpdate
 
@@ -22,6 +24,7 @@ class DocumentsService:
         self.audit_repo = AuditRepository(session)
         self.equipment_repo = EquipmentRepository(session)
         self.users_repo = UsersRepository(session)
+        self.usage_repo = DocNameUsageRepository(session)
 
     async def assign_one(self, *, session_id: str, user_id: int, doc_name: str, note: str | None, is_admin: bool,
                          numeric: int) -> dict:
@@ -69,13 +72,17 @@ class DocumentsService:
                 }
             )
             await self.numbers_repo.mark_assigned([numeric])
+            # статистика подсказок обновляется в той же транзакции
+            equipment = await self.equipment_repo.get(doc.equipment_id)
+            await self.usage_repo.add_context_uses([(equipment.station_object, equipment.eq_type, doc.doc_name, None)])
+            await self.usage_repo.add_user_uses([(user_id, doc.doc_name, None)])
             await self.session.commit()
+            suggest_index.add_document(doc.doc_name)
 
             print(f"   - УСПЕХ: Документ с номером {numeric} создан и закоммичен.")
             print(f"<- assign_one_service: Успешное завершение.")
             print("=" * 50 + "\n")
 
-            equipment = await self.equipment_repo.get(doc.equipment_id)
             user = await self.users_repo.get(doc.user_id)
 
             return {
@@ -97,6 +104,79 @@ class DocumentsService:
             await self.session.rollback()
             raise ValueError("Такой документ уже зарегистрирован для данного объекта.")
 
+    async def assign_batch(self, *, session_id: str, user_id: int, is_admin: bool, items: list[dict]) -> dict:
+        """
+        Назначение нескольких номеров сессии в одной транзакции: одна проверка набора зарезервированных номеров,
+        один многострочный INSERT документов, один mark_assigned и один коммит.
+        Всё или ничего: при ошибке хотя бы в одной позиции ничего не создается, ошибки возвращаются по номерам.
+        """
+        session_obj = await self.sessions_repo.get(session_id)
+        if not session_obj:
+            return {"created": None, "message": "Сессия не найдена.", "errors": []}
+
+        numerics = [item["numeric"] for item in items]
+        reserved = await self.numbers_repo.lock_reserved_for_session(session_id, numerics)
+
+        errors = []
+        seen: set[int] = set()
+        for numeric in numerics:
+            if numeric in seen:
+                errors.append({"numeric": numeric, "error": "Номер повторяется в запросе."})
+            elif numeric not in reserved:
+                errors.append({"numeric": numeric, "error": "Номер не найден или уже назначен в текущей сессии."})
+            elif is_golden(numeric) and not is_admin:
+                errors.append({"numeric": numeric, "error": "Номер является 'золотым' и недоступен для назначения."})
+            seen.add(numeric)
+        if errors:
+            await self.session.rollback()
+            return {"created": None, "message": "Номера не назначены: есть ошибки в позициях.", "errors": errors}
+
+        rows = await self.docs_repo.create_many([
+            {
+                "numeric": item["numeric"],
+                "doc_name": item["doc_name"],
+                "note": item["note"],
+                "equipment_id": session_obj.equipment_id,
+                "user_id": user_id,
+            }
+            for item in items
+        ])
+        if len(rows) < len(items):
+            # конфликт с уже зарегистрированным документом или повтор (наименование, примечание) внутри запроса
+            await self.session.rollback()
+            created = {row.numeric for row in rows}
+            duplicates = [format_doc_no(n) for n in numerics if n not in created]
+            raise ValueError(f"Такие документы уже зарегистрированы для данного объекта: {', '.join(duplicates)}.")
+
+        await self.numbers_repo.mark_assigned(numerics)
+        equipment = await self.equipment_repo.get(session_obj.equipment_id)
+        await self.usage_repo.add_context_uses(
+            [(equipment.station_object, equipment.eq_type, item["doc_name"], None) for item in items]
+        )
+        await self.usage_repo.add_user_uses([(user_id, item["doc_name"], None) for item in items])
+        await self.session.commit()
+        for item in items:
+            suggest_index.add_document(item["doc_name"])
+
+        user = await self.users_repo.get(user_id)
+        by_numeric = {item["numeric"]: item for item in items}
+        return {
+            "created": [
+                {
+                    "id": row.id,
+                    "numeric": row.numeric,
+                    "formatted_no": format_doc_no(row.numeric),
+                    "doc_name": by_numeric[row.numeric]["doc_name"],
+                    "note": by_numeric[row.numeric]["note"],
+                    "reg_date": row.reg_date,
+                }
+                for row in sorted(rows, key=lambda r: r.numeric)
+            ],
+            "equipment": equipment,
+            "user": user,
+            "message": f"Создано документов: {len(rows)}.",
+        }
+
     async def edit_document_admin(self, *, document_id: int, username: str, data: AdminDocumentUpdate) -> dict:
         """
         Обновляет данные документа и связанного с ним оборудования,
@@ -111,6 +191,8 @@ class DocumentsService:
             raise ValueError("Связанное оборудование для документа не найдено.")
 
         changed = {}
+        old_doc_name = doc.doc_name
+        old_equipment = {field: getattr(equipment, field) for field in EQUIPMENT_FIELDS}
 
         # 1. Проверяем изменения в полях документа (Document)
         if data.doc_name is not None and data.doc_name != doc.doc_name:
@@ -158,6 +240,12 @@ class DocumentsService:
             raise ValueError("Такой документ уже зарегистрирован (конфликт уникальности).")
 
         await self.audit_repo.add(document_id=doc.id, doc_number=doc.numeric, username=username, diff=changed)
+        new_equipment = {field: getattr(equipment, field) for field in EQUIPMENT_FIELDS}
         await self.session.commit()
 
+        if doc.doc_name != old_doc_name:
+            suggest_index.rename_document(old_doc_name, doc.doc_name)
+        if new_equipment != old_equipment:
+            suggest_index.update_equipment(old_equipment, new_equipment)
+
         return {"message": "Изменения сохранены.", "diff": changed}
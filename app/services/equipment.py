@@ -6,6 +6,7 @@ from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
 
 from app.repositories.equipment import EquipmentRepository
+from app.services.suggest_index import suggest_index, EQUIPMENT_FIELDS
 from app.models.equipment import Equipment
 
 
@@ -32,6 +33,7 @@ class EquipmentService:
             eq = await self.repo.create(data)
             await self.session.commit()
             await self.session.refresh(eq)
+            suggest_index.add_equipment({field: getattr(eq, field) for field in EQUIPMENT_FIELDS})
             return eq
         except IntegrityError:
             await self.session.rollback()
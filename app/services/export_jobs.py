@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.services.reports import ReportsService
+from app.utils.export_cache import export_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+@dataclass
+class ExportJob:
+    id: str
+    user_id: int
+    fmt: str
+    filters: dict
+    status: ExportJobStatus = ExportJobStatus.queued
+    total: int | None = None
+    processed: int = 0
+    path: str | None = None
+    error: str | None = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: datetime | None = None
+
+    @property
+    def progress(self) -> float:
+        if self.status == ExportJobStatus.done:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return min(self.processed / self.total, 1.0)
+
+
+class ExportJobManager:
+    """
+    Очередь фоновых выгрузок отчетов внутри воркера uvicorn: POST ставит задачу в asyncio.Queue,
+    workers задач-исполнителей собирают файлы (тяжелая работа writer'ов идет в потоках),
+    а клиент опрашивает прогресс и скачивает готовый файл. Задачи живут в памяти процесса,
+    завершенные удаляются через ttl_seconds вместе с файлом, если он не принадлежит кешу выгрузок.
+    """
+
+    def __init__(self, workers: int, ttl_seconds: int):
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self._jobs: dict[str, ExportJob] = {}
+        self._queue: asyncio.Queue[str] | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+
+    def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        if self._tasks:
+            return
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("Export jobs: %d workers started", self.workers)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, *, user_id: int, fmt: str, filters: dict) -> ExportJob:
+        if self._queue is None:
+            raise RuntimeError("Очередь выгрузок не запущена.")
+        job = ExportJob(id=uuid.uuid4().hex, user_id=user_id, fmt=fmt, filters=filters)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> ExportJob | None:
+        return self._jobs.get(job_id)
+
+    def purge_finished(self, now: datetime | None = None) -> int:
+        now = now or datetime.utcnow()
+        expired = [
+            job for job in self._jobs.values()
+            if job.finished_at and now - job.finished_at >= timedelta(seconds=self.ttl_seconds)
+        ]
+        for job in expired:
+            del self._jobs[job.id]
+            if job.path and not export_cache.owns(job.path):
+                try:
+                    os.remove(job.path)
+                except FileNotFoundError:
+                    pass
+        return len(expired)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job is not None:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ExportJob) -> None:
+        job.status = ExportJobStatus.running
+
+        def on_progress(done: int) -> None:
+            job.processed = done
+
+        try:
+            async with self._session_factory() as session:
+                svc = ReportsService(session)
+                job.total = await svc.count_extended(**job.filters)
+                job.path = await svc.export_extended(job.fmt, progress=on_progress, **job.filters)
+            job.status = ExportJobStatus.done
+        except Exception as e:
+            logger.exception("Export job %s failed", job.id)
+            job.status = ExportJobStatus.failed
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+
+export_jobs = ExportJobManager(workers=settings.export_job_workers, ttl_seconds=settings.export_job_ttl_seconds)
@@ -1,20 +1,30 @@
 from __future__ import annotations
 
-from datetime import datetime
-
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from openpyxl import load_workbook
 
+from app.core.config import settings
+from app.core.executor import cpu_executor, io_executor
+from app.models.import_run import ImportRun, ImportRunStatus
 from app.repositories.documents import DocumentsRepository
 from app.repositories.equipment import EquipmentRepository
 from app.repositories.users import UsersRepository
 from app.repositories.doc_numbers import DocNumbersRepository
 from app.repositories.counter import CounterRepository
-from app.models.doc_number import DocNumStatus
+from app.repositories.import_runs import ImportRunsRepository
+from app.repositories.doc_name_usage import DocNameUsageRepository
+from app.services.suggest_index import suggest_index
+from app.utils.import_rows import ImportRow, read_import_rows
+from app.utils.uploads import file_sha256
 
 
 class ExcelImporterService:
+    """
+    Пакетный импорт журнала из Excel: книга разбирается в процессном пуле (read_only), затем строки
+    обрабатываются чанками по IMPORT_CHUNK_SIZE. На чанк — по одному запросу на пользователей, оборудование,
+    документы и doc_numbers и отдельный коммит вместе с контрольной точкой в import_runs,
+    поэтому ошибка в одной строке не откатывает весь файл, а сбой не заставляет начинать сначала.
+    """
+
     def __init__(self, session: AsyncSession):
         self.session = session
         self.docs_repo = DocumentsRepository(session)
@@ -22,102 +32,132 @@ class ExcelImporterService:
         self.users_repo = UsersRepository(session)
         self.docnums_repo = DocNumbersRepository(session)
         self.counter_repo = CounterRepository(session)
+        self.runs_repo = ImportRunsRepository(session)
+        self.usage_repo = DocNameUsageRepository(session)
 
-    async def import_file(self, path: str) -> dict:
-        wb = load_workbook(filename=path)
-        ws = wb.active
-        # Ожидаемые заголовки:
-        # № документа | Дата регистрации | Наименование документа | Примечание |
-        # Тип оборудования | № заводской | № заказа | Маркировка | № станционный | Станция / Объект |
-        # Фамилия | Имя | Отчество | Отдел | Имя пользователя в системе
-        headers = [cell.value for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-        col = {h: i for i, h in enumerate(headers)}
-
-        max_numeric = 0
-        created = 0
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            doc_no = row[col["№ документа"]]
-            if not doc_no:
-                continue
-            numeric = int(str(doc_no).split("-")[-1])
-            reg_date = row[col["Дата регистрации"]]
-            if isinstance(reg_date, str):
-                try:
-                    reg_date = datetime.strptime(reg_date, "%d.%m.%Y")
-                except Exception:
-                    try:
-                        reg_date = datetime.fromisoformat(reg_date)
-                    except Exception:
-                        reg_date = datetime.now()
-            doc_name = row[col["Наименование документа"]]
-            note = row[col["Примечание"]]
-            eq_type = row[col["Тип оборудования"]]
-            factory_no = row[col["№ заводской"]]
-            order_no = row[col["№ заказа"]]
-            label = row[col["Маркировка"]]
-            station_no = row[col["№ станционный"]]
-            station_object = row[col["Станция / Объект"]]
-            last_name = row[col.get("Фамилия", None)] if "Фамилия" in col else None
-            first_name = row[col.get("Имя", None)] if "Имя" in col else None
-            middle_name = row[col.get("Отчество", None)] if "Отчество" in col else None
-            department = row[col.get("Отдел", None)] if "Отдел" in col else None
-            username = row[col.get("Имя пользователя в системе", None)] if "Имя пользователя в системе" in col else None
-            username = username or "import"
-
-            # user
-            user = await self.users_repo.get_by_username(username)
-            if not user:
-                user = await self.users_repo.create(username)
-                user.last_name = last_name
-                user.first_name = first_name
-                user.middle_name = middle_name
-                user.department = department
-
-            # equipment (по совокупности полей считаем "одинаковым")
-            res = await self.session.execute(
-                select(self.eq_repo.session.get_bind().mapper.mapped_table)
-            )
-            # упрощенно: создаем всегда новую запись оборудования по данным строки
-            eq = await self.eq_repo.create(
-                {
-                    "eq_type": eq_type or "N/A",
-                    "factory_no": factory_no,
-                    "order_no": order_no,
-                    "label": label,
-                    "station_no": station_no,
-                    "station_object": station_object,
-                    "notes": None,
-                }
-            )
-
-            # document
-            doc = await self.docs_repo.create(
-                {
-                    "numeric": numeric,
-                    "reg_date": reg_date,
-                    "doc_name": doc_name or "",
-                    "note": note or "",
-                    "equipment_id": eq.id,
-                    "user_id": user.id,
-                }
-            )
-
-            # doc_numbers mark as assigned
-            from app.models.doc_number import DocNumber
-            dn = DocNumber(
-                numeric=numeric,
-                is_golden=(numeric % 100 == 0),
-                status=DocNumStatus.assigned,
-                reserved_by=None,
-                session_id=None,
-                assigned_at=reg_date,
-            )
-            self.session.add(dn)
-
-            max_numeric = max(max_numeric, numeric)
-            created += 1
-
-        if max_numeric > 0:
-            await self.counter_repo.set_after_import(max_numeric + 1)
+    async def import_file(self, path: str, file_hash: str | None = None) -> dict:
+        """
+        Импорт с контрольными точками: после каждого чанка в той же транзакции фиксируется смещение в import_runs.
+        Повторный запуск того же файла (по sha256) продолжает с последнего закоммиченного чанка,
+        а уже завершенный импорт сразу возвращает прежний результат.
+        """
+        file_hash = file_hash or await io_executor.run(file_sha256, path)
+        run = await self.runs_repo.get_by_hash(file_hash)
+        if run is not None and run.status == ImportRunStatus.completed:
+            return {**self._result(run), "duplicate": True}
+
+        rows, parse_errors = await cpu_executor.run(read_import_rows, path)
+        rows = self._drop_duplicate_numbers(rows, parse_errors)
+        run = await self.runs_repo.start(file_hash, len(rows), parse_errors)
         await self.session.commit()
-        return {"imported": created, "next_start": max_numeric + 1 if max_numeric > 0 else 1}
+        run_id, resumed_from = run.id, run.processed_rows
+
+        chunk_size = settings.import_chunk_size
+        chunk_no = await self.runs_repo.count_chunks(run)
+        try:
+            for start in range(run.processed_rows, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                errors: list[dict] = []
+                inserted = await self._import_chunk(chunk, errors)
+                await self.runs_repo.checkpoint(
+                    run, chunk_no=chunk_no, row_offset=start, row_count=len(chunk), imported=inserted, errors=errors
+                )
+                await self.session.commit()
+                chunk_no += 1
+
+            if run.max_numeric > 0:
+                await self.counter_repo.set_after_import(run.max_numeric + 1)
+            await self.runs_repo.finish(run_id, ImportRunStatus.completed)
+            await self.session.commit()
+            # импорт пишет в обход DocumentsService — индекс автодополнения перестраивается целиком
+            suggest_index.reload()
+        except Exception:
+            await self.session.rollback()
+            # закоммиченные чанки остаются, повторная загрузка файла продолжит с run.processed_rows
+            await self.runs_repo.finish(run_id, ImportRunStatus.failed)
+            await self.session.commit()
+            raise
+
+        return {**self._result(run), "resumed_from_row": resumed_from}
+
+    @staticmethod
+    def _result(run: ImportRun) -> dict:
+        return {
+            "imported": run.imported,
+            "next_start": run.max_numeric + 1 if run.max_numeric > 0 else 1,
+            "errors": sorted(run.errors, key=lambda e: e["row"]),
+        }
+
+    async def _import_chunk(self, chunk: list[ImportRow], errors: list[dict]) -> set[int]:
+        """Импортирует чанк; возвращает номера вставленных документов, отклоненные строки пишет в errors."""
+        user_ids = await self.users_repo.get_or_create_many({
+            # для новых пользователей берем ФИО из первой строки с этим именем
+            row.username: {
+                "last_name": row.last_name, "first_name": row.first_name,
+                "middle_name": row.middle_name, "department": row.department,
+            }
+            for row in reversed(chunk)
+        })
+        equipment_ids = await self._resolve_equipment(chunk)
+
+        inserted = await self.docs_repo.insert_many([
+            {
+                "numeric": row.numeric,
+                "reg_date": row.reg_date,
+                "doc_name": row.doc_name,
+                "note": row.note,
+                "equipment_id": equipment_ids[row.equipment_key],
+                "user_id": user_ids[row.username.lower()],
+            }
+            for row in chunk
+        ])
+        await self.docnums_repo.upsert_assigned([(row.numeric, row.reg_date) for row in chunk if row.numeric in inserted])
+        imported_rows = [row for row in chunk if row.numeric in inserted]
+        await self.usage_repo.add_context_uses(
+            [(row.station_object, row.eq_type, row.doc_name, row.reg_date) for row in imported_rows]
+        )
+        await self.usage_repo.add_user_uses(
+            [(user_ids[row.username.lower()], row.doc_name, row.reg_date) for row in imported_rows]
+        )
+
+        for row in chunk:
+            if row.numeric not in inserted:
+                errors.append({
+                    "row": row.row_no,
+                    "error": f"Документ {row.numeric} не импортирован: такой номер или "
+                             f"документ с тем же наименованием и оборудованием уже есть в журнале",
+                })
+        return inserted
+
+    async def _resolve_equipment(self, chunk: list[ImportRow]) -> dict[tuple, int]:
+        by_factory_no: dict[str, dict] = {}
+        without_factory_no: dict[tuple, dict] = {}
+        for row in chunk:
+            data = {
+                "eq_type": row.eq_type, "factory_no": row.factory_no, "order_no": row.order_no, "label": row.label,
+                "station_no": row.station_no, "station_object": row.station_object, "notes": None,
+            }
+            if row.factory_no:
+                by_factory_no.setdefault(row.factory_no, data)
+            else:
+                without_factory_no.setdefault(row.equipment_key, data)
+
+        ids = {
+            ("factory_no", factory_no): id_
+            for factory_no, id_ in (await self.eq_repo.get_or_create_by_factory_no(by_factory_no)).items()
+        }
+        new_ids = await self.eq_repo.create_many(list(without_factory_no.values()))
+        ids.update(zip(without_factory_no.keys(), new_ids))
+        return ids
+
+    @staticmethod
+    def _drop_duplicate_numbers(rows: list[ImportRow], errors: list[dict]) -> list[ImportRow]:
+        seen: set[int] = set()
+        unique = []
+        for row in rows:
+            if row.numeric in seen:
+                errors.append({"row": row.row_no, "error": f"Номер {row.numeric} повторяется в файле"})
+                continue
+            seen.add(row.numeric)
+            unique.append(row)
+        return unique
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.repositories.counter import claim_counter_block
+from app.repositories.doc_numbers import DocNumbersRepository
+
+logger = logging.getLogger(__name__)
+
+
+class NumberBlockPool:
+    """
+    Заранее захваченный блок обычных (не "золотых") номеров одного воркера uvicorn.
+    Резервирование берет номера из памяти, блок дозаполняется в фоне, а неиспользованные
+    номера возвращаются в пул released при остановке воркера или по истечении TTL своего блока.
+    Номера, выданные в транзакцию, которая не закоммитилась, возвращаются в блок через put_back().
+    """
+
+    def __init__(self, block_size: int, low_water: int, ttl_seconds: int):
+        self.block_size = block_size
+        self.low_water = low_water
+        self.ttl_seconds = ttl_seconds
+        # номер и время захвата его блока
+        self._numbers: deque[tuple[int, datetime]] = deque()
+        self._bind: AsyncEngine | None = None
+        self._lock = asyncio.Lock()
+        self._refill_task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    async def take(self, bind: AsyncEngine, count: int) -> list[int]:
+        self._bind = bind
+        async with self._lock:
+            if len(self._numbers) < count:
+                await self._claim(max(self.block_size, count - len(self._numbers)))
+            taken = [self._numbers.popleft()[0] for _ in range(count)]
+        if len(self._numbers) < self.low_water:
+            self._schedule_refill()
+        return taken
+
+    def put_back(self, numbers: list[int]) -> None:
+        """
+        Возвращает в начало блока номера, выданные take(), если резервирующая транзакция не закоммитилась:
+        в doc_numbers они не попали, и без возврата счетчик ушел бы вперед мимо них.
+        TTL для них отсчитывается заново.
+        """
+        now = datetime.utcnow()
+        self._numbers.extendleft((number, now) for number in sorted(numbers, reverse=True))
+
+    async def release_unused(self) -> int:
+        """Возвращает все номера блока в пул released."""
+        async with self._lock:
+            numbers = [number for number, _ in self._numbers]
+            self._numbers.clear()
+        return await self._release(numbers)
+
+    async def release_stale(self, now: datetime | None = None) -> int:
+        """Возвращает в пул released номера блоков, захваченных раньше TTL; более свежие блоки остаются."""
+        deadline = (now or datetime.utcnow()) - timedelta(seconds=self.ttl_seconds)
+        async with self._lock:
+            stale = [number for number, claimed_at in self._numbers if claimed_at <= deadline]
+            if stale:
+                self._numbers = deque(item for item in self._numbers if item[1] > deadline)
+        return await self._release(stale)
+
+    async def _release(self, numbers: list[int]) -> int:
+        if not numbers or self._bind is None:
+            return 0
+        async with AsyncSession(bind=self._bind) as session:
+            released = await DocNumbersRepository(session).release_numbers(numbers)
+            await session.commit()
+        logger.info("Number block: %d unused numbers returned to the released pool", released)
+        return released
+
+    async def _claim(self, count: int) -> None:
+        numbers = await claim_counter_block(self._bind, count, skip_golden=True)
+        claimed_at = datetime.utcnow()
+        self._numbers.extend((number, claimed_at) for number in numbers)
+
+    def _schedule_refill(self) -> None:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        try:
+            async with self._lock:
+                if len(self._numbers) < self.low_water:
+                    await self._claim(self.block_size)
+        except Exception:
+            logger.exception("Number block refill failed")
+
+
+number_blocks = NumberBlockPool(
+    block_size=settings.number_block_size,
+    low_water=settings.number_block_low_water,
+    ttl_seconds=settings.default_ttl_seconds,
+)
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.core.executor import cpu_executor
 from app.repositories.reports import ReportsRepository
 from app.utils.numbering import format_doc_no
-from app.utils.excel import ReportExcelBuilder
+from app.utils.excel import ReportExcelBuilder, StreamingExcelWriter, REPORT_EXTENDED
+from app.utils.export_cache import export_cache
+from app.utils.exports import CsvExportWriter, ParquetExportWriter, EXTENDED_PARQUET_SCHEMA
+from app.utils.pagination import encode_cursor, decode_cursor
 
 
 class ReportsService:
@@ -73,46 +79,93 @@ class ReportsService:
             station_objects, station_no, label, factory_no, order_no, date_from, date_to, doc_name=doc_name,
             username=username
         )
-        payload = []
-        for (
-                numeric, reg_date, doc_name, note,
-                eq_type, factory_no, order_no,
-                label, station_no, station_object,
-                username,
-        ) in rows:
-            payload.append(
-                {
-                    "doc_no": format_doc_no(numeric),
-                    "numeric": numeric,
-                    "reg_date": reg_date.strftime('%d.%m.%Y %H:%M') if reg_date else '',
-                    "doc_name": doc_name,
-                    "note": note,
-                    "eq_type": eq_type,
-                    "factory_no": factory_no,
-                    "order_no": order_no,
-                    "label": label,
-                    "station_no": station_no,
-                    "station_object": station_object,
-                    "username": username,
-                }
-            )
-        return payload
+        return [self._extended_row(row) for row in rows]
+
+    async def get_page_extended(self, *, limit: int, cursor: str | None = None, **filters) -> dict:
+        """Страница отчета с keyset-пагинацией по (reg_date, numeric)."""
+        after = decode_cursor(cursor) if cursor else None
+        rows = await self.repo.fetch_extended(**filters, after=after, limit=limit + 1)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].reg_date, rows[-1].numeric) if has_more else None
+        return {"items": [self._extended_row(row) for row in rows], "next_cursor": next_cursor}
+
+    async def stream_rows_extended(self, *, raw_dates: bool = False, **filters) -> AsyncIterator[dict]:
+        """
+        Потоковая выдача строк отчета без накопления всего результата в памяти.
+        raw_dates=True оставляет reg_date datetime'ом — для типизированных выгрузок (CSV, Parquet).
+        """
+        async for row in self.repo.stream_extended(**filters):
+            yield self._extended_row(row, raw_dates=raw_dates)
+
+    @staticmethod
+    def _extended_row(row, raw_dates: bool = False) -> dict:
+        (
+            numeric, reg_date, doc_name, note,
+            eq_type, factory_no, order_no,
+            label, station_no, station_object,
+            username,
+        ) = row
+        return {
+            "doc_no": format_doc_no(numeric),
+            "numeric": numeric,
+            "reg_date": reg_date if raw_dates else (reg_date.strftime('%d.%m.%Y %H:%M') if reg_date else ''),
+            "doc_name": doc_name,
+            "note": note,
+            "eq_type": eq_type,
+            "factory_no": factory_no,
+            "order_no": order_no,
+            "label": label,
+            "station_no": station_no,
+            "station_object": station_object,
+            "username": username,
+        }
 
     async def export_excel(self, station_objects: list[str] | None, date_from, date_to) -> str:
         data = await self.get_rows(station_objects, date_from, date_to)
-        builder = ReportExcelBuilder()
-        path = builder.build_report(data)
-        return path
+        # книга строится целиком, поэтому в процессном пуле: ни GIL, ни цикл событий она не занимает
+        return await cpu_executor.run(ReportExcelBuilder().build_report, data)
 
     async def export_excel_extended(self, station_objects: list[str] | None, station_no: str | None, label: str | None,
                                     factory_no: str | None, order_no: str | None, date_from, date_to,
                                     doc_name: str | None = None, username: str | None = None) -> str:
-        """Экспорт в Excel с расширенными фильтрами"""
-        data = await self.get_rows_extended(station_objects, station_no, label, factory_no, order_no, date_from,
-                                            date_to, doc_name=doc_name, username=username)
-        builder = ReportExcelBuilder()
-        path = builder.build_report_extended(data)
-        return path
+        """Экспорт в Excel с расширенными фильтрами: строки идут из серверного курсора прямо в write_only-книгу"""
+        rows = self.stream_rows_extended(
+            station_objects=station_objects, station_no=station_no, label=label, factory_no=factory_no,
+            order_no=order_no, date_from=date_from, date_to=date_to, doc_name=doc_name, username=username,
+        )
+        return await StreamingExcelWriter(REPORT_EXTENDED).write(rows)
+
+    async def count_extended(self, **filters) -> int:
+        return await self.repo.count_extended(**filters)
+
+    async def export_extended(self, fmt: str = "xlsx", *, progress: Callable[[int], None] | None = None,
+                              **filters) -> str:
+        """
+        Экспорт отчета с расширенными фильтрами в xlsx, csv или parquet.
+        Повторный запрос с теми же фильтрами при неизменных данных отдается из кеша на диске.
+        progress, если задан, вызывается с числом уже выгруженных строк.
+        """
+        if not settings.export_cache_enabled:
+            return await self._build_export(fmt, progress, **filters)
+        key = export_cache.key(fmt, filters, await self.repo.data_version())
+        cached = export_cache.get(key, fmt)
+        if cached:
+            return cached
+        return export_cache.put(key, fmt, await self._build_export(fmt, progress, **filters))
+
+    async def _build_export(self, fmt: str, progress: Callable[[int], None] | None, **filters) -> str:
+        """Собирает файл выгрузки; все форматы читают строки из серверного курсора."""
+        rows = self.stream_rows_extended(raw_dates=fmt != "xlsx", **filters)
+        if progress is not None:
+            rows = _with_progress(rows, progress)
+        if fmt == "xlsx":
+            return await StreamingExcelWriter(REPORT_EXTENDED).write(rows)
+        if fmt == "csv":
+            return await CsvExportWriter(REPORT_EXTENDED).write(rows)
+        if fmt == "parquet":
+            return await ParquetExportWriter(REPORT_EXTENDED, EXTENDED_PARQUET_SCHEMA).write(rows)
+        raise ValueError(f"Неподдерживаемый формат экспорта: {fmt}")
 
     async def get_rows_extended_admin(self, station_objects: list[str] | None, station_no: str | None,
                                       label: str | None, factory_no: str | None, order_no: str | None,
@@ -151,9 +204,18 @@ class ReportsService:
         """Экспорт в Excel для админов с расширенными фильтрами"""
         data = await self.get_rows_extended_admin(station_objects, station_no, label, factory_no, order_no, username,
                                                   date_from, date_to, eq_type, doc_name=doc_name)
-        builder = ReportExcelBuilder()
-        path = builder.build_report_extended_admin(data)
-        return path
+        return await cpu_executor.run(ReportExcelBuilder().build_report_extended_admin, data)
+
+
+async def _with_progress(rows: AsyncIterator[dict], progress: Callable[[int], None],
+                         every: int = 1000) -> AsyncIterator[dict]:
+    done = 0
+    async for row in rows:
+        yield row
+        done += 1
+        if done % every == 0:
+            progress(done)
+    progress(done)
 
 
 def start_of_week(dt: datetime | None = None) -> datetime:
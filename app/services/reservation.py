@@ -2,15 +2,17 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 
-from sqlalchemy import update, select
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.doc_number import DocNumber, DocNumStatus
 from app.models.session import SessionStatus, Session
 from app.repositories.counter import CounterRepository
 from app.repositories.doc_numbers import DocNumbersRepository
 from app.repositories.sessions import SessionsRepository
-from app.utils.numbering import is_golden
+from app.services.number_blocks import number_blocks
+from app.utils.numbering import is_golden, next_golden, MAX_GOLDEN
 
 
 class ReservationService:
@@ -19,43 +21,55 @@ class ReservationService:
         self.sessions_repo = SessionsRepository(session)
         self.numbers_repo = DocNumbersRepository(session)
         self.counter_repo = CounterRepository(session)
+        # номера, взятые из блока воркера в текущей транзакции
+        self._block_numbers: list[int] = []
 
     async def reserve_golden_numbers(self, *, user_id: int, equipment_id: int, quantity: int, ttl_seconds: int) -> \
     tuple[str, list[int]]:
-        candidates = await self._find_free_golden_numbers(quantity)
-
-        if len(candidates) < quantity:
-            raise ValueError(f"Не удалось найти {quantity} свободных 'золотых' номеров.")
-
         sess = await self.sessions_repo.create(
-            user_id=user_id, equipment_id=equipment_id, requested_count=len(candidates), ttl_seconds=ttl_seconds
+            user_id=user_id, equipment_id=equipment_id, requested_count=quantity, ttl_seconds=ttl_seconds
         )
-        reserved = await self.numbers_repo.reserve_specific_numbers(candidates, user_id, sess.id, ttl_seconds)
+        reserved = await self._reserve_golden(quantity, user_id=user_id, session_id=sess.id, ttl_seconds=ttl_seconds)
 
         await self.session.commit()
         return sess.id, reserved
 
     async def start_session(self, *, user_id: int, equipment_id: int, requested_count: int, ttl_seconds: int) -> tuple[
         str, list[int]]:
-        sess = await self.sessions_repo.create(
-            user_id=user_id, equipment_id=equipment_id, requested_count=requested_count, ttl_seconds=ttl_seconds
-        )
-        reserved = await self._reserve_for_session(
-            session_id=sess.id, user_id=user_id, count=requested_count, ttl_seconds=ttl_seconds, is_admin=False
-        )
-        await self.session.commit()
+        try:
+            sess = await self.sessions_repo.create(
+                user_id=user_id, equipment_id=equipment_id, requested_count=requested_count, ttl_seconds=ttl_seconds
+            )
+            reserved = await self._reserve_for_session(
+                session_id=sess.id, user_id=user_id, count=requested_count, ttl_seconds=ttl_seconds, is_admin=False
+            )
+            await self.session.commit()
+        except BaseException:
+            self._return_block_numbers()
+            raise
+        self._block_numbers = []
         return sess.id, reserved
 
+    def _return_block_numbers(self) -> None:
+        """Транзакция не прошла (ошибка, отмена запроса): номера из блока воркера не попали в БД."""
+        if self._block_numbers:
+            number_blocks.put_back(self._block_numbers)
+            self._block_numbers = []
+
     async def _reserve_for_session(self, *, session_id: str, user_id: int, count: int, is_admin: bool,
                                    ttl_seconds: int) -> list[int]:
-        await self.numbers_repo.release_expired()
-        counter = await self.counter_repo.get_for_update()
+        lazy_expiry = settings.reservation_lazy_expiry
+        claim_mode = settings.number_allocator != "lock"
+        if not lazy_expiry:
+            await self.numbers_repo.release_expired()
+        # в режиме claim строка счетчика не блокируется до коммита: новые номера выделяются блоком
+        counter = await (self.counter_repo.get() if claim_mode else self.counter_repo.get_for_update())
         base_start = counter.base_start
         reserved_total: list[int] = []
 
-        # 1) released pool
+        # 1) released pool (+ просроченные резервы в ленивом режиме)
         released_pick = await self.numbers_repo.fetch_released_for_update(
-            base_start=base_start, limit=count, skip_golden=not is_admin
+            base_start=base_start, limit=count, skip_golden=not is_admin, include_expired=lazy_expiry
         )
         if released_pick:
             reserved = await self.numbers_repo.reserve_existing(released_pick, user_id, session_id, ttl_seconds)
@@ -63,25 +77,40 @@ class ReservationService:
 
         need_more = count - len(reserved_total)
         if need_more > 0:
-            # 2) generate new
+            # 2) generate new: один INSERT ... ON CONFLICT на пачку, занятые номера добираем следующей пачкой
             candidate = max(counter.next_normal_start, base_start)
-            new_candidates: list[int] = []
-            while len(new_candidates) < need_more:
-                if not is_admin and is_golden(candidate):
-                    candidate += 1
-                    continue
-                new_candidates.append(candidate)
-                candidate += 1
-            # записываем новые номера
-            reserved = await self.numbers_repo.create_and_reserve_new(
-                new_candidates, user_id=user_id, session_id=session_id, ttl_seconds=ttl_seconds
-            )
-            reserved_total.extend(reserved)
+            while need_more > 0:
+                if settings.number_allocator == "block" and not is_admin:
+                    new_candidates = await number_blocks.take(self.session.bind, need_more)
+                    self._block_numbers.extend(new_candidates)
+                elif claim_mode:
+                    new_candidates = await self.counter_repo.claim_block(need_more, skip_golden=not is_admin)
+                else:
+                    new_candidates, candidate = self._next_candidates(candidate, need_more, is_admin)
+                reserved = await self.numbers_repo.create_and_reserve_new(
+                    new_candidates, user_id=user_id, session_id=session_id, ttl_seconds=ttl_seconds
+                )
+                reserved_total.extend(reserved)
+                need_more -= len(reserved)
             # продвижение next_normal_start
-            counter.next_normal_start = candidate
+            if not claim_mode:
+                counter.next_normal_start = candidate
 
         return sorted(reserved_total)
 
+    @staticmethod
+    def _next_candidates(start: int, count: int, is_admin: bool) -> tuple[list[int], int]:
+        """Возвращает count подряд идущих номеров начиная со start и следующую позицию счетчика."""
+        candidates: list[int] = []
+        candidate = start
+        while len(candidates) < count:
+            if not is_admin and is_golden(candidate):
+                candidate += 1
+                continue
+            candidates.append(candidate)
+            candidate += 1
+        return candidates, candidate
+
     async def add_numbers_to_session(self, *, session_id: str, user_id: int, requested_count: int | None,
                                      numbers: list[int] | None, quantity_golden: int | None = None, is_admin: bool) -> \
             list[int]:
@@ -93,51 +122,56 @@ class ReservationService:
         new_expires_at = datetime.utcnow() + timedelta(seconds=ttl)
         await self.session.execute(update(Session).where(Session.id == session_id).values(expires_at=new_expires_at))
         await self.session.execute(
-            update(DocNumber).where(DocNumber.session_id == session_id).values(expires_at=new_expires_at))
-
-        newly_reserved = []
-        if requested_count:
-            newly_reserved = await self._reserve_for_session(
-                session_id=session_id, user_id=user_id, count=requested_count, ttl_seconds=ttl, is_admin=is_admin
-            )
-        elif numbers:
-            newly_reserved = await self.numbers_repo.reserve_specific_numbers(numbers, user_id, session_id, ttl)
-        elif quantity_golden:
-            if not is_admin:
-                raise ValueError("Только администраторы могут резервировать 'золотые' номера.")
-
-            candidates = await self._find_free_golden_numbers(quantity_golden)
-
-            if len(candidates) < quantity_golden:
-                raise ValueError(f"Не удалось найти {quantity_golden} свободных 'золотых' номеров.")
-
-            newly_reserved = await self.numbers_repo.reserve_specific_numbers(candidates, user_id, session_id, ttl)
-
-        await self.session.commit()
+            update(DocNumber)
+            .where(DocNumber.session_id == session_id, DocNumber.status == DocNumStatus.reserved)
+            .values(expires_at=new_expires_at))
+
+        try:
+            newly_reserved = []
+            if requested_count:
+                newly_reserved = await self._reserve_for_session(
+                    session_id=session_id, user_id=user_id, count=requested_count, ttl_seconds=ttl, is_admin=is_admin
+                )
+            elif numbers:
+                newly_reserved = await self.numbers_repo.reserve_specific_numbers(numbers, user_id, session_id, ttl)
+            elif quantity_golden:
+                if not is_admin:
+                    raise ValueError("Только администраторы могут резервировать 'золотые' номера.")
+
+                newly_reserved = await self._reserve_golden(
+                    quantity_golden, user_id=user_id, session_id=session_id, ttl_seconds=ttl
+                )
+
+            await self.session.commit()
+        except BaseException:
+            self._return_block_numbers()
+            raise
+        self._block_numbers = []
         return newly_reserved
 
-    async def _find_free_golden_numbers(self, quantity: int) -> list[int]:
-        counter = await self.counter_repo.get_for_update()
-
-        start_point = max(counter.next_normal_start, counter.base_start)
-        start_golden = ((start_point + 99) // 100) * 100
-
-        stmt = select(DocNumber.numeric).where(
-            DocNumber.status.in_([DocNumStatus.assigned, DocNumStatus.reserved])
-        )
-        result = await self.session.execute(stmt)
-        occupied_numbers = set(result.scalars().all())
-
-        candidates = []
-        current_check = start_golden
-        while len(candidates) < quantity:
-            if current_check not in occupied_numbers:
-                candidates.append(current_check)
-
-            current_check += 100
-            if current_check > 999900: break
-
-        return candidates
+    async def _reserve_golden(self, quantity: int, *, user_id: int, session_id: str, ttl_seconds: int) -> list[int]:
+        """
+        Резервирует ровно quantity свободных "золотых" номеров или бросает ValueError.
+        В режимах claim/block строка счетчика не блокируется, и параллельный запрос может выбрать тех же
+        кандидатов: reserve_specific_numbers пропускает занятые им номера, а недостача добирается
+        следующими свободными номерами после последнего кандидата.
+        """
+        if settings.number_allocator != "lock":
+            counter = await self.counter_repo.get()
+        else:
+            counter = await self.counter_repo.get_for_update()
+        start = next_golden(max(counter.next_normal_start, counter.base_start))
+        reserved: list[int] = []
+        while len(reserved) < quantity:
+            need = quantity - len(reserved)
+            candidates = await self.numbers_repo.find_free_golden(start, need, stop=MAX_GOLDEN)
+            if len(candidates) < need:
+                raise ValueError(f"Не удалось найти {quantity} свободных 'золотых' номеров.")
+            reserved.extend(
+                await self.numbers_repo.reserve_specific_numbers(candidates, user_id, session_id, ttl_seconds)
+            )
+            start = candidates[-1] + 100
+        return sorted(reserved)
 
     async def cancel_session(self, session_id: str) -> int:
         await self.sessions_repo.set_status(session_id, SessionStatus.cancelled)
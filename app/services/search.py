@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.search import SearchRepository
+from app.utils.numbering import format_doc_no
+
+
+class SearchService:
+    """Полнотекстовый поиск по журналу: наименование и примечание документа плюс поля оборудования."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.repo = SearchRepository(session)
+
+    async def search(self, q: str, limit: int, offset: int) -> dict:
+        rows = await self.repo.search(q, limit=limit, offset=offset)
+        # неполная непустая страница (или пустая первая) — последняя, иначе total считается отдельным count()
+        if len(rows) < limit and (rows or offset == 0):
+            total = offset + len(rows)
+        else:
+            total = await self.repo.count(q)
+        return {
+            "total": total,
+            "items": [
+                {
+                    "doc_no": format_doc_no(r.numeric),
+                    "numeric": r.numeric,
+                    "reg_date": r.reg_date.strftime('%d.%m.%Y %H:%M') if r.reg_date else '',
+                    "doc_name": r.doc_name,
+                    "note": r.note,
+                    "eq_type": r.eq_type,
+                    "factory_no": r.factory_no,
+                    "order_no": r.order_no,
+                    "label": r.label,
+                    "station_no": r.station_no,
+                    "station_object": r.station_object,
+                    "username": r.username,
+                    "rank": r.rank,
+                    "highlight": {
+                        "doc_name": r.doc_name_hl,
+                        "note": r.note_hl,
+                        "equipment": r.equipment_hl,
+                    },
+                }
+                for r in rows
+            ],
+        }
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.executor import io_executor
+from app.repositories.documents import DocumentsRepository
+from app.repositories.equipment import EquipmentRepository
+from app.utils.autocomplete import AutocompleteIndex
+
+logger = logging.getLogger(__name__)
+
+EQUIPMENT_FIELDS = ("eq_type", "factory_no", "order_no", "label", "station_no", "station_object")
+# Поля, подсказки по которым сужаются выбранной станцией/объектом (как в EquipmentRepository.list_distinct)
+STATION_SCOPED_FIELDS = ("station_no", "label")
+
+
+def _build(doc_names: list[tuple[str, int]], equipment_rows: list[tuple]):
+    """Строит индексы из выборки. Выполняется в потоке, чтобы не держать цикл событий на больших журналах."""
+    columns: dict[str, Counter] = {field: Counter() for field in EQUIPMENT_FIELDS}
+    # значения под станцией считаются без учета регистра, как и в общих индексах
+    by_station: dict[str, defaultdict[str, Counter]] = {field: defaultdict(Counter) for field in STATION_SCOPED_FIELDS}
+    station_display: dict[str, dict[str, str]] = {field: {} for field in STATION_SCOPED_FIELDS}
+    for row in equipment_rows:
+        values = dict(zip(EQUIPMENT_FIELDS, row))
+        for field, value in values.items():
+            if value:
+                columns[field][value] += 1
+        if values["station_object"]:
+            station = values["station_object"].casefold()
+            for field in STATION_SCOPED_FIELDS:
+                if values[field]:
+                    key = values[field].casefold()
+                    by_station[field][station][key] += 1
+                    station_display[field].setdefault(key, values[field])
+    return (
+        AutocompleteIndex(doc_names),
+        {field: AutocompleteIndex(counts.items()) for field, counts in columns.items()},
+        by_station,
+        station_display,
+    )
+
+
+class SuggestIndex:
+    """
+    Индекс автодополнения воркера: наименования документов и шесть полей оборудования.
+    Загружается при старте в фоне и дальше обновляется инкрементально из DocumentsService и EquipmentService
+    (после коммита). Пока индекс не готов, ready=False и /suggest идет в БД.
+
+    Индекс у каждого воркера свой: изменения, сделанные через другой воркер, он увидит только после reload()
+    (entrypoint запускает один процесс uvicorn).
+    """
+
+    def __init__(self):
+        self.doc_names: AutocompleteIndex | None = None
+        self.equipment: dict[str, AutocompleteIndex] = {}
+        self._by_station: dict[str, defaultdict[str, Counter]] = {}
+        self._station_display: dict[str, dict[str, str]] = {}
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._load_task: asyncio.Task | None = None
+        # изменения, пришедшие во время загрузки, применяются после подмены индекса
+        self._pending: list[Callable[[], None]] | None = None
+        # reload() во время загрузки: ее выборка могла не увидеть изменений, нужна еще одна
+        self._reload_requested = False
+
+    @property
+    def ready(self) -> bool:
+        return self.doc_names is not None
+
+    def start(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        if not settings.suggest_index_enabled:
+            return
+        self._session_factory = session_factory
+        self.reload()
+
+    async def stop(self) -> None:
+        if self._load_task is not None:
+            self._load_task.cancel()
+            await asyncio.gather(self._load_task, return_exceptions=True)
+            self._load_task = None
+
+    def reload(self) -> None:
+        """
+        Перезагружает индекс из БД в фоне (например, после импорта); прежний индекс работает до подмены.
+        Если загрузка уже идет, после нее запускается еще одна.
+        """
+        if self._session_factory is None:
+            return
+        if self._load_task is not None and not self._load_task.done():
+            self._reload_requested = True
+            return
+        self._load_task = asyncio.create_task(self._load())
+
+    def suggest_doc_names(self, q: str | None, limit: int = 20) -> list[str]:
+        return self.doc_names.search(q, limit)
+
+    def suggest_equipment(self, field: str, q: str | None, station_object: str | None = None,
+                          limit: int = 20) -> list[str]:
+        if station_object and field in STATION_SCOPED_FIELDS:
+            keys = self._by_station[field].get(station_object.casefold(), {})
+            q = (q or "").casefold()
+            return [self._station_display[field][key] for key in sorted(key for key in keys if q in key)[:limit]]
+        return self.equipment[field].search(q, limit)
+
+    def add_document(self, doc_name: str) -> None:
+        self._apply(lambda: self.doc_names.add(doc_name))
+
+    def rename_document(self, old: str, new: str) -> None:
+        def apply():
+            self.doc_names.remove(old)
+            self.doc_names.add(new)
+        self._apply(apply)
+
+    def add_equipment(self, values: dict) -> None:
+        self._apply(lambda: self._update_equipment(values, +1))
+
+    def update_equipment(self, old: dict, new: dict) -> None:
+        def apply():
+            self._update_equipment(old, -1)
+            self._update_equipment(new, +1)
+        self._apply(apply)
+
+    def _update_equipment(self, values: dict, sign: int) -> None:
+        for field in EQUIPMENT_FIELDS:
+            if sign > 0:
+                self.equipment[field].add(values.get(field))
+            else:
+                self.equipment[field].remove(values.get(field))
+        station = values.get("station_object")
+        if not station:
+            return
+        for field in STATION_SCOPED_FIELDS:
+            value = values.get(field)
+            if not value:
+                continue
+            key = value.casefold()
+            counts = self._by_station[field][station.casefold()]
+            counts[key] += sign
+            if sign > 0:
+                self._station_display[field].setdefault(key, value)
+            if counts[key] <= 0:
+                del counts[key]
+
+    def _apply(self, change: Callable[[], None]) -> None:
+        if self._pending is not None:
+            self._pending.append(change)
+        elif self.ready:
+            change()
+
+    async def _load(self) -> None:
+        while True:
+            self._reload_requested = False
+            await self._load_once()
+            if not self._reload_requested:
+                return
+
+    async def _load_once(self) -> None:
+        self._pending = []
+        try:
+            async with self._session_factory() as session:
+                doc_names = await DocumentsRepository(session).count_doc_names()
+                equipment_rows = await EquipmentRepository(session).list_suggest_fields(EQUIPMENT_FIELDS)
+            self.doc_names, self.equipment, self._by_station, self._station_display = await io_executor.run(
+                _build, doc_names, equipment_rows
+            )
+            # строки, закоммиченные между выборкой и подменой, могут учесться дважды — это лишь задержит
+            # исчезновение значения из подсказок, но не потеряет новое
+            for change in self._pending:
+                change()
+            logger.info(
+                "Suggest index loaded: %d doc names, %d equipment rows", len(self.doc_names), len(equipment_rows)
+            )
+        except Exception:
+            logger.exception("Suggest index load failed")
+            # прежний индекс (если был) остается в работе и не должен пропустить накопленные изменения
+            if self.ready:
+                for change in self._pending:
+                    change()
+        finally:
+            self._pending = None
+
+
+suggest_index = SuggestIndex()
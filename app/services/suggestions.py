@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.doc_name_usage import DocNameUsageRepository
+from app.repositories.documents import DocumentsRepository
+from app.repositories.equipment import EquipmentRepository
+from app.services.suggest_index import suggest_index
+
+# Сколько кандидатов брать из статистики до ранжирования
+CONTEXT_CANDIDATES = 100
+RECENT_CANDIDATES = 50
+# Вес недавних наименований пользователя падает вдвое за этот срок
+RECENCY_HALF_LIFE_DAYS = 7
+
+
+class SuggestionsService:
+    """
+    Подсказки наименований документов по популярности: частота наименования для станции/объекта и типа
+    оборудования (doc_name_usage) плюс недавние наименования текущего пользователя (user_doc_name_usage).
+    Недостающие до limit позиции добираются алфавитным автодополнением.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.usage_repo = DocNameUsageRepository(session)
+        self.equipment_repo = EquipmentRepository(session)
+        self.docs_repo = DocumentsRepository(session)
+
+    async def doc_names(self, *, user_id: int, q: str | None, equipment_id: int | None = None,
+                        limit: int = 20) -> list[str]:
+        context: list[tuple[str, int]] = []
+        if equipment_id is not None:
+            equipment = await self.equipment_repo.get(equipment_id)
+            if equipment is not None:
+                context = await self.usage_repo.top_for_context(
+                    equipment.station_object, equipment.eq_type, q, limit=CONTEXT_CANDIDATES
+                )
+        recent = await self.usage_repo.recent_for_user(user_id, q, limit=RECENT_CANDIDATES)
+
+        ranked = self.rank(context, recent, now=datetime.now(timezone.utc))[:limit]
+        if len(ranked) < limit:
+            seen = {name.casefold() for name in ranked}
+            fallback = (
+                suggest_index.suggest_doc_names(q, limit=limit * 2) if suggest_index.ready
+                else await self.docs_repo.list_doc_names(q, limit=limit * 2)
+            )
+            ranked += [name for name in fallback if name.casefold() not in seen][:limit - len(ranked)]
+        return ranked
+
+    @staticmethod
+    def rank(context: list[tuple[str, int]], recent: list[tuple[str, int, datetime]], now: datetime) -> list[str]:
+        """
+        Оценка = частота в контексте + бонус недавности пользователя. Бонус масштабируется по самому частому
+        наименованию контекста: только что использованное пользователем наименование встает вровень с ним,
+        через RECENCY_HALF_LIFE_DAYS — вдвое ниже.
+        """
+        scores: dict[str, float] = {}
+        names: dict[str, str] = {}
+        for name, uses in context:
+            key = name.casefold()
+            names.setdefault(key, name)
+            scores[key] = scores.get(key, 0) + uses
+
+        top = max((uses for _, uses in context), default=1)
+        for name, _, last_used_at in recent:
+            key = name.casefold()
+            names.setdefault(key, name)
+            age_days = max((now - last_used_at).total_seconds(), 0) / 86400
+            scores[key] = scores.get(key, 0) + top * 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+        return [names[key] for key in sorted(scores, key=lambda k: (-scores[k], k))]
@@ -11,6 +11,9 @@ from sqlalchemy.exc import ProgrammingError
 
 from app.repositories.doc_numbers import DocNumbersRepository
 from app.repositories.sessions import SessionsRepository
+from app.services.export_jobs import export_jobs
+from app.services.number_blocks import number_blocks
+from app.utils.export_cache import export_cache
 
 logger = logging.getLogger(__name__)
 
@@ -56,6 +59,10 @@ async def _cleanup_expired(session_factory):
             await srepo.expire_old(now)
             await nrepo.release_expired(now)
             await session.commit()
+            # неиспользованный блок номеров воркера не должен висеть дольше TTL резерва
+            await number_blocks.release_stale(now)
+            export_jobs.purge_finished()
+            export_cache.evict()
             logger.info("TTL cleanup job finished successfully.")
     except ProgrammingError as e:
         logger.warning("TTL cleanup skipped (DB not ready): %s", e)
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Iterable
+
+NGRAM = 3
+# Если кандидатов по триграмме больше, дешевле пройти отсортированный массив и остановиться на limit
+SCAN_THRESHOLD = 2000
+
+
+def _ngrams(key: str) -> set[str]:
+    return {key[i:i + NGRAM] for i in range(len(key) - NGRAM + 1)}
+
+
+class AutocompleteIndex:
+    """
+    Индекс автодополнения для одного поля: различные значения без учета регистра (как CITEXT).
+
+    - отсортированный массив ключей (casefold) — префиксный поиск через bisect;
+    - карта триграмм -> ключи — поиск подстроки от 3 символов среди ключей самой редкой триграммы запроса;
+    - счетчик строк на значение — значение исчезает из подсказок, когда пропадает последняя строка с ним.
+
+    Результаты отдаются в алфавитном порядке, как прежний SELECT DISTINCT ... ORDER BY col LIMIT 20.
+    """
+
+    def __init__(self, values: Iterable[tuple[str, int]] = ()):
+        self._display: dict[str, str] = {}
+        self._counts: dict[str, int] = {}
+        self._keys: list[str] = []
+        self._ngrams: defaultdict[str, set[str]] = defaultdict(set)
+        for value, count in values:
+            self._add(value, count, keep_sorted=False)
+        self._keys.sort()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, value: str | None, count: int = 1) -> None:
+        self._add(value, count, keep_sorted=True)
+
+    def remove(self, value: str | None, count: int = 1) -> None:
+        if not value:
+            return
+        key = value.casefold()
+        left = self._counts.get(key, 0) - count
+        if left > 0:
+            self._counts[key] = left
+            return
+        if key not in self._counts:
+            return
+        del self._counts[key]
+        del self._display[key]
+        del self._keys[bisect_left(self._keys, key)]
+        for gram in _ngrams(key):
+            keys = self._ngrams[gram]
+            keys.discard(key)
+            if not keys:
+                del self._ngrams[gram]
+
+    def search(self, q: str | None, limit: int = 20) -> list[str]:
+        """
+        Значения, содержащие q, по алфавиту. Для 1–2 символов триграмм нет — отдаются значения с этим префиксом.
+        Без q — первые limit значений.
+        """
+        if not q:
+            return [self._display[key] for key in self._keys[:limit]]
+        q = q.casefold()
+        if len(q) < NGRAM:
+            return self._prefix(q, limit)
+
+        # самое редкое из триграмм запроса множество уже содержит все совпадения, остальное проверяет `q in key`
+        candidates = min((self._ngrams.get(gram, ()) for gram in _ngrams(q)), key=len)
+        if len(candidates) > SCAN_THRESHOLD:
+            found = []
+            for key in self._keys:
+                if q in key:
+                    found.append(key)
+                    if len(found) == limit:
+                        break
+        else:
+            found = heapq.nsmallest(limit, (key for key in candidates if q in key))
+        return [self._display[key] for key in found]
+
+    def _prefix(self, q: str, limit: int) -> list[str]:
+        start = bisect_left(self._keys, q)
+        found = []
+        for key in self._keys[start:start + limit]:
+            if not key.startswith(q):
+                break
+            found.append(self._display[key])
+        return found
+
+    def _add(self, value: str | None, count: int, keep_sorted: bool) -> None:
+        if not value:
+            return
+        key = value.casefold()
+        if key in self._counts:
+            self._counts[key] += count
+            return
+        self._counts[key] = count
+        self._display[key] = value
+        if keep_sorted:
+            insort(self._keys, key)
+        else:
+            self._keys.append(key)
+        for gram in _ngrams(key):
+            self._ngrams[gram].add(key)
@@ -1,191 +1,244 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
-from openpyxl import Workbook
+from typing import Any, AsyncIterable, Callable, Iterable
+from openpyxl import Workbook, load_workbook
 from openpyxl.utils import get_column_letter
 import os
+import tempfile
+
+from app.core.executor import io_executor
+
+EXPORTS_DIR = Path("var/exports")
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Колонка отчета: заголовок, источник значения, форматтер и подсказка ширины."""
+    header: str
+    # ключ в словаре строки или функция от всей строки (для составных значений)
+    source: str | Callable[[dict], Any]
+    formatter: Callable[[Any], Any] | None = None
+    # фиксированная ширина; None — автоподбор по данным
+    width: int | None = None
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """Вид отчета целиком: лист, префикс файла и колонки. Новый отчет — это новая таблица, а не новый метод."""
+    title: str
+    file_prefix: str
+    columns: tuple[ColumnSpec, ...]
+
+    @property
+    def headers(self) -> list[str]:
+        return [c.header for c in self.columns]
+
+    def projector(self) -> Callable[[dict], tuple]:
+        """Собирает один раз функцию, превращающую строку-словарь в кортеж значений колонок."""
+        if all(isinstance(c.source, str) and c.formatter is None for c in self.columns):
+            getter = itemgetter(*(c.source for c in self.columns))
+            if len(self.columns) == 1:
+                return lambda row: (getter(row),)
+            return getter
+
+        getters = []
+        for c in self.columns:
+            get = itemgetter(c.source) if isinstance(c.source, str) else c.source
+            if c.formatter is not None:
+                get = (lambda g, f: lambda row: f(g(row)))(get, c.formatter)
+            getters.append(get)
+        return lambda row: tuple(g(row) for g in getters)
+
+
+def _naive(value: Any) -> Any:
+    # Excel не хранит часовой пояс
+    return value.replace(tzinfo=None) if isinstance(value, datetime) else value
+
+
+def _empty_if_none(value: Any) -> Any:
+    return "" if value is None else value
+
+
+def _author_last_name(row: dict) -> str:
+    return row["last_name"] or row["username_fallback"] or ""
+
+
+def _fixed(header: str) -> int:
+    return max(len(header) + 2, 15)
+
+
+_EQUIPMENT_COLUMNS = (
+    ColumnSpec("Тип оборудования", "eq_type"),
+    ColumnSpec("№ заводской", "factory_no"),
+    ColumnSpec("№ заказа", "order_no"),
+    ColumnSpec("Маркировка", "label"),
+    ColumnSpec("№ станционный", "station_no"),
+    ColumnSpec("Станция / Объект", "station_object"),
+)
+
+REPORT = ReportSpec(
+    title="Отчет",
+    file_prefix="report",
+    columns=tuple(
+        ColumnSpec(c.header, c.source, c.formatter, _fixed(c.header))
+        for c in (
+            ColumnSpec("№ документа", "doc_no"),
+            ColumnSpec("Дата регистрации", "reg_date", _naive),
+            ColumnSpec("Наименование документа", "doc_name"),
+            ColumnSpec("Примечание", "note"),
+            *_EQUIPMENT_COLUMNS,
+            ColumnSpec("Фамилия", _author_last_name),
+            ColumnSpec("Имя", "first_name", _empty_if_none),
+            ColumnSpec("Отчество", "middle_name", _empty_if_none),
+            ColumnSpec("Отдел", "department", _empty_if_none),
+        )
+    ),
+)
+
+REPORT_EXTENDED = ReportSpec(
+    title="Отчет",
+    file_prefix="report_extended",
+    columns=(
+        ColumnSpec("№ документа", "doc_no"),
+        ColumnSpec("Дата регистрации", "reg_date"),
+        ColumnSpec("Наименование документа", "doc_name"),
+        ColumnSpec("Примечание", "note"),
+        *_EQUIPMENT_COLUMNS,
+        ColumnSpec("Пользователь (создавший)", "username"),
+    ),
+)
+
+REPORT_ADMIN = ReportSpec(
+    title="Админский отчет",
+    file_prefix="report_admin",
+    columns=(ColumnSpec("ID документа", "id"), *REPORT_EXTENDED.columns),
+)
+
+
+class _SheetWriter:
+    """
+    Пишет кортежи в write_only-лист. В write_only-режиме ширины колонок задаются до первой строки,
+    поэтому автоподбор делается по заголовкам и первым sample_rows строкам, которые придерживаются в буфере.
+    """
+
+    MAX_WIDTH = 50
+
+    def __init__(self, ws, spec: ReportSpec, sample_rows: int):
+        self.ws = ws
+        self.spec = spec
+        self.sample_rows = sample_rows
+        self.widths = [len(h) for h in spec.headers]
+        self.sample: list[tuple] | None = []
+
+    def append(self, values: tuple) -> None:
+        if self.sample is None:
+            self.ws.append(values)
+            return
+        self.sample.append(values)
+        for i, value in enumerate(values):
+            if value is not None:
+                length = len(str(value))
+                if length > self.widths[i]:
+                    self.widths[i] = length
+        if len(self.sample) >= self.sample_rows:
+            self.flush_head()
+
+    def extend(self, rows: Iterable[tuple]) -> None:
+        for values in rows:
+            self.append(values)
+
+    def flush_head(self) -> None:
+        if self.sample is None:
+            return
+        for i, (column, width) in enumerate(zip(self.spec.columns, self.widths), start=1):
+            letter = get_column_letter(i)
+            self.ws.column_dimensions[letter].width = column.width or min(width + 2, self.MAX_WIDTH)
+        self.ws.append(self.spec.headers)
+        for values in self.sample:
+            self.ws.append(values)
+        self.sample = None
+
+
+class StreamingExcelWriter:
+    """
+    Потоковая выгрузка отчета по ReportSpec в write_only-книгу openpyxl: каждая строка один раз
+    проецируется в кортеж и сразу пишется в лист, поэтому память не зависит от размера отчета.
+    В асинхронном write работа openpyxl (запись пачек и сохранение) идет в io_executor, а не в цикле событий.
+    """
+
+    WIDTH_SAMPLE_ROWS = 1000
+    # строки пишутся в книгу пачками вне цикла событий
+    BATCH_ROWS = 1000
+
+    def __init__(self, spec: ReportSpec):
+        self.spec = spec
+
+    async def write(self, rows: AsyncIterable[dict]) -> str:
+        wb, sheet = self._open()
+        project = self.spec.projector()
+        batch: list[tuple] = []
+        async for row in rows:
+            batch.append(project(row))
+            if len(batch) >= self.BATCH_ROWS:
+                await io_executor.run(sheet.extend, batch)
+                batch = []
+        if batch:
+            await io_executor.run(sheet.extend, batch)
+        return await io_executor.run(self._save, wb, sheet)
+
+    def write_rows(self, rows: Iterable[dict]) -> str:
+        wb, sheet = self._open()
+        project = self.spec.projector()
+        for row in rows:
+            sheet.append(project(row))
+        return self._save(wb, sheet)
+
+    def _open(self) -> tuple[Workbook, _SheetWriter]:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(self.spec.title)
+        return wb, _SheetWriter(ws, self.spec, self.WIDTH_SAMPLE_ROWS)
+
+    def _save(self, wb: Workbook, sheet: _SheetWriter) -> str:
+        sheet.flush_head()
+        EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+        fd, filename = tempfile.mkstemp(
+            prefix=f"{self.spec.file_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_",
+            suffix=".xlsx",
+            dir=EXPORTS_DIR,
+        )
+        with os.fdopen(fd, "wb") as f:
+            wb.save(f)
+        return filename
 
 
 class ReportExcelBuilder:
-    columns = [
-        "№ документа",
-        "Дата регистрации",
-        "Наименование документа",
-        "Примечание",
-        "Тип оборудования",
-        "№ заводской",
-        "№ заказа",
-        "Маркировка",
-        "№ станционный",
-        "Станция / Объект",
-        "Фамилия",
-        "Имя",
-        "Отчество",
-        "Отдел",
-    ]
-
-    columns_extended = [
-        "№ документа",
-        "Дата регистрации",
-        "Наименование документа",
-        "Примечание",
-        "Тип оборудования",
-        "№ заводской",
-        "№ заказа",
-        "Маркировка",
-        "№ станционный",
-        "Станция / Объект",
-        "Пользователь (создавший)",
-    ]
+    """Построение отчетов из уже загруженных строк; все виды отчетов описаны таблицами ReportSpec."""
 
     def build_report(self, rows: list[dict]) -> str:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Отчет"
-        ws.append(self.columns)
-        for r in rows:
-            ws.append(
-                [
-                    r["doc_no"],
-                    r["reg_date"],
-                    r["doc_name"],
-                    r["note"],
-                    r["eq_type"],
-                    r["factory_no"],
-                    r["order_no"],
-                    r["label"],
-                    r["station_no"],
-                    r["station_object"],
-                    r["last_name"] or (r["username_fallback"] if r["username_fallback"] else ""),
-                    r["first_name"] or "",
-                    r["middle_name"] or "",
-                    r["department"] or "",
-                ]
-            )
-        # авто-ширина по заголовкам
-        for i, col_name in enumerate(self.columns, start=1):
-            ws.column_dimensions[get_column_letter(i)].width = max(len(col_name) + 2, 15)
-        Path("var/exports").mkdir(parents=True, exist_ok=True)
-        fname = f"var/exports/report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        wb.save(fname)
-        return fname
+        return StreamingExcelWriter(REPORT).write_rows(rows)
 
     def build_report_extended(self, rows: list[dict]) -> str:
         """Создание расширенного отчета с колонкой пользователя"""
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Отчет"
-        
-        # Заголовки
-        for col, header in enumerate(self.columns_extended, 1):
-            ws.cell(row=1, column=col, value=header)
-        
-        # Данные
-        for row_idx, row_data in enumerate(rows, 2):
-            for col_idx, col_name in enumerate(self.columns_extended, 1):
-                if col_name == "№ документа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["doc_no"])
-                elif col_name == "Дата регистрации":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["reg_date"])
-                elif col_name == "Наименование документа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["doc_name"])
-                elif col_name == "Примечание":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["note"])
-                elif col_name == "Тип оборудования":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["eq_type"])
-                elif col_name == "№ заводской":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["factory_no"])
-                elif col_name == "№ заказа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["order_no"])
-                elif col_name == "Маркировка":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["label"])
-                elif col_name == "№ станционный":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["station_no"])
-                elif col_name == "Станция / Объект":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["station_object"])
-                elif col_name == "Пользователь (создавший)":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["username"])
-        
-        # Автоподбор ширины колонок
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Сохранение
-        filename = f"var/exports/report_extended_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        wb.save(filename)
-        return filename
-    
+        return StreamingExcelWriter(REPORT_EXTENDED).write_rows(rows)
+
     def build_report_extended_admin(self, rows: list[dict]) -> str:
         """Создание админского отчета с расширенными колонками"""
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Админский отчет"
-        
-        # Заголовки для админского отчета
-        admin_columns = [
-            "ID документа", "№ документа", "Дата регистрации", "Наименование документа", 
-            "Примечание", "Тип оборудования", "№ заводской", "№ заказа", "Маркировка",
-            "№ станционный", "Станция / Объект", "Пользователь (создавший)"
-        ]
-        
-        # Заголовки
-        for col, header in enumerate(admin_columns, 1):
-            ws.cell(row=1, column=col, value=header)
-        
-        # Данные
-        for row_idx, row_data in enumerate(rows, 2):
-            for col_idx, col_name in enumerate(admin_columns, 1):
-                if col_name == "ID документа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["id"])
-                elif col_name == "№ документа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["doc_no"])
-                elif col_name == "Дата регистрации":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["reg_date"])
-                elif col_name == "Наименование документа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["doc_name"])
-                elif col_name == "Примечание":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["note"])
-                elif col_name == "Тип оборудования":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["eq_type"])
-                elif col_name == "№ заводской":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["factory_no"])
-                elif col_name == "№ заказа":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["order_no"])
-                elif col_name == "Маркировка":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["label"])
-                elif col_name == "№ станционный":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["station_no"])
-                elif col_name == "Станция / Объект":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["station_object"])
-                elif col_name == "Пользователь (создавший)":
-                    ws.cell(row=row_idx, column=col_idx, value=row_data["username"])
-        
-        # Автоподбор ширины колонок
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # Сохранение
-        filename = f"var/exports/report_admin_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        wb.save(filename)
-        return filename
+        return StreamingExcelWriter(REPORT_ADMIN).write_rows(rows)
+
+
+def read_workbook_rows(path: str) -> tuple[list, list[tuple]]:
+    """
+    Читает первый лист книги: заголовки и строки значений. Функция уровня модуля,
+    чтобы ее можно было выполнить в процессном пуле (cpu_executor).
+    """
+    wb = load_workbook(filename=path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        headers = list(next(rows, ()))
+        return headers, list(rows)
+    finally:
+        wb.close()
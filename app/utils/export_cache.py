@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+import orjson
+
+from app.core.config import settings
+from app.utils.excel import EXPORTS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Фильтры, которые в запросе сравниваются через ILIKE: регистр на результат не влияет
+_CASE_INSENSITIVE_FILTERS = {"label", "doc_name", "username", "order_no"}
+
+
+def normalize_filters(filters: dict) -> tuple:
+    """Приводит фильтры отчета к каноническому виду, чтобы равные по смыслу запросы давали один ключ."""
+    items = []
+    for name, value in sorted(filters.items()):
+        if value is None:
+            continue
+        if name == "station_objects":
+            value = sorted({s.casefold() for s in value})
+        elif name in _CASE_INSENSITIVE_FILTERS:
+            value = value.casefold()
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        items.append((name, value))
+    return tuple(items)
+
+
+class ExportCache:
+    """
+    Готовые файлы выгрузок на диске. Ключ — формат, нормализованные фильтры и версия данных,
+    поэтому после любого изменения журнала старые файлы просто перестают находиться и уходят при вытеснении.
+    Вытеснение: сначала все файлы старше max_age_seconds, затем самые давно использованные,
+    пока суммарный размер не станет меньше max_bytes.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, max_age_seconds: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+    @staticmethod
+    def key(fmt: str, filters: dict, version: tuple) -> str:
+        payload = orjson.dumps([fmt, normalize_filters(filters), list(version)])
+        return hashlib.sha256(payload).hexdigest()
+
+    def owns(self, path: str | Path) -> bool:
+        return Path(path).resolve().parent == self.directory.resolve()
+
+    def get(self, key: str, fmt: str) -> str | None:
+        path = self._path(key, fmt)
+        try:
+            # mtime служит временем последнего использования для LRU-вытеснения
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return str(path)
+
+    def put(self, key: str, fmt: str, built_path: str) -> str:
+        """Переносит собранный файл в кеш (атомарно) и возвращает путь к закешированной копии."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key, fmt)
+        os.replace(built_path, path)
+        self.evict(keep=path)
+        return str(path)
+
+    def evict(self, keep: Path | None = None) -> int:
+        if not self.directory.exists():
+            return 0
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        entries.sort()
+
+        removed = 0
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if keep is not None and path == keep:
+                continue
+            if now - mtime < self.max_age_seconds and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("Export cache: evicted %d files, %d bytes left", removed, total)
+        return removed
+
+    def _path(self, key: str, fmt: str) -> Path:
+        return self.directory / f"{key}.{fmt}"
+
+
+export_cache = ExportCache(
+    directory=EXPORTS_DIR / "cache",
+    max_bytes=settings.export_cache_max_bytes,
+    max_age_seconds=settings.export_cache_max_age_seconds,
+)
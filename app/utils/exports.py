@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import csv
+import os
+import tempfile
+from datetime import datetime
+from typing import AsyncIterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.executor import io_executor
+from app.utils.excel import EXPORTS_DIR, ReportSpec
+
+EXPORT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _export_path(prefix: str, suffix: str) -> tuple[int, str]:
+    EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    return tempfile.mkstemp(
+        prefix=f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_", suffix=suffix, dir=EXPORTS_DIR
+    )
+
+
+class CsvExportWriter:
+    """Потоковая выгрузка в CSV с теми же заголовками, что и в XLSX. BOM нужен, чтобы Excel узнал UTF-8."""
+
+    BATCH_ROWS = 5000
+
+    def __init__(self, spec: ReportSpec):
+        self.spec = spec
+
+    async def write(self, rows: AsyncIterable[dict]) -> str:
+        project = self.spec.projector()
+        fd, filename = _export_path(self.spec.file_prefix, ".csv")
+        with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(self.spec.headers)
+            batch: list[tuple] = []
+            async for row in rows:
+                batch.append(project(row))
+                if len(batch) >= self.BATCH_ROWS:
+                    await io_executor.run(writer.writerows, batch)
+                    batch = []
+            if batch:
+                await io_executor.run(writer.writerows, batch)
+        return filename
+
+
+class ParquetExportWriter:
+    """
+    Потоковая выгрузка в Parquet: строки копятся по колонкам и сбрасываются record batch'ами
+    по BATCH_ROWS, так что в памяти одновременно живет только одна пачка.
+    Имена колонок — ключи строк отчета, типы задает schema.
+    """
+
+    BATCH_ROWS = 50_000
+
+    def __init__(self, spec: ReportSpec, schema: pa.Schema):
+        self.spec = spec
+        self.schema = schema
+
+    async def write(self, rows: AsyncIterable[dict]) -> str:
+        project = self.spec.projector()
+        width = len(self.spec.columns)
+        fd, filename = _export_path(self.spec.file_prefix, ".parquet")
+        with os.fdopen(fd, "wb") as f, pq.ParquetWriter(f, self.schema, compression="zstd") as writer:
+            columns: list[list] = [[] for _ in range(width)]
+            async for row in rows:
+                for i, value in enumerate(project(row)):
+                    columns[i].append(value)
+                if len(columns[0]) >= self.BATCH_ROWS:
+                    await io_executor.run(self._write_batch, writer, columns)
+                    columns = [[] for _ in range(width)]
+            if columns[0]:
+                await io_executor.run(self._write_batch, writer, columns)
+        return filename
+
+    def _write_batch(self, writer: pq.ParquetWriter, columns: list[list]) -> None:
+        # сборка record batch и сжатие — CPU-работа, поэтому идет в io_executor
+        writer.write_batch(pa.record_batch(columns, schema=self.schema))
+
+
+EXTENDED_PARQUET_SCHEMA = pa.schema([
+    ("doc_no", pa.string()),
+    ("reg_date", pa.timestamp("us", tz="UTC")),
+    ("doc_name", pa.string()),
+    ("note", pa.string()),
+    ("eq_type", pa.string()),
+    ("factory_no", pa.string()),
+    ("order_no", pa.string()),
+    ("label", pa.string()),
+    ("station_no", pa.string()),
+    ("station_object", pa.string()),
+    ("username", pa.string()),
+])
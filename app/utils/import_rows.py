@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from app.utils.excel import read_workbook_rows
+
+# Ожидаемые заголовки:
+# № документа | Дата регистрации | Наименование документа | Примечание |
+# Тип оборудования | № заводской | № заказа | Маркировка | № станционный | Станция / Объект |
+# Фамилия | Имя | Отчество | Отдел | Имя пользователя в системе
+REQUIRED_HEADERS = (
+    "№ документа", "Дата регистрации", "Наименование документа", "Примечание", "Тип оборудования",
+    "№ заводской", "№ заказа", "Маркировка", "№ станционный", "Станция / Объект",
+)
+
+# Ограничения схемы БД: documents.numeric — integer, equipment.eq_type — varchar(200)
+MAX_NUMERIC = 2**31 - 1
+MAX_EQ_TYPE_LENGTH = 200
+
+
+@dataclass(frozen=True)
+class ImportRow:
+    """Разобранная строка журнала; row_no — номер строки в книге (для сообщений об ошибках)."""
+    row_no: int
+    numeric: int
+    reg_date: datetime | None
+    doc_name: str
+    note: str
+    eq_type: str
+    factory_no: str | None
+    order_no: str | None
+    label: str | None
+    station_no: str | None
+    station_object: str | None
+    username: str
+    last_name: str | None
+    first_name: str | None
+    middle_name: str | None
+    department: str | None
+
+    @property
+    def equipment_key(self) -> tuple:
+        """Заводской номер уникален (CITEXT), без него оборудование различаем по всем полям."""
+        if self.factory_no:
+            return ("factory_no", self.factory_no.lower())
+        return ("fields", self.eq_type, self.order_no, self.label, self.station_no, self.station_object)
+
+
+def _parse_date(value) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return datetime.strptime(value.strip(), "%d.%m.%Y")
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+
+
+def _text(value) -> str | None:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def read_import_rows(path: str) -> tuple[list[ImportRow], list[dict]]:
+    """
+    Читает и разбирает книгу импорта. Возвращает разобранные строки и ошибки по строкам.
+    Выполняется в процессном пуле целиком, в цикл событий возвращаются готовые ImportRow.
+    """
+    headers, raw_rows = read_workbook_rows(path)
+    col = {h: i for i, h in enumerate(headers) if h}
+    missing = [h for h in REQUIRED_HEADERS if h not in col]
+    if missing:
+        raise ValueError(f"В файле нет колонок: {', '.join(missing)}")
+
+    def get(row: tuple, header: str):
+        i = col.get(header)
+        return row[i] if i is not None and i < len(row) else None
+
+    rows: list[ImportRow] = []
+    errors: list[dict] = []
+    for row_no, row in enumerate(raw_rows, start=2):
+        doc_no = get(row, "№ документа")
+        if not doc_no:
+            continue
+        try:
+            numeric = int(str(doc_no).split("-")[-1])
+        except ValueError:
+            errors.append({"row": row_no, "error": f"Некорректный номер документа: {doc_no}"})
+            continue
+        # строки, которые не пройдут ограничения БД, отсекаются здесь: иначе INSERT упал бы на весь чанк
+        if not 0 < numeric <= MAX_NUMERIC:
+            errors.append({"row": row_no, "error": f"Номер документа вне допустимого диапазона: {doc_no}"})
+            continue
+        reg_date = _parse_date(get(row, "Дата регистрации"))
+        if reg_date is None:
+            errors.append({"row": row_no, "error": "Не указана или некорректна дата регистрации"})
+            continue
+        eq_type = _text(get(row, "Тип оборудования")) or "N/A"
+        if len(eq_type) > MAX_EQ_TYPE_LENGTH:
+            errors.append({
+                "row": row_no, "error": f"Тип оборудования длиннее {MAX_EQ_TYPE_LENGTH} символов",
+            })
+            continue
+        rows.append(ImportRow(
+            row_no=row_no,
+            numeric=numeric,
+            reg_date=reg_date,
+            doc_name=_text(get(row, "Наименование документа")) or "",
+            note=_text(get(row, "Примечание")) or "",
+            eq_type=eq_type,
+            factory_no=_text(get(row, "№ заводской")),
+            order_no=_text(get(row, "№ заказа")),
+            label=_text(get(row, "Маркировка")),
+            station_no=_text(get(row, "№ станционный")),
+            station_object=_text(get(row, "Станция / Объект")),
+            username=_text(get(row, "Имя пользователя в системе")) or "import",
+            last_name=_text(get(row, "Фамилия")),
+            first_name=_text(get(row, "Имя")),
+            middle_name=_text(get(row, "Отчество")),
+            department=_text(get(row, "Отдел")),
+        ))
+    return rows, errors
@@ -3,4 +3,12 @@ def format_doc_no(numeric: int) -> str:
 
 
 def is_golden(numeric: int) -> bool:
-    return numeric % 100 == 0
\ No newline at end of file
+    return numeric % 100 == 0
+
+# Последний "золотой" номер, помещающийся в формат УТЗ-******
+MAX_GOLDEN = 999900
+
+
+def next_golden(numeric: int) -> int:
+    """Ближайший "золотой" номер, не меньший numeric."""
+    return ((numeric + 99) // 100) * 100
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(reg_date: datetime, numeric: int) -> str:
+    """Курсор keyset-пагинации по (reg_date, numeric) — последняя строка отданной страницы."""
+    raw = json.dumps({"d": reg_date.isoformat(), "n": numeric}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["d"]), int(data["n"])
+    except Exception as e:
+        raise ValueError("Некорректный курсор пагинации.") from e
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from sqlalchemy import Text, cast
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def escape_like(value: str) -> str:
+    """Экранирует % и _ — пользовательский ввод ищется как подстрока, а не как шаблон LIKE."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def contains(column, value: str) -> ColumnElement[bool]:
+    """
+    Поиск подстроки без учета регистра: col::text ILIKE '%value%'.
+    ILIKE по CITEXT — это оператор citext, его не поддерживает gin_trgm_ops, поэтому колонка приводится к text:
+    выражение совпадает с индексами ix_*_trgm ((col::text) gin_trgm_ops), и планировщик может их использовать.
+    """
+    return cast(column, Text).ilike(f"%{escape_like(value)}%", escape="\\")
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import UploadFile
+
+UPLOADS_DIR = Path("var/uploads")
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SavedUpload:
+    path: str
+    sha256: str
+    size: int
+
+
+async def save_upload(file: UploadFile, max_bytes: int, suffix: str = "") -> SavedUpload:
+    """
+    Копирует загрузку во временный файл var/uploads кусками по CHUNK_SIZE, считая sha256 по пути.
+    Имя файла от клиента не используется. При превышении max_bytes файл удаляется и поднимается UploadTooLarge.
+    """
+    UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=UPLOADS_DIR)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Файл больше допустимых {max_bytes // (1024 * 1024)} МБ.")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SavedUpload(path=path, sha256=digest.hexdigest(), size=size)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,9 +1,20 @@
 # -*- coding: utf-8 -*-
 """
 Excel -> PostgreSQL migration
-Run: poetry run python scripts/migrate_data.py
+Run: poetry run python scripts/migrate_data.py [--row-wise] [--resume]
+
+По умолчанию используется векторный путь: нормализация строковыми операциями pandas,
+внешние ключи через merge, загрузка через COPY (psycopg2 copy_expert) во временную таблицу
+и INSERT ... SELECT ... ON CONFLICT DO NOTHING. --row-wise включает прежний построчный путь.
+
+Каждый этап (пользователи, оборудование, документы) после коммита отмечается в import_runs
+по хешу (этап + sha256 файла). --resume пропускает этапы, уже завершенные для тех же файлов;
+этапы идемпотентны, поэтому сбой между коммитом данных и отметкой лишь повторит этап.
 """
 
+import argparse
+import hashlib
+import io
 import os
 import sys
 import re
@@ -14,7 +25,7 @@ from typing import Dict, Tuple
 from sqlalchemy import text
 
 import pandas as pd
-from sqlalchemy import create_engine, select
+from sqlalchemy import create_engine, select, func
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
 
@@ -26,6 +37,7 @@ sys.path.insert(0, str(project_root))
 from app.models.user import User
 from app.models.equipment import Equipment
 from app.models.document import Document
+from app.models.import_run import ImportRun, ImportRunStatus
 
 # Logging
 log_file = project_root / "scripts" / "migration.log"
@@ -80,6 +92,62 @@ def normalize_factory_no(value: object) -> str:
     return s
 
 
+def normalize_int_series(values: pd.Series) -> pd.Series:
+    """Векторный аналог normalize_int_str для целой колонки."""
+    s = values.fillna("").astype(str).str.strip()
+    empty = (s == "") | s.str.lower().isin(["nan", "none"])
+    as_float = pd.to_numeric(s, errors="coerce")
+    is_int = as_float.notna() & (as_float % 1 == 0)
+    result = s.str.extract(r"(\d+)", expand=False).fillna("")
+    result[is_int] = as_float[is_int].astype("int64").astype(str)
+    result[empty] = ""
+    return result
+
+
+def normalize_factory_series(values: pd.Series) -> pd.Series:
+    """Векторный аналог normalize_factory_no: пустые и '0' -> '00000'."""
+    s = normalize_int_series(values)
+    return s.mask(s.isin(["", "0"]), "00000")
+
+
+def _copy_frame(session: Session, df: pd.DataFrame, table: str, columns: list[str]) -> None:
+    """COPY строк DataFrame в таблицу через соединение текущей транзакции. None/NaN -> NULL."""
+    buf = io.StringIO()
+    df[columns].to_csv(buf, index=False, header=False, na_rep="\\N")
+    buf.seek(0)
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+        )
+    finally:
+        cursor.close()
+
+
+def copy_insert(session: Session, df: pd.DataFrame, table: str, columns: list[str]) -> int:
+    """
+    Массовая вставка: COPY во временную таблицу с типами колонок целевой,
+    затем один INSERT ... SELECT ... ON CONFLICT DO NOTHING (COPY сам конфликты не пропускает).
+    """
+    if df.empty:
+        return 0
+    cols = ", ".join(columns)
+    stage = f"stage_{table}"
+    # только временная схема: без pg_temp DROP снес бы постоянную таблицу с тем же именем
+    session.execute(text(f"DROP TABLE IF EXISTS pg_temp.{stage}"))
+    session.execute(text(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA"))
+    _copy_frame(session, df, stage, columns)
+    res = session.execute(text(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage} ON CONFLICT DO NOTHING"))
+    return res.rowcount or 0
+
+
+def _blank_to_none(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    for c in columns:
+        values = df[c].fillna("").astype(str).str.strip()
+        df[c] = values.mask(values == "", None)
+    return df
+
+
 def load_users(session: Session, path: str) -> None:
     logger.info(f"Loading users from {path}")
     # engine=xlrd for .xls
@@ -150,6 +218,60 @@ def build_orders_map_from_excel(xlsx_path: str) -> Dict[str, str]:
             orders[last5] = order
     return orders
 
+def build_orders_frame_from_excel(xlsx_path: str) -> pd.DataFrame:
+    """Векторный вариант build_orders_map_from_excel: DataFrame (last5, order_no), последний заказ побеждает."""
+    xl = pd.ExcelFile(xlsx_path)
+    sheet = next((s for s in xl.sheet_names if s.strip().lower() == 'номер заказов' or 'заказ' in s.lower()), None)
+    if not sheet:
+        logger.warning("Orders sheet not found, skip orders mapping")
+        return pd.DataFrame(columns=["last5", "order_no"])
+
+    df = xl.parse(sheet, dtype=str).fillna('')
+    col = next((c for c in df.columns if '№ производственного заказа' in c.lower() or 'заказ' in c.lower()), None)
+    if not col:
+        logger.warning("Orders column not found, skip orders mapping")
+        return pd.DataFrame(columns=["last5", "order_no"])
+
+    orders = pd.DataFrame({"order_no": df[col].astype(str).str.strip()})
+    orders["last5"] = orders["order_no"].str.extract(r'(\d{5})\D*$', expand=False)
+    orders = orders[orders["last5"].notna() & (orders["last5"] != "00000")]
+    return orders.drop_duplicates(subset=["last5"], keep="last")[["last5", "order_no"]]
+
+
+def update_order_numbers_vectorized(session: Session, xlsx_path: str,
+                                    overwrite_incorrect: bool = True) -> Tuple[int, int]:
+    """То же, что update_order_numbers, но одним UPDATE ... FROM по таблице заказов, загруженной через COPY."""
+    orders = build_orders_frame_from_excel(xlsx_path)
+    if orders.empty:
+        return (0, 0)
+
+    session.execute(text("DROP TABLE IF EXISTS pg_temp.stage_orders"))
+    session.execute(text("CREATE TEMP TABLE stage_orders (last5 text, order_no text) ON COMMIT DROP"))
+    _copy_frame(session, orders, "stage_orders", ["last5", "order_no"])
+    res = session.execute(text("""
+        UPDATE equipment e
+        SET order_no = o.order_no
+        FROM stage_orders o
+        WHERE e.factory_no = o.last5
+    """))
+    updated = res.rowcount or 0
+
+    cleaned = 0
+    if overwrite_incorrect:
+        res = session.execute(
+            text(r"""
+                UPDATE equipment
+                SET order_no = NULL
+                WHERE order_no IS NOT NULL
+                  AND substring(order_no from '(\d{5})\D*$') <> factory_no
+            """)
+        )
+        cleaned = res.rowcount
+
+    session.commit()
+    return (updated, cleaned)
+
+
 def update_order_numbers(session: Session, xlsx_path: str, overwrite_incorrect: bool = True) -> Tuple[int, int]:
     """
     Обновляет equipment.order_no по последним 5 цифрам заказа.
@@ -175,11 +297,11 @@ def update_order_numbers(session: Session, xlsx_path: str, overwrite_incorrect:
     cleaned = 0
     if overwrite_incorrect:
         res = session.execute(
-            text("""
+            text(r"""
                 UPDATE equipment
                 SET order_no = NULL
                 WHERE order_no IS NOT NULL
-                  AND substring(order_no from '(\d{5})\\D*$') <> factory_no
+                  AND substring(order_no from '(\d{5})\D*$') <> factory_no
             """)
         )
         cleaned = res.rowcount
@@ -380,6 +502,125 @@ def load_documents(session: Session, path: str) -> None:
         logger.info("No documents to insert")
         
         
+def load_equipment_vectorized(session: Session, path: str) -> None:
+    logger.info(f"Loading equipment from {path} (vectorized)")
+
+    df_t = pd.read_excel(path, sheet_name="Турбины УТЗ", dtype=str).fillna("")
+    df_t = df_t.rename(columns={
+        "Зав№": "factory_no",
+        "Маркировка турбины": "label",
+        "Наименование станции": "station_object",
+        "Станц. №": "station_no",
+    })
+    for c in ["label", "station_object", "station_no"]:
+        if c not in df_t.columns:
+            df_t[c] = ""
+    df_t["factory_no"] = normalize_factory_series(df_t["factory_no"])
+    df_t = df_t.drop_duplicates(subset=["factory_no"])
+    processed = len(df_t)
+
+    # анти-join с уже существующим оборудованием
+    existing = pd.read_sql(select(Equipment.factory_no), session.connection())
+    df_t = df_t.merge(existing, on="factory_no", how="left", indicator=True)
+    new = df_t[(df_t["_merge"] == "left_only") & (df_t["factory_no"] != "")].copy()
+    new = _blank_to_none(new, ["label", "station_object", "station_no"])
+    new["eq_type"] = "Турбина"
+    new["notes"] = None
+
+    if not (existing["factory_no"] == "00000").any() and not (new["factory_no"] == "00000").any():
+        new = pd.concat([new, pd.DataFrame([{
+            "factory_no": "00000",
+            "eq_type": "Вспомогательное оборудование",
+            "label": "General/Unlinked",
+            "station_object": None,
+            "station_no": None,
+            "notes": "Auto-created for documents without factory_no",
+        }])], ignore_index=True)
+
+    inserted = copy_insert(
+        session, new, "equipment", ["factory_no", "label", "station_object", "station_no", "eq_type", "notes"]
+    )
+    session.commit()
+    logger.info(f"Equipment processed: {processed}, inserted: {inserted}")
+
+    updated, cleaned = update_order_numbers_vectorized(session, path, overwrite_incorrect=True)
+    logger.info(f"Orders updated: {updated}, cleaned mismatches: {cleaned}")
+
+    docs_relinked, eq_deleted = unify_placeholder_equipment(session)
+    if docs_relinked or eq_deleted:
+        logger.info(f"Unified placeholder equipment: docs relinked={docs_relinked}, eq_deleted={eq_deleted}")
+
+
+def _equipment_ids(session: Session) -> pd.DataFrame:
+    eq = pd.read_sql(select(Equipment.id.label("equipment_id"), Equipment.factory_no), session.connection())
+    return eq[eq["factory_no"].fillna("") != ""]
+
+
+def load_documents_vectorized(session: Session, path: str) -> None:
+    logger.info(f"Loading documents from {path} (vectorized)")
+    df = pd.read_excel(path, dtype=str).fillna("")
+    for c in ["Обозначение", "Наименование", "Примечание", "Зав.№ турбины первичного применения"]:
+        if c not in df.columns:
+            df[c] = ""
+
+    # 1) Обозначение -> цифры: УТЗ-300031 -> 300031
+    notes = df["Примечание"].str.strip()
+    docs = pd.DataFrame({
+        "numeric": pd.to_numeric(df["Обозначение"].str.strip().str.extract(r"(\d+)", expand=False), errors="coerce"),
+        "doc_name": df["Наименование"].str.strip(),
+        "note": notes.mask(notes == "", None),
+        "factory_no": normalize_int_series(df["Зав.№ турбины первичного применения"]),
+    })
+    total = len(docs)
+    docs = docs.dropna(subset=["numeric"])
+    docs["numeric"] = docs["numeric"].astype("int64")
+
+    # 2) анти-join с уже существующими номерами
+    existing = pd.read_sql(select(Document.numeric), session.connection())
+    docs = docs[~docs["numeric"].isin(existing["numeric"])]
+    skipped = total - len(docs)
+
+    # 3) Наименование по умолчанию
+    docs["doc_name"] = docs["doc_name"].mask(docs["doc_name"] == "", "DOC-" + docs["numeric"].astype(str))
+
+    # 4) Привязка к оборудованию через merge, запасной путь — плейсхолдер "00000"
+    eq = _equipment_ids(session)
+    docs = docs.merge(eq, on="factory_no", how="left")
+    placeholder = eq.loc[eq["factory_no"] == "00000", "equipment_id"]
+    if not placeholder.empty:
+        docs["equipment_id"] = docs["equipment_id"].fillna(placeholder.iloc[0])
+
+    virt_created = 0
+    unlinked = docs["equipment_id"].isna()
+    if unlinked.any():
+        virt = pd.DataFrame({
+            "factory_no": "VIRT-DOC-" + docs.loc[unlinked, "numeric"].astype(str),
+            "eq_type": "Вспомогательное оборудование",
+            "label": "Virtual for " + docs.loc[unlinked, "doc_name"],
+            "notes": "Created for document #" + docs.loc[unlinked, "numeric"].astype(str),
+        })
+        virt_created = copy_insert(session, virt, "equipment", ["factory_no", "eq_type", "label", "notes"])
+        virt_ids = _equipment_ids(session).rename(columns={"factory_no": "virt_no", "equipment_id": "virt_id"})
+        docs["virt_no"] = "VIRT-DOC-" + docs["numeric"].astype(str)
+        docs = docs.merge(virt_ids, on="virt_no", how="left")
+        docs["equipment_id"] = docs["equipment_id"].fillna(docs["virt_id"])
+    docs["equipment_id"] = docs["equipment_id"].astype("int64")
+
+    default_user_id = session.execute(
+        select(User.id).where(User.username == "migration_user")
+    ).scalar_one_or_none()
+    if not default_user_id:
+        raise RuntimeError("migration_user is not found")
+    docs["user_id"] = default_user_id
+
+    inserted = copy_insert(session, docs, "documents", ["numeric", "doc_name", "note", "equipment_id", "user_id"])
+    session.commit()
+    logger.info(
+        f"Documents prepared: {len(docs)}, inserted: {inserted}, "
+        f"skipped: {skipped}, virtual_eq_created: {virt_created}"
+    )
+
+
 from sqlalchemy import func
 
 def bump_counter_after_import(session: Session) -> int:
@@ -407,7 +648,36 @@ def bump_counter_after_import(session: Session) -> int:
     return next_start
 
 
-def main() -> int:
+def stage_key(stage: str, path: str) -> str:
+    """Ключ этапа в import_runs.file_hash: sha256 от имени этапа и содержимого файла."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return hashlib.sha256(f"migrate_data:{stage}:{digest.hexdigest()}".encode()).hexdigest()
+
+
+def stage_done(session: Session, key: str) -> bool:
+    status = session.execute(select(ImportRun.status).where(ImportRun.file_hash == key)).scalar_one_or_none()
+    return status == ImportRunStatus.completed
+
+
+def mark_stage_done(session: Session, key: str) -> None:
+    stmt = insert(ImportRun).values(file_hash=key, status=ImportRunStatus.completed, finished_at=func.now())
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[ImportRun.file_hash],
+        set_={"status": ImportRunStatus.completed, "finished_at": func.now()},
+    ))
+    session.commit()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Excel -> PostgreSQL migration")
+    parser.add_argument("--row-wise", action="store_true", help="прежний построчный путь (iterrows)")
+    parser.add_argument("--resume", action="store_true",
+                        help="пропустить этапы, уже завершенные для тех же файлов (по import_runs)")
+    args = parser.parse_args(argv)
+
     files = {
         "users": project_root / "data" / "Копия Актуальный список пользователей СКБт.xls",
         "equipment": project_root / "data" / "Копия Паровые Турбины.xlsx",
@@ -422,10 +692,20 @@ def main() -> int:
     db_url = resolve_db_url()
     engine = create_engine(db_url, pool_pre_ping=True)
 
+    stages = [
+        ("users", load_users),
+        ("equipment", load_equipment if args.row_wise else load_equipment_vectorized),
+        ("documents", load_documents if args.row_wise else load_documents_vectorized),
+    ]
     with Session(engine) as session:
-        load_users(session, str(files["users"]))
-        load_equipment(session, str(files["equipment"]))
-        load_documents(session, str(files["documents"]))
+        for stage, load in stages:
+            path = str(files[stage])
+            key = stage_key(stage, path)
+            if args.resume and stage_done(session, key):
+                logger.info(f"Stage {stage}: already completed for this file, skipped")
+                continue
+            load(session, path)
+            mark_stage_done(session, key)
         bump_counter_after_import(session)
 
     print("Migration finished")
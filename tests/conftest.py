@@ -72,6 +72,20 @@ async def db_session(test_db_url: str) -> AsyncGenerator[AsyncSession, None]:
         await session.rollback()
     await engine.dispose()
 
+@pytest_asyncio.fixture
+async def savepoint_session(test_db_url: str) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия на соединении с внешней транзакцией: commit() из сервисов освобождает savepoint,
+    а после теста внешняя транзакция откатывается и в общей БД ничего не остается.
+    """
+    engine = create_async_engine(test_db_url)
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        async with AsyncSession(bind=conn, expire_on_commit=False, join_transaction_mode="create_savepoint") as session:
+            yield session
+        await trans.rollback()
+    await engine.dispose()
+
 @pytest_asyncio.fixture
 async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
     async def override_get_current_user(x_test_user: str | None = Header(default=None, alias="X-Test-User")) -> CurrentUser:
@@ -1,7 +1,18 @@
+import csv
+import io
+import json
+import os
+
+import pyarrow.parquet as pq
 import pytest
+from openpyxl import Workbook
 from httpx import AsyncClient
 from faker import Faker
 
+from app.utils.excel import REPORT_EXTENDED
+from app.utils.exports import EXTENDED_PARQUET_SCHEMA
+from app.utils.numbering import format_doc_no
+
 # Инициализируем Faker для генерации случайных, но правдоподобных данных
 fake = Faker("ru_RU")
 
@@ -149,4 +160,264 @@ class TestSessionsAndDocumentsFlow:
         
         assert assign_data["message"] == "Документ создан."
         assert assign_data["created"]["numeric"] == reserved_number
-        assert assign_data["created"]["equipment"]["id"] == equipment_id
\ No newline at end of file
+        assert assign_data["created"]["equipment"]["id"] == equipment_id
+
+@pytest.mark.asyncio
+class TestAssignBatchAPI:
+    """Назначение нескольких номеров сессии одним запросом."""
+
+    async def _reserve(self, client: AsyncClient, headers: dict, equipment_id: int, count: int) -> dict:
+        response = await client.post(
+            "/sessions/reserve", json={"equipment_id": equipment_id, "requested_count": count}, headers=headers
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_assign_batch_creates_all_documents(self, client: AsyncClient, default_user_headers: dict,
+                                                      default_equipment: dict):
+        reserve = await self._reserve(client, default_user_headers, default_equipment.id, 3)
+        items = [{"numeric": n, "doc_name": f"Лист {i} {fake.uuid4()}"} for i, n in enumerate(reserve["reserved_numbers"])]
+
+        response = await client.post(
+            "/documents/assign-batch", json={"session_id": reserve["session_id"], "items": items},
+            headers=default_user_headers,
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [d["numeric"] for d in data["created"]] == sorted(reserve["reserved_numbers"])
+        assert data["equipment"]["id"] == default_equipment.id
+
+        again = await client.post(
+            "/documents/assign-batch", json={"session_id": reserve["session_id"], "items": items[:1]},
+            headers=default_user_headers,
+        )
+        assert again.status_code == 400
+
+    async def test_assign_batch_is_all_or_nothing(self, client: AsyncClient, default_user_headers: dict,
+                                                  default_equipment: dict):
+        reserve = await self._reserve(client, default_user_headers, default_equipment.id, 2)
+        doc_name = fake.uuid4()
+        items = [{"numeric": n, "doc_name": doc_name} for n in reserve["reserved_numbers"]]
+
+        response = await client.post(
+            "/documents/assign-batch", json={"session_id": reserve["session_id"], "items": items},
+            headers=default_user_headers,
+        )
+        assert response.status_code == 409
+
+        # ни один номер не назначен: оба можно назначить по отдельности
+        for i, numeric in enumerate(reserve["reserved_numbers"]):
+            response = await client.post(
+                "/documents/assign-one",
+                json={"session_id": reserve["session_id"], "doc_name": f"{doc_name}-{i}", "numeric": numeric},
+                headers=default_user_headers,
+            )
+            assert response.status_code == 200
+
+@pytest.mark.asyncio
+class TestReportsAPI:
+    """Тесты для постраничного и потокового получения отчета."""
+
+    async def _register(self, client: AsyncClient, headers: dict, equipment_id: int, count: int) -> list[int]:
+        reserve = await client.post(
+            "/sessions/reserve", json={"equipment_id": equipment_id, "requested_count": count}, headers=headers
+        )
+        data = reserve.json()
+        for numeric in data["reserved_numbers"]:
+            response = await client.post(
+                "/documents/assign-one",
+                json={"session_id": data["session_id"], "doc_name": fake.uuid4(), "numeric": numeric},
+                headers=headers,
+            )
+            assert response.status_code == 200
+        return data["reserved_numbers"]
+
+    async def test_keyset_pages_cover_report_without_overlap(self, client: AsyncClient, default_user_headers: dict,
+                                                             default_equipment: dict):
+        await self._register(client, default_user_headers, default_equipment.id, 3)
+
+        full = (await client.get("/reports", headers=default_user_headers)).json()
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = (await client.get("/reports/page", params=params, headers=default_user_headers)).json()
+            seen.extend(row["numeric"] for row in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+
+        assert seen == [row["numeric"] for row in full]
+
+    async def test_invalid_cursor_is_rejected(self, client: AsyncClient, default_user_headers: dict):
+        response = await client.get("/reports/page", params={"cursor": "garbage"}, headers=default_user_headers)
+        assert response.status_code == 400
+
+    async def test_stream_returns_ndjson(self, client: AsyncClient, default_user_headers: dict,
+                                         default_equipment: dict):
+        numbers = await self._register(client, default_user_headers, default_equipment.id, 2)
+
+        response = await client.get("/reports/stream", headers=default_user_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        streamed = [json.loads(line)["numeric"] for line in response.text.splitlines() if line]
+        assert set(numbers) <= set(streamed)
+
+    async def test_export_csv(self, client: AsyncClient, default_user_headers: dict, default_equipment: dict):
+        numbers = await self._register(client, default_user_headers, default_equipment.id, 2)
+
+        response = await client.get("/reports/export", params={"format": "csv"}, headers=default_user_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert response.content.startswith(b"\xef\xbb\xbf")
+        header, *rows = csv.reader(io.StringIO(response.content.decode("utf-8-sig")), delimiter=";")
+        assert header == list(REPORT_EXTENDED.headers)
+        assert all(len(row) == len(header) for row in rows)
+        assert {format_doc_no(n) for n in numbers} <= {row[0] for row in rows}
+
+    async def test_export_parquet(self, client: AsyncClient, default_user_headers: dict, default_equipment: dict):
+        numbers = await self._register(client, default_user_headers, default_equipment.id, 2)
+
+        response = await client.get("/reports/export", params={"format": "parquet"}, headers=default_user_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/vnd.apache.parquet")
+        table = pq.read_table(io.BytesIO(response.content))
+        assert table.schema.equals(EXTENDED_PARQUET_SCHEMA)
+        exported = {row["doc_no"]: row for row in table.to_pylist()}
+        for numeric in numbers:
+            row = exported[format_doc_no(numeric)]
+            assert row["reg_date"] is not None
+            assert row["username"] == default_user_headers["X-Test-User"]
+
+    async def test_export_rejects_unknown_format(self, client: AsyncClient, default_user_headers: dict):
+        response = await client.get("/reports/export", params={"format": "pdf"}, headers=default_user_headers)
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+class TestSearchAPI:
+    """Полнотекстовый поиск по документам и оборудованию."""
+
+    async def _assign(self, client: AsyncClient, headers: dict, equipment_id: int, doc_name: str) -> int:
+        reserve = (await client.post(
+            "/sessions/reserve", json={"equipment_id": equipment_id, "requested_count": 1}, headers=headers
+        )).json()
+        numeric = reserve["reserved_numbers"][0]
+        response = await client.post(
+            "/documents/assign-one",
+            json={"session_id": reserve["session_id"], "doc_name": doc_name, "numeric": numeric},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        return numeric
+
+    async def test_search_matches_word_forms_and_highlights(self, client: AsyncClient, default_user_headers: dict,
+                                                           default_equipment: dict):
+        numeric = await self._assign(
+            client, default_user_headers, default_equipment.id, f"Протокол испытаний регулятора {fake.uuid4()}"
+        )
+
+        response = await client.get("/search", params={"q": "испытания регуляторов"}, headers=default_user_headers)
+
+        assert response.status_code == 200
+        data = response.json()
+        hit = next(item for item in data["items"] if item["numeric"] == numeric)
+        assert data["total"] >= 1
+        assert "<mark>" in hit["highlight"]["doc_name"]
+
+    async def test_search_by_equipment_fields(self, client: AsyncClient, default_user_headers: dict,
+                                              default_equipment: dict):
+        numeric = await self._assign(client, default_user_headers, default_equipment.id, fake.uuid4())
+
+        response = await client.get(
+            "/search", params={"q": default_equipment.factory_no, "limit": 100}, headers=default_user_headers
+        )
+
+        assert response.status_code == 200
+        assert numeric in [item["numeric"] for item in response.json()["items"]]
+
+    async def test_search_requires_query(self, client: AsyncClient, default_user_headers: dict):
+        response = await client.get("/search", headers=default_user_headers)
+        assert response.status_code == 422
+
+@pytest.mark.asyncio
+class TestSuggestAPI:
+    """Подсказки наименований по популярности для оборудования сессии."""
+
+    async def test_doc_names_ranked_by_usage(self, client: AsyncClient, default_user_headers: dict,
+                                             default_equipment: dict):
+        tag = fake.uuid4()[:8]
+        reserve = (await client.post(
+            "/sessions/reserve", json={"equipment_id": default_equipment.id, "requested_count": 3},
+            headers=default_user_headers,
+        )).json()
+        names = [(f"Паспорт {tag}", "1"), (f"Паспорт {tag}", "2"), (f"Акт {tag}", None)]
+        for numeric, (doc_name, note) in zip(reserve["reserved_numbers"], names):
+            response = await client.post(
+                "/documents/assign-one",
+                json={"session_id": reserve["session_id"], "doc_name": doc_name, "note": note, "numeric": numeric},
+                headers=default_user_headers,
+            )
+            assert response.status_code == 200
+
+        response = await client.get(
+            "/suggest/doc-names", params={"q": tag, "equipment_id": default_equipment.id}, headers=default_user_headers
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [f"Паспорт {tag}", f"Акт {tag}"]
+
+
+def _journal_xlsx(numeric: int) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["№ документа", "Дата регистрации", "Наименование документа", "Примечание", "Тип оборудования",
+               "№ заводской", "№ заказа", "Маркировка", "№ станционный", "Станция / Объект"])
+    ws.append([f"УТЗ-{numeric}", "01.02.2024", fake.uuid4(), None, "Турбина", None, None, None, None, "ТЭЦ"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.asyncio
+class TestImportAPI:
+    """Загрузка файла импорта: потоковая запись, лимит размера и повторная загрузка того же файла."""
+
+    async def test_duplicate_upload_returns_previous_result(self, client: AsyncClient, default_admin_headers: dict):
+        content = _journal_xlsx(730001)
+        files = {"file": ("journal.xlsx", content)}
+
+        first = await client.post("/import/import/excel", files=files, headers=default_admin_headers)
+        second = await client.post("/import/import/excel", files=files, headers=default_admin_headers)
+
+        assert first.status_code == 200
+        assert first.json()["imported"] == 1
+        assert second.json() == {**first.json(), "duplicate": True}
+        assert not [f for f in os.listdir("var/uploads") if f.startswith("upload_")]
+
+    async def test_file_without_required_columns_is_rejected(self, client: AsyncClient,
+                                                             default_admin_headers: dict):
+        wb = Workbook()
+        wb.active.append(["Обозначение", "Наименование"])
+        buf = io.BytesIO()
+        wb.save(buf)
+
+        response = await client.post(
+            "/import/import/excel", files={"file": ("wrong.xlsx", buf.getvalue())}, headers=default_admin_headers
+        )
+
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("В файле нет колонок")
+
+    async def test_upload_over_limit_is_rejected(self, client: AsyncClient, default_admin_headers: dict,
+                                                 monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "import_max_upload_bytes", 10)
+
+        response = await client.post(
+            "/import/import/excel", files={"file": ("big.xlsx", _journal_xlsx(730002))}, headers=default_admin_headers
+        )
+
+        assert response.status_code == 413
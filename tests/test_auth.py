@@ -0,0 +1,55 @@
+import time
+
+import pytest
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import auth
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+
+def _token(username: str, ttl: int = 3600) -> str:
+    return jwt.encode({"sub": username, "exp": int(time.time()) + ttl}, settings.SECRET_KEY,
+                      algorithm=settings.ALGORITHM)
+
+
+@pytest.mark.asyncio
+class TestCurrentUserCache:
+    async def test_second_request_with_same_token_skips_db(self, db_session: AsyncSession):
+        auth._user_cache.clear()
+        token = _token("cached_user")
+        statements = []
+        sync_engine = db_session.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+
+        first = await auth.get_current_user(token=token, session=db_session)
+        event.listen(sync_engine, "before_cursor_execute", listener)
+        try:
+            second = await auth.get_current_user(token=token, session=db_session)
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", listener)
+
+        assert second == first
+        assert statements == []
+
+    async def test_admin_flag_is_case_insensitive(self, db_session: AsyncSession):
+        auth._user_cache.clear()
+        admin = settings.admin_users[0].upper()
+        user = await auth.get_current_user(token=_token(admin), session=db_session)
+        assert user.is_admin is True
+
+
+class TestTTLCache:
+    def test_lru_eviction_and_expiry(self):
+        cache: TTLCache[int] = TTLCache(maxsize=2, ttl_seconds=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+
+        cache.set("d", 4, ttl_seconds=0)
+        assert cache.get("d") is None
@@ -0,0 +1,112 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.suggest_index import SuggestIndex, _build
+from app.services.suggestions import SuggestionsService
+from app.utils.autocomplete import AutocompleteIndex
+
+
+class TestAutocompleteIndex:
+    def test_substring_and_prefix_search_is_case_insensitive(self):
+        index = AutocompleteIndex([("Протокол испытаний", 3), ("Акт приемки", 1), ("протокол заседания", 1)])
+
+        assert index.search("ИСПЫТ") == ["Протокол испытаний"]
+        assert index.search("прот") == ["протокол заседания", "Протокол испытаний"]
+        # короче триграммы — только по префиксу
+        assert index.search("ак") == ["Акт приемки"]
+        assert index.search("кт") == []
+        assert index.search(None, limit=1) == ["Акт приемки"]
+
+    def test_value_disappears_with_last_row(self):
+        index = AutocompleteIndex([("Схема", 2)])
+        index.add("СХЕМА")
+        index.remove("Схема", 2)
+        assert index.search("схем") == ["Схема"]
+
+        index.remove("схема")
+        assert index.search("схем") == []
+        assert len(index) == 0
+
+    def test_results_are_sorted_and_limited(self):
+        index = AutocompleteIndex((f"Чертеж {i:05d}", 1) for i in range(10_000))
+        index.add("Чертеж 00000-доп")
+
+        assert index.search("чертеж", limit=3) == ["Чертеж 00000", "Чертеж 00000-доп", "Чертеж 00001"]
+        assert index.search("0999", limit=4) == ["Чертеж 00999", "Чертеж 09990", "Чертеж 09991", "Чертеж 09992"]
+
+    def test_typeahead_is_under_a_millisecond(self):
+        index = AutocompleteIndex((f"Документ {i} паспорт узла {i % 97}", 1) for i in range(100_000))
+
+        started = time.perf_counter()
+        for q in ("док", "паспорт узла 5", "12345", "узла 96"):
+            assert index.search(q)
+        elapsed = (time.perf_counter() - started) / 4
+
+        assert elapsed < 0.001, f"{elapsed * 1000:.2f} ms на запрос"
+
+
+class TestSuggestionRanking:
+    def test_frequency_then_user_recency(self):
+        now = datetime.now(timezone.utc)
+        context = [("Паспорт", 10), ("Акт", 6), ("Схема", 1)]
+        recent = [
+            ("Схема", 1, now - timedelta(hours=1)),      # свежая у пользователя: 1 + ~10
+            ("Акт", 3, now - timedelta(days=70)),        # давняя: бонус почти исчез
+            ("Протокол", 1, now - timedelta(days=7)),    # нет в контексте: 0 + 5
+        ]
+
+        assert SuggestionsService.rank(context, recent, now) == ["Схема", "Паспорт", "Акт", "Протокол"]
+
+    def test_recency_only_without_context(self):
+        now = datetime.now(timezone.utc)
+        recent = [("Старое", 5, now - timedelta(days=30)), ("новое", 1, now)]
+
+        assert SuggestionsService.rank([], recent, now) == ["новое", "Старое"]
+
+
+def _equipment_row(label: str, station_object: str) -> tuple:
+    return "Турбина", None, None, label, None, station_object
+
+
+@pytest.mark.asyncio
+class TestSuggestIndex:
+    async def test_station_values_are_counted_case_insensitively(self):
+        index = SuggestIndex()
+        index.doc_names, index.equipment, index._by_station, index._station_display = _build([], [
+            _equipment_row("ТГ-1", "ТЭЦ-5"), _equipment_row("тг-1", "тэц-5"), _equipment_row("ТГ-2", "ТЭЦ-5"),
+        ])
+        assert index.suggest_equipment("label", "тг", station_object="Тэц-5") == ["ТГ-1", "ТГ-2"]
+
+        index.update_equipment({"label": "ТГ-1", "station_object": "ТЭЦ-5"},
+                               {"label": "ТГ-3", "station_object": "ТЭЦ-5"})
+        # осталась строка "тг-1"
+        assert index.suggest_equipment("label", "тг", station_object="ТЭЦ-5") == ["ТГ-1", "ТГ-2", "ТГ-3"]
+
+        index.update_equipment({"label": "тг-1", "station_object": "тэц-5"},
+                               {"label": "ТГ-3", "station_object": "ТЭЦ-5"})
+        assert index.suggest_equipment("label", "тг", station_object="ТЭЦ-5") == ["ТГ-2", "ТГ-3"]
+
+    async def test_reload_during_load_runs_another_load(self, monkeypatch):
+        index = SuggestIndex()
+        index._session_factory = object()
+        started, finish = asyncio.Event(), asyncio.Event()
+        loads = 0
+
+        async def _load_once():
+            nonlocal loads
+            loads += 1
+            started.set()
+            await finish.wait()
+
+        monkeypatch.setattr(index, "_load_once", _load_once)
+        index.reload()
+        await started.wait()
+        index.reload()
+        index.reload()
+        finish.set()
+        await index._load_task
+
+        assert loads == 2
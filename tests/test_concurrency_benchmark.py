@@ -0,0 +1,309 @@
+"""
+Нагрузочный тест движка резервирования.
+
+N параллельных пользователей одновременно резервируют номера со случайным количеством,
+добавляют номера в сессии, назначают документы, закрывают сессии с возвратом номеров,
+а администраторы резервируют "золотые" номера. Для каждого режима NUMBER_ALLOCATOR печатается пропускная
+способность, перцентили задержек и суммарное время ожидания блокировок в Postgres,
+после чего проверяются инварианты нумерации.
+
+Запуск: pytest -m benchmark -s tests/test_concurrency_benchmark.py
+"""
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import AsyncGenerator
+
+import pytest
+import pytest_asyncio
+from fastapi import Header
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.auth import CurrentUser, get_current_user
+from app.core.config import settings
+from app.core.db import lifespan_session
+from app.main import app
+from app.models.user import User
+from app.services.number_blocks import number_blocks
+
+WORKERS = 32
+OPS_PER_WORKER = 25
+ADMIN_SHARE = 4  # каждый четвертый пользователь — администратор
+LOCK_SAMPLE_INTERVAL = 0.01
+
+
+@dataclass
+class Handout:
+    """Одна успешная выдача номеров: время запроса и полученные номера."""
+    started: float
+    finished: float
+    numbers: set[int]
+    # резерв по количеству (пул released + счетчик), а не конкретные "золотые" номера
+    by_count: bool
+
+
+@dataclass
+class RunStats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: list[str] = field(default_factory=list)
+    # session_id -> выданные номера; отдельно — закрытые сессии и номера обычных пользователей
+    handed_out: dict[str, set[int]] = field(default_factory=lambda: defaultdict(set))
+    cancelled: set[str] = field(default_factory=set)
+    non_admin_numbers: set[int] = field(default_factory=set)
+    assigned: list[int] = field(default_factory=list)
+    handouts: list[Handout] = field(default_factory=list)
+    # (момент коммита закрытия сессии, вернувшиеся в пул номера)
+    releases: list[tuple[float, set[int]]] = field(default_factory=list)
+    # номера от этой границы и выше выданы счетчиком во время прогона
+    counter_start: int = 0
+    lock_wait_seconds: float = 0.0
+
+
+@pytest_asyncio.fixture
+async def bench_engine(test_db_url: str):
+    engine = create_async_engine(test_db_url, pool_size=WORKERS, max_overflow=WORKERS)
+    yield engine
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def bench_client(bench_engine) -> AsyncGenerator[AsyncClient, None]:
+    """Клиент, у которого каждый запрос получает собственную сессию БД, как в продакшене."""
+    SessionFactory = async_sessionmaker(bind=bench_engine, expire_on_commit=False, class_=AsyncSession)
+    user_ids: dict[str, int] = {}
+
+    async def override_lifespan_session() -> AsyncGenerator[AsyncSession, None]:
+        async with SessionFactory() as session:
+            yield session
+
+    async def override_get_current_user(x_test_user: str = Header(alias="X-Test-User")) -> CurrentUser:
+        if x_test_user not in user_ids:
+            async with SessionFactory() as session:
+                user = (await session.execute(select(User).where(User.username == x_test_user))).scalars().first()
+                if not user:
+                    user = User(username=x_test_user)
+                    session.add(user)
+                    await session.commit()
+                user_ids[x_test_user] = user.id
+        return CurrentUser(id=user_ids[x_test_user], username=x_test_user, is_admin="admin" in x_test_user)
+
+    app.dependency_overrides[lifespan_session] = override_lifespan_session
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test/api/v1") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+
+
+async def _timed(stats: RunStats, op: str, coro):
+    started = time.perf_counter()
+    response = await coro
+    stats.latencies[op].append(time.perf_counter() - started)
+    if response.status_code >= 500:
+        stats.errors.append(f"{op}: {response.status_code} {response.text[:200]}")
+    return response
+
+
+async def _worker(client: AsyncClient, stats: RunStats, idx: int, equipment_id: int, seed: int) -> None:
+    rnd = random.Random(seed + idx)
+    is_admin = idx % ADMIN_SHARE == 0
+    headers = {"X-Test-User": f"bench_{'admin' if is_admin else 'user'}_{idx}"}
+    own_sessions: list[str] = []
+
+    for _ in range(OPS_PER_WORKER):
+        roll = rnd.random()
+        started = time.perf_counter()
+        if is_admin and roll < 0.1:
+            r = await _timed(stats, "reserve-golden", client.post(
+                "/documents/reserve-golden",
+                json={"quantity": rnd.randint(1, 3), "equipment_id": equipment_id, "ttl_seconds": 600},
+                headers=headers,
+            ))
+            if r.status_code == 201:
+                data = r.json()
+                own_sessions.append(data["session_id"])
+                stats.handed_out[data["session_id"]].update(data["reserved_numbers"])
+                stats.handouts.append(Handout(started, time.perf_counter(), set(data["reserved_numbers"]), False))
+        elif roll < 0.55 or not own_sessions:
+            r = await _timed(stats, "reserve", client.post(
+                "/sessions/reserve",
+                json={"equipment_id": equipment_id, "requested_count": rnd.choice([1, 1, 2, 5, 10, 50])},
+                headers=headers,
+            ))
+            if r.status_code == 200:
+                data = r.json()
+                own_sessions.append(data["session_id"])
+                stats.handed_out[data["session_id"]].update(data["reserved_numbers"])
+                stats.handouts.append(Handout(started, time.perf_counter(), set(data["reserved_numbers"]), True))
+                if not is_admin:
+                    stats.non_admin_numbers.update(data["reserved_numbers"])
+        elif roll < 0.7:
+            session_id = rnd.choice(own_sessions)
+            r = await _timed(stats, "add-numbers", client.post(
+                f"/sessions/{session_id}/add-numbers",
+                json={"requested_count": rnd.randint(1, 10)},
+                headers=headers,
+            ))
+            if r.status_code == 200:
+                stats.handed_out[session_id].update(r.json())
+                stats.handouts.append(Handout(started, time.perf_counter(), set(r.json()), True))
+                if not is_admin:
+                    stats.non_admin_numbers.update(r.json())
+        elif roll < 0.85:
+            session_id = rnd.choice(own_sessions)
+            candidates = sorted(n for n in stats.handed_out[session_id] if is_admin or n % 100 != 0)
+            if not candidates or session_id in stats.cancelled:
+                continue
+            r = await _timed(stats, "assign-one", client.post(
+                "/documents/assign-one",
+                json={"session_id": session_id, "doc_name": f"bench-{uuid.uuid4()}", "numeric": candidates[0]},
+                headers=headers,
+            ))
+            if r.status_code == 200:
+                stats.assigned.append(r.json()["created"]["numeric"])
+                stats.handed_out[session_id].discard(candidates[0])
+        else:
+            session_id = own_sessions.pop(rnd.randrange(len(own_sessions)))
+            r = await _timed(stats, "complete", client.post(f"/sessions/{session_id}/complete", headers=headers))
+            if r.status_code == 200:
+                stats.cancelled.add(session_id)
+                stats.releases.append((time.perf_counter(), set(stats.handed_out[session_id])))
+
+
+async def _sample_lock_waits(engine, stats: RunStats, stop: asyncio.Event) -> None:
+    """Приблизительное суммарное время ожидания блокировок: число ждущих бэкендов × интервал опроса."""
+    async with engine.connect() as conn:
+        while not stop.is_set():
+            waiting = (await conn.execute(text(
+                "SELECT count(*) FROM pg_stat_activity "
+                "WHERE wait_event_type = 'Lock' AND datname = current_database()"
+            ))).scalar()
+            # pg_stat_activity кешируется до конца транзакции, поэтому каждый замер — отдельная транзакция
+            await conn.commit()
+            stats.lock_wait_seconds += waiting * LOCK_SAMPLE_INTERVAL
+            await asyncio.sleep(LOCK_SAMPLE_INTERVAL)
+
+
+def _report(allocator: str, stats: RunStats, elapsed: float) -> None:
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"\n=== NUMBER_ALLOCATOR={allocator}: {total} requests in {elapsed:.2f}s "
+          f"({total / elapsed:.1f} req/s), lock wait ≈ {stats.lock_wait_seconds:.2f}s")
+    for op, values in sorted(stats.latencies.items()):
+        if len(values) < 2:
+            continue
+        q = statistics.quantiles(values, n=100)
+        print(f"  {op:15} n={len(values):4}  p50={q[49] * 1000:7.1f}ms  "
+              f"p95={q[94] * 1000:7.1f}ms  p99={q[98] * 1000:7.1f}ms")
+
+
+async def _check_invariants(engine, stats: RunStats) -> None:
+    live = {sid: nums for sid, nums in stats.handed_out.items() if sid not in stats.cancelled}
+    seen: dict[int, str] = {}
+    for sid, nums in live.items():
+        for n in nums:
+            assert n not in seen, f"номер {n} выдан одновременно сессиям {seen[n]} и {sid}"
+            seen[n] = sid
+
+    golden = sorted(n for n in stats.non_admin_numbers if n % 100 == 0)
+    assert not golden, f"'золотые' номера выданы обычным пользователям: {golden[:10]}"
+
+    assert len(stats.assigned) == len(set(stats.assigned)), "один номер назначен дважды"
+
+    async with engine.connect() as conn:
+        duplicates = (await conn.execute(text(
+            "SELECT count(*) FROM (SELECT numeric FROM doc_numbers GROUP BY numeric HAVING count(*) > 1) d"
+        ))).scalar()
+        assert duplicates == 0
+
+        # Номера отмененных сессий должны вернуться в пул или быть перезабраны, но не остаться за отмененной сессией
+        stuck = (await conn.execute(text(
+            "SELECT count(*) FROM doc_numbers d JOIN sessions s ON s.id = d.session_id "
+            "WHERE d.status = 'reserved' AND s.status IN ('cancelled', 'completed')"
+        ))).scalar()
+        assert stuck == 0, f"{stuck} номеров остались зарезервированными за закрытыми сессиями"
+
+        # Номер закрытой сессии либо лежит в пуле released, либо снова зарезервирован живой сессией,
+        # либо назначен документу через assign-one
+        cancelled_numbers = {n for sid in stats.cancelled for n in stats.handed_out[sid]}
+        if cancelled_numbers:
+            rows = (await conn.execute(
+                text(
+                    "SELECT d.numeric, d.status, s.status FROM doc_numbers d "
+                    "LEFT JOIN sessions s ON s.id = d.session_id WHERE d.numeric = ANY(:nums)"
+                ),
+                {"nums": sorted(cancelled_numbers)},
+            )).all()
+            state = {numeric: (status, session_status) for numeric, status, session_status in rows}
+            assigned = set(stats.assigned)
+            lost = sorted(
+                n for n in cancelled_numbers
+                if n not in state
+                or (state[n][0] == "reserved" and state[n][1] != "active")
+                or (state[n][0] == "assigned" and n not in assigned)
+            )
+            assert not lost, f"освобожденные номера потерялись: {lost[:10]}"
+
+    skipped = _skipped_released(stats)
+    assert not skipped, f"освобожденные номера пропущены ради новых номеров счетчика: {skipped[:10]}"
+
+
+def _skipped_released(stats: RunStats) -> list[int]:
+    """
+    Освобожденные обычные номера, которые лежали в пуле released все время, пока резерв по количеству
+    получал свежие номера со счетчика: такой резерв должен был сначала забрать их.
+    Номер, который параллельно забирал другой запрос (SKIP LOCKED), не в счет: его резерв начался
+    раньше, чем закончился пропустивший.
+    """
+    first_seen: dict[int, float] = {}
+    for h in sorted(stats.handouts, key=lambda h: h.started):
+        for n in h.numbers:
+            first_seen.setdefault(n, h.started)
+    minting = [
+        h for h in stats.handouts
+        if h.by_count and any(n >= stats.counter_start and first_seen[n] == h.started for n in h.numbers)
+    ]
+
+    skipped = []
+    for released_at, numbers in stats.releases:
+        for n in numbers:
+            if n % 100 == 0:
+                continue
+            retaken_at = min(
+                (h.started for h in stats.handouts if n in h.numbers and h.finished > released_at),
+                default=float("inf"),
+            )
+            if any(released_at < h.started and h.finished < retaken_at for h in minting):
+                skipped.append(n)
+    return sorted(skipped)
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+@pytest.mark.parametrize("allocator", ["lock", "claim", "block"])
+async def test_reservation_under_contention(bench_client, bench_engine, default_equipment, monkeypatch, allocator):
+    monkeypatch.setattr(settings, "number_allocator", allocator)
+    stats = RunStats()
+    async with bench_engine.connect() as conn:
+        stats.counter_start = (await conn.execute(text(
+            "SELECT GREATEST(next_normal_start, base_start) FROM doc_counter WHERE id = 1"
+        ))).scalar() or 1
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_lock_waits(bench_engine, stats, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(bench_client, stats, idx, default_equipment.id, seed=20240601) for idx in range(WORKERS)
+    ))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await sampler
+    await number_blocks.release_unused()
+
+    _report(allocator, stats, elapsed)
+    assert not stats.errors, stats.errors[:5]
+    await _check_invariants(bench_engine, stats)
@@ -0,0 +1,80 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+from openpyxl import load_workbook
+
+from app.utils.excel import ColumnSpec, ReportSpec, ReportExcelBuilder, StreamingExcelWriter, REPORT
+
+SPEC = ReportSpec(
+    title="Отчет",
+    file_prefix="test_stream",
+    columns=(ColumnSpec("№", "no"), ColumnSpec("Наименование", "name")),
+)
+
+
+async def _rows(count: int):
+    for i in range(count):
+        yield {"no": i, "name": f"Документ {i}" + ("-длинный" * 3 if i == 1500 else "")}
+
+
+@pytest.mark.asyncio
+class TestStreamingExcelWriter:
+    async def test_writes_header_and_all_rows(self):
+        path = await StreamingExcelWriter(SPEC).write(_rows(2500))
+        try:
+            ws = load_workbook(path, read_only=True)["Отчет"]
+            rows = list(ws.iter_rows(values_only=True))
+            assert rows[0] == ("№", "Наименование")
+            assert len(rows) == 2501
+            assert rows[-1] == (2499, "Документ 2499")
+        finally:
+            os.remove(path)
+
+    async def test_widths_come_from_header_and_sample(self):
+        path = await StreamingExcelWriter(SPEC).write(_rows(10))
+        try:
+            ws = load_workbook(path)["Отчет"]
+            assert ws.column_dimensions["A"].width == len("№") + 2
+            assert ws.column_dimensions["B"].width == len("Наименование") + 2
+        finally:
+            os.remove(path)
+
+    async def test_empty_report_has_header_only(self):
+        path = await StreamingExcelWriter(SPEC).write(_rows(0))
+        try:
+            rows = list(load_workbook(path, read_only=True)["Отчет"].iter_rows(values_only=True))
+            assert rows == [("№", "Наименование")]
+        finally:
+            os.remove(path)
+
+
+class TestReportSpec:
+    def test_projector_applies_sources_and_formatters(self):
+        spec = ReportSpec(
+            title="t",
+            file_prefix="t",
+            columns=(
+                ColumnSpec("A", "a"),
+                ColumnSpec("B", lambda r: r["a"] + r["b"]),
+                ColumnSpec("C", "c", lambda v: v or "-"),
+            ),
+        )
+        assert spec.projector()({"a": 1, "b": 2, "c": None}) == (1, 3, "-")
+
+    def test_basic_report_uses_fixed_widths_and_username_fallback(self):
+        row = {
+            "doc_no": "00001", "reg_date": datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc), "doc_name": "Док",
+            "note": None, "eq_type": "Турбина", "factory_no": "1", "order_no": "2", "label": "3", "station_no": "4",
+            "station_object": "ТЭЦ", "last_name": None, "first_name": None, "middle_name": None,
+            "department": None, "username_fallback": "ivanov",
+        }
+        path = ReportExcelBuilder().build_report([row])
+        try:
+            ws = load_workbook(path)["Отчет"]
+            values = [c.value for c in ws[2]]
+            assert values[1] == datetime(2024, 5, 1, 10, 0)
+            assert values[10] == "ivanov"
+            assert ws.column_dimensions["A"].width == REPORT.columns[0].width
+        finally:
+            os.remove(path)
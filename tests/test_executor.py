@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.executor import BlockingExecutor
+
+
+def _square(x: int) -> int:
+    return x * x
+
+
+@pytest.mark.asyncio
+class TestBlockingExecutor:
+    async def test_bounds_concurrency_and_counts_queue(self):
+        executor = BlockingExecutor("test", "thread", max_workers=2, max_queue=1)
+        release = threading.Event()
+        active, peak = 0, 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            release.wait(5)
+            with lock:
+                active -= 1
+
+        tasks = [asyncio.create_task(executor.run(work)) for _ in range(5)]
+        await asyncio.sleep(0.1)
+        # 2 выполняются, 1 в очереди пула, 2 ждут места
+        assert executor.metrics.running == 3
+        assert executor.metrics.waiting == 2
+        assert executor.queue_depth == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+        executor.shutdown()
+
+        assert peak == 2
+        assert executor.metrics.completed == 5
+        assert executor.queue_depth == 0
+
+    async def test_event_loop_stays_responsive(self):
+        executor = BlockingExecutor("test", "thread", max_workers=1, max_queue=0)
+        job = asyncio.create_task(executor.run(time.sleep, 0.3))
+
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - started < 0.2
+
+        await job
+        executor.shutdown()
+
+    async def test_process_pool_runs_module_functions(self):
+        executor = BlockingExecutor("test", "process", max_workers=1, max_queue=0)
+        try:
+            assert await executor.run(_square, 7) == 49
+        finally:
+            executor.shutdown()
+
+    async def test_failures_are_counted_and_reraised(self):
+        executor = BlockingExecutor("test", "thread", max_workers=1, max_queue=0)
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(lambda: 1 / 0)
+        executor.shutdown()
+        assert executor.metrics.failed == 1
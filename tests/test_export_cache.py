@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from app.utils.export_cache import ExportCache, normalize_filters
+
+
+def _built(tmp_path, name: str, size: int) -> str:
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+class TestNormalizeFilters:
+    def test_equivalent_filters_give_same_key(self):
+        a = {"station_objects": ["ТЭЦ-2", "ГРЭС"], "label": "Турбина", "date_from": datetime(2024, 5, 1),
+             "doc_name": None}
+        b = {"label": "турбина", "station_objects": ["грэс", "тэц-2", "ГРЭС"], "date_from": datetime(2024, 5, 1)}
+        assert normalize_filters(a) == normalize_filters(b)
+        assert ExportCache.key("xlsx", a, (10, 3)) == ExportCache.key("xlsx", b, (10, 3))
+
+    def test_version_and_format_change_key(self):
+        filters = {"label": "Турбина"}
+        key = ExportCache.key("xlsx", filters, (10, 3))
+        assert key != ExportCache.key("xlsx", filters, (11, 3))
+        assert key != ExportCache.key("xlsx", filters, (10, 4))
+        assert key != ExportCache.key("csv", filters, (10, 3))
+
+
+class TestExportCache:
+    def test_put_then_get(self, tmp_path):
+        cache = ExportCache(tmp_path / "cache", max_bytes=1000, max_age_seconds=60)
+        assert cache.get("k", "xlsx") is None
+
+        path = cache.put("k", "xlsx", _built(tmp_path, "built.xlsx", 10))
+
+        assert cache.get("k", "xlsx") == path
+        assert cache.owns(path)
+        assert not os.path.exists(tmp_path / "built.xlsx")
+
+    def test_evicts_least_recently_used_over_size_limit(self, tmp_path):
+        cache = ExportCache(tmp_path / "cache", max_bytes=250, max_age_seconds=3600)
+        first = cache.put("a", "csv", _built(tmp_path, "a", 100))
+        second = cache.put("b", "csv", _built(tmp_path, "b", 100))
+        past = time.time() - 10
+        os.utime(first, (past, past))
+        os.utime(second, (past + 1, past + 1))
+        cache.get("a", "csv")  # a становится самым свежим
+
+        third = cache.put("c", "csv", _built(tmp_path, "c", 100))
+
+        assert os.path.exists(first) and os.path.exists(third)
+        assert not os.path.exists(second)
+
+    def test_evicts_expired_entries(self, tmp_path):
+        cache = ExportCache(tmp_path / "cache", max_bytes=10_000, max_age_seconds=60)
+        old = cache.put("old", "xlsx", _built(tmp_path, "old", 10))
+        past = time.time() - 120
+        os.utime(old, (past, past))
+
+        assert cache.evict() == 1
+        assert cache.get("old", "xlsx") is None
@@ -0,0 +1,59 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.services.export_jobs import ExportJobManager, ExportJobStatus
+
+FILTERS = dict(station_objects=None, station_no=None, label=None, factory_no=None, order_no=None,
+               date_from=None, date_to=None, doc_name=None, username=None)
+
+
+async def _wait(manager: ExportJobManager, job_id: str, timeout: float = 30):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while manager.get(job_id).status in (ExportJobStatus.queued, ExportJobStatus.running):
+        assert asyncio.get_running_loop().time() < deadline, "выгрузка не завершилась"
+        await asyncio.sleep(0.05)
+    return manager.get(job_id)
+
+
+@pytest.mark.asyncio
+class TestExportJobManager:
+    async def test_job_runs_in_background_and_reports_progress(self, test_db_url: str, monkeypatch):
+        monkeypatch.setattr(settings, "export_cache_enabled", False)
+        engine = create_async_engine(test_db_url)
+        manager = ExportJobManager(workers=1, ttl_seconds=0)
+        manager.start(async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession))
+        try:
+            job = manager.submit(user_id=1, fmt="csv", filters=FILTERS)
+            assert job.status == ExportJobStatus.queued
+
+            job = await _wait(manager, job.id)
+
+            assert job.status == ExportJobStatus.done, job.error
+            assert job.progress == 1.0
+            assert job.processed == job.total
+            assert os.path.exists(job.path)
+
+            assert manager.purge_finished(datetime.utcnow() + timedelta(seconds=1)) == 1
+            assert manager.get(job.id) is None
+            assert not os.path.exists(job.path)
+        finally:
+            await manager.stop()
+            await engine.dispose()
+
+    async def test_failed_job_keeps_error(self, test_db_url: str):
+        engine = create_async_engine(test_db_url)
+        manager = ExportJobManager(workers=1, ttl_seconds=60)
+        manager.start(async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession))
+        try:
+            job = manager.submit(user_id=1, fmt="pdf", filters=FILTERS)
+            job = await _wait(manager, job.id)
+            assert job.status == ExportJobStatus.failed
+            assert "pdf" in job.error
+        finally:
+            await manager.stop()
+            await engine.dispose()
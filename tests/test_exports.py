@@ -0,0 +1,55 @@
+import csv
+import os
+from datetime import datetime, timezone
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.utils.excel import REPORT_EXTENDED
+from app.utils.exports import CsvExportWriter, ParquetExportWriter, EXTENDED_PARQUET_SCHEMA
+
+
+async def _rows(count: int):
+    for i in range(count):
+        yield {
+            "doc_no": f"{i:05d}", "reg_date": datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc),
+            "doc_name": f"Документ {i}", "note": None, "eq_type": "Турбина", "factory_no": "1", "order_no": "2",
+            "label": "3", "station_no": "4", "station_object": "ТЭЦ", "username": "ivanov",
+        }
+
+
+@pytest.mark.asyncio
+class TestCsvExportWriter:
+    async def test_writes_header_and_rows(self):
+        path = await CsvExportWriter(REPORT_EXTENDED).write(_rows(3))
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                rows = list(csv.reader(f, delimiter=";"))
+            assert rows[0] == REPORT_EXTENDED.headers
+            assert len(rows) == 4
+            assert rows[1][0] == "00000"
+        finally:
+            os.remove(path)
+
+
+@pytest.mark.asyncio
+class TestParquetExportWriter:
+    async def test_rows_span_several_batches(self, monkeypatch):
+        monkeypatch.setattr(ParquetExportWriter, "BATCH_ROWS", 100)
+        path = await ParquetExportWriter(REPORT_EXTENDED, EXTENDED_PARQUET_SCHEMA).write(_rows(250))
+        try:
+            table = pq.read_table(path)
+            assert table.schema.equals(EXTENDED_PARQUET_SCHEMA)
+            assert table.num_rows == 250
+            assert table.column("doc_no")[249].as_py() == "00249"
+        finally:
+            os.remove(path)
+
+    async def test_empty_export_keeps_schema(self):
+        path = await ParquetExportWriter(REPORT_EXTENDED, EXTENDED_PARQUET_SCHEMA).write(_rows(0))
+        try:
+            table = pq.read_table(path)
+            assert table.num_rows == 0
+            assert table.schema.names == EXTENDED_PARQUET_SCHEMA.names
+        finally:
+            os.remove(path)
@@ -0,0 +1,146 @@
+import pytest
+from openpyxl import Workbook
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.doc_number import DocNumber, DocNumStatus
+from app.models.document import Document
+from app.models.equipment import Equipment
+from app.models.user import User
+from app.services.importer import ExcelImporterService
+
+HEADERS = [
+    "№ документа", "Дата регистрации", "Наименование документа", "Примечание", "Тип оборудования",
+    "№ заводской", "№ заказа", "Маркировка", "№ станционный", "Станция / Объект",
+    "Фамилия", "Имя", "Отчество", "Отдел", "Имя пользователя в системе",
+]
+
+
+def _workbook(path, rows: list[list]) -> str:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(HEADERS)
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return str(path)
+
+
+def _row(numeric: int, doc_name: str, factory_no: str | None = "IMP-1", username: str = "importer") -> list:
+    return [f"УТЗ-{numeric}", "01.02.2024", doc_name, None, "Турбина", factory_no, None, None, None, "ТЭЦ",
+            "Иванов", "Иван", None, None, username]
+
+
+@pytest.mark.asyncio
+class TestExcelImporter:
+    async def test_imports_in_chunks_and_reports_bad_rows(self, savepoint_session: AsyncSession, tmp_path,
+                                                          monkeypatch):
+        monkeypatch.setattr(settings, "import_chunk_size", 2)
+        path = _workbook(tmp_path / "journal.xlsx", [
+            _row(710001, "Паспорт"),
+            _row(710002, "Чертеж"),
+            _row(710002, "Повтор номера"),
+            ["не-номер", None, "Битая строка"],
+            _row(710003, "Без заводского", factory_no=None, username="IMPORTER"),
+        ])
+
+        result = await ExcelImporterService(savepoint_session).import_file(path)
+
+        assert result["imported"] == 3
+        assert result["next_start"] == 710004
+        assert [e["row"] for e in result["errors"]] == [4, 5]
+
+        docs = (await savepoint_session.execute(
+            select(Document).where(Document.numeric.between(710001, 710003))
+        )).scalars().all()
+        assert len(docs) == 3
+        assert len({d.user_id for d in docs}) == 1
+        equipment = (await savepoint_session.execute(
+            select(Equipment).where(Equipment.factory_no == "imp-1")
+        )).scalars().all()
+        assert len(equipment) == 1
+
+        statuses = (await savepoint_session.execute(
+            select(DocNumber.status).where(DocNumber.numeric.between(710001, 710003))
+        )).scalars().all()
+        assert statuses == [DocNumStatus.assigned] * 3
+
+    async def test_rows_violating_db_constraints_are_row_errors(self, savepoint_session: AsyncSession, tmp_path):
+        no_date = _row(750002, "Без даты", factory_no="IMP-4")
+        no_date[1] = None
+        bad_date = _row(750003, "Кривая дата", factory_no="IMP-4")
+        bad_date[1] = "32.13.2024"
+        long_type = _row(750004, "Длинный тип", factory_no="IMP-5")
+        long_type[4] = "Т" * 201
+        path = _workbook(tmp_path / "invalid.xlsx", [
+            _row(750001, "Нормальная строка", factory_no="IMP-4"),
+            no_date,
+            bad_date,
+            long_type,
+            _row(9_999_999_999, "Слишком большой номер", factory_no="IMP-4"),
+        ])
+
+        result = await ExcelImporterService(savepoint_session).import_file(path)
+
+        assert result["imported"] == 1
+        assert [e["row"] for e in result["errors"]] == [3, 4, 5, 6]
+
+    async def test_existing_values_match_case_insensitively(self, savepoint_session: AsyncSession, tmp_path):
+        user = User(username="Existing_Importer")
+        eq = Equipment(eq_type="Турбина", factory_no="ABC-9")
+        savepoint_session.add_all([user, eq])
+        await savepoint_session.flush()
+
+        path = _workbook(tmp_path / "case.xlsx", [
+            _row(760001, "Паспорт", factory_no="abc-9", username="EXISTING_IMPORTER"),
+        ])
+        result = await ExcelImporterService(savepoint_session).import_file(path)
+
+        assert result["imported"] == 1
+        doc = (await savepoint_session.execute(select(Document).where(Document.numeric == 760001))).scalar_one()
+        assert (doc.user_id, doc.equipment_id) == (user.id, eq.id)
+
+    async def test_existing_documents_are_reported_not_fatal(self, savepoint_session: AsyncSession, tmp_path):
+        first = _workbook(tmp_path / "first.xlsx", [_row(720001, "Паспорт", factory_no="IMP-2")])
+        await ExcelImporterService(savepoint_session).import_file(first)
+
+        again = _workbook(tmp_path / "again.xlsx", [
+            _row(720001, "Паспорт", factory_no="IMP-2"),
+            _row(720002, "Новый", factory_no="IMP-2"),
+        ])
+        result = await ExcelImporterService(savepoint_session).import_file(again)
+
+        assert result["imported"] == 1
+        assert [e["row"] for e in result["errors"]] == [2]
+
+    async def test_failed_run_resumes_from_last_committed_chunk(self, savepoint_session: AsyncSession, tmp_path,
+                                                                 monkeypatch):
+        monkeypatch.setattr(settings, "import_chunk_size", 2)
+        path = _workbook(tmp_path / "resume.xlsx", [
+            _row(740000 + i, f"Документ {i}", factory_no="IMP-3") for i in range(1, 6)
+        ])
+        svc = ExcelImporterService(savepoint_session)
+        original = svc._import_chunk
+        calls = 0
+
+        async def failing_chunk(chunk, errors):
+            nonlocal calls
+            calls += 1
+            if calls == 2:
+                raise RuntimeError("сбой посреди импорта")
+            return await original(chunk, errors)
+
+        monkeypatch.setattr(svc, "_import_chunk", failing_chunk)
+        with pytest.raises(RuntimeError):
+            await svc.import_file(path)
+
+        result = await ExcelImporterService(savepoint_session).import_file(path)
+
+        assert result["resumed_from_row"] == 2
+        assert result["imported"] == 5
+        assert result["errors"] == []
+
+        again = await ExcelImporterService(savepoint_session).import_file(path)
+        assert again["duplicate"] is True
+        assert again["imported"] == 5
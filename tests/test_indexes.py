@@ -0,0 +1,185 @@
+import hashlib
+import time
+
+import pytest
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+from app.models.equipment import Equipment
+from app.models.user import User
+from app.repositories.equipment import EquipmentRepository
+from app.repositories.reports import ReportsRepository
+from app.repositories.sessions import SessionsRepository
+from app.utils.text_filters import contains
+
+ROWS = 1_000_000
+# Диапазон, который не пересекается с номерами из остальных тестов
+BASE = 10_000_000
+
+
+async def _explain(session: AsyncSession, sql: str, **params) -> str:
+    res = await session.execute(text("EXPLAIN " + sql), params)
+    return "\n".join(r[0] for r in res.fetchall())
+
+
+def _sql(session: AsyncSession, stmt) -> str:
+    return str(stmt.compile(dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+class TestDocNumbersIndexes:
+    """На 1M строк в doc_numbers запросы резервирования и TTL должны идти по частичным индексам."""
+
+    async def test_hot_path_queries_use_partial_indexes(self, db_session: AsyncSession, default_equipment):
+        user = User(username="index_bench_user")
+        db_session.add(user)
+        await db_session.flush()
+        sess = await SessionsRepository(db_session).create(
+            user_id=user.id, equipment_id=default_equipment.id, requested_count=10, ttl_seconds=60
+        )
+
+        # 98% assigned, 1% reserved (половина просрочена), 1% released
+        await db_session.execute(
+            text(
+                """
+                INSERT INTO doc_numbers (numeric, is_golden, status, expires_at, released_at)
+                SELECT :base + i,
+                       (:base + i) % 100 = 0,
+                       (CASE WHEN i % 100 = 1 THEN 'reserved'
+                             WHEN i % 100 = 2 THEN 'released'
+                             ELSE 'assigned' END)::docnum_status,
+                       CASE WHEN i % 100 = 1 THEN now() + ((i % 2) * 2 - 1) * interval '1 hour' END,
+                       CASE WHEN i % 100 = 2 THEN now() END
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"base": BASE, "rows": ROWS},
+        )
+        await db_session.execute(
+            text(
+                "UPDATE doc_numbers SET session_id = :sid "
+                "WHERE numeric BETWEEN :base + 1 AND :base + 1000 AND status = 'reserved'"
+            ),
+            {"sid": sess.id, "base": BASE},
+        )
+        await db_session.execute(text("ANALYZE doc_numbers"))
+
+        plans = {
+            "ix_doc_numbers_reserved_expires_at": await _explain(
+                db_session,
+                "UPDATE doc_numbers SET status = 'released' WHERE status = 'reserved' AND expires_at < now()",
+            ),
+            "ix_doc_numbers_reserved_session": await _explain(
+                db_session,
+                "SELECT * FROM doc_numbers WHERE session_id = :sid AND status = 'reserved' ORDER BY numeric",
+                sid=sess.id,
+            ),
+            "ix_doc_numbers_released_numeric": await _explain(
+                db_session,
+                "SELECT * FROM doc_numbers WHERE status = 'released' AND numeric >= :base "
+                "ORDER BY numeric LIMIT 200 FOR UPDATE SKIP LOCKED",
+                base=BASE,
+            ),
+            "ix_doc_numbers_golden_numeric": await _explain(
+                db_session,
+                "SELECT g FROM generate_series(:base, :base + 100000, 100) AS g "
+                "WHERE NOT EXISTS (SELECT 1 FROM doc_numbers d WHERE d.is_golden AND d.numeric = g "
+                "AND d.status IN ('assigned', 'reserved')) LIMIT 10",
+                base=BASE,
+            ),
+        }
+
+        for index_name, plan in plans.items():
+            print(f"\n--- {index_name}\n{plan}")
+            assert index_name in plan, f"{index_name} не используется:\n{plan}"
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+class TestTrigramIndexes:
+    """На 1M документов поиск подстроки ILIKE '%q%' должен идти по триграммным индексам, а не полным сканом."""
+
+    EQUIPMENT_ROWS = 100_000
+    USER_ROWS = 500
+    DOC_BASE = 20_000_000
+
+    async def test_substring_filters_use_trigram_indexes(self, db_session: AsyncSession):
+        await db_session.execute(
+            text(
+                """
+                INSERT INTO users (username, last_name)
+                SELECT 'trgm_user_' || md5(i::text), 'Фамилия ' || i
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"rows": self.USER_ROWS},
+        )
+        await db_session.execute(
+            text(
+                """
+                INSERT INTO equipment (eq_type, factory_no, order_no, label, station_no, station_object)
+                SELECT 'Турбина', 'TRGM-' || md5(i::text), 'З-' || left(md5('o' || i), 10),
+                       'LBL-' || left(md5('l' || i), 12), (i % 12)::text, 'Станция ' || (i % 300)
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"rows": self.EQUIPMENT_ROWS},
+        )
+        await db_session.execute(
+            text(
+                """
+                INSERT INTO documents (numeric, reg_date, doc_name, note, equipment_id, user_id)
+                SELECT :base + i, now() - i * interval '1 minute', 'Документ ' || md5(i::text), '',
+                       (SELECT min(id) FROM equipment WHERE factory_no LIKE 'TRGM-%') + i % :eq_rows,
+                       (SELECT min(id) FROM users WHERE username LIKE 'trgm_user_%') + i % :user_rows
+                FROM generate_series(1, :rows) AS i
+                """
+            ),
+            {"base": self.DOC_BASE, "rows": ROWS, "eq_rows": self.EQUIPMENT_ROWS, "user_rows": self.USER_ROWS},
+        )
+        for table in ("users", "equipment", "documents"):
+            await db_session.execute(text(f"ANALYZE {table}"))
+
+        # редкие подстроки из середины значений — типичный ввод в поиске
+        doc_q = hashlib.md5(b"654321").hexdigest()[4:12]
+        label_q = hashlib.md5(b"l4242").hexdigest()[2:9]
+        user_q = hashlib.md5(b"321").hexdigest()[6:14]
+
+        reports = ReportsRepository(db_session)
+        report_filters = dict(station_objects=None, station_no=None, label=None, factory_no=None, order_no=None,
+                              date_from=None, date_to=None, doc_name=None, username=None)
+        equipment_q = select(Equipment.id).where(or_(
+            contains(Equipment.station_object, label_q), contains(Equipment.station_no, label_q),
+            contains(Equipment.label, label_q), contains(Equipment.factory_no, label_q),
+            contains(Equipment.order_no, label_q),
+        ))
+        plans = {
+            "ix_documents_doc_name_trgm": _sql(db_session, reports._extended_stmt(**{**report_filters, "doc_name": doc_q})),
+            "ix_users_username_trgm": _sql(db_session, select(User.id).where(contains(User.username, user_q))),
+            "ix_equipment_label_trgm": _sql(db_session, equipment_q),
+            "ix_equipment_order_no_trgm": _sql(db_session, equipment_q),
+        }
+        plans["ix_documents_doc_name_trgm (suggest)"] = _sql(
+            db_session,
+            select(func.distinct(Document.doc_name)).where(contains(Document.doc_name, doc_q))
+            .order_by(Document.doc_name.asc()).limit(20),
+        )
+
+        for index_name, sql in plans.items():
+            plan = await _explain(db_session, sql)
+            print(f"\n--- {index_name}\n{plan}")
+            assert index_name.split()[0] in plan, f"{index_name} не используется:\n{plan}"
+
+        started = time.perf_counter()
+        rows = await reports.fetch_extended(**{**report_filters, "doc_name": doc_q})
+        report_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        found = await EquipmentRepository(db_session).search(q=label_q)
+        search_ms = (time.perf_counter() - started) * 1000
+        print(f"\nfetch_extended(doc_name): {report_ms:.1f} ms, {len(rows)} rows; "
+              f"equipment search(q): {search_ms:.1f} ms, {len(found)} rows")
+
+        assert any(r.numeric == self.DOC_BASE + 654321 for r in rows)
+        assert found
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.models.equipment import Equipment
+from app.models.user import User
+from scripts.migrate_data import (
+    load_documents,
+    load_documents_vectorized,
+    normalize_factory_no,
+    normalize_factory_series,
+    normalize_int_series,
+    normalize_int_str,
+)
+
+RAW_VALUES = ["", None, "nan", "None", "123", "00123", "12.0", "12.5", "abc45x", " 7 ", "0", "00000", "-"]
+
+
+def test_series_normalization_matches_row_wise():
+    values = pd.Series(RAW_VALUES, dtype=object)
+
+    assert normalize_int_series(values).tolist() == [normalize_int_str(v) for v in RAW_VALUES]
+    assert normalize_factory_series(values).tolist() == [normalize_factory_no(v) for v in RAW_VALUES]
+
+
+@pytest.fixture
+def journal(tmp_path) -> str:
+    path = tmp_path / "documents.xlsx"
+    pd.DataFrame({
+        "Обозначение": ["УТЗ-960001", "УТЗ-960002", "УТЗ-960003", "УТЗ-960004", "без номера"],
+        "Наименование": ["Паспорт", "", "Схема", "Чертеж", "Пропуск"],
+        "Примечание": ["", "прим", "", " ", ""],
+        "Зав.№ турбины первичного применения": ["", "00000", "31337.0", "777", "31337"],
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def _load(sync_url: str, loader, path: str) -> list[tuple]:
+    """Прогоняет загрузчик в транзакции, которая откатывается, и возвращает загруженные документы."""
+    engine = create_engine(sync_url)
+    try:
+        with engine.connect() as conn:
+            trans = conn.begin()
+            # commit() загрузчика освобождает savepoint, внешняя транзакция откатывается целиком
+            with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+                session.add_all([
+                    User(username="migration_user"),
+                    Equipment(eq_type="Турбина", factory_no="31337"),
+                ])
+                if session.execute(select(Equipment.id).where(Equipment.factory_no == "00000")).first() is None:
+                    session.add(Equipment(eq_type="Вспомогательное оборудование", factory_no="00000"))
+                session.commit()
+
+                loader(session, path)
+
+                rows = session.execute(
+                    select(Document.numeric, Document.doc_name, Document.note, Equipment.factory_no)
+                    .join(Equipment, Equipment.id == Document.equipment_id)
+                    .where(Document.numeric.between(960001, 960999))
+                    .order_by(Document.numeric)
+                ).all()
+            trans.rollback()
+    finally:
+        engine.dispose()
+    return [tuple(row) for row in rows]
+
+
+def test_vectorized_documents_match_row_wise(test_db_url: str, journal: str):
+    sync_url = test_db_url.replace("postgresql+asyncpg", "postgresql+psycopg2")
+
+    row_wise = _load(sync_url, load_documents, journal)
+    vectorized = _load(sync_url, load_documents_vectorized, journal)
+
+    assert row_wise == [
+        (960001, "Паспорт", None, "00000"),
+        (960002, "DOC-960002", "прим", "00000"),
+        (960003, "Схема", None, "31337"),
+        (960004, "Чертеж", None, "00000"),
+    ]
+    assert vectorized == row_wise
@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import delete, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.models.doc_number import DocNumber, DocNumStatus
+from app.models.session import Session
+from app.models.user import User
+from app.repositories import counter as counter_module
+from app.repositories.counter import _CLAIM_BLOCK_SQL, CounterRepository
+from app.repositories.doc_numbers import DocNumbersRepository
+from app.repositories.sessions import SessionsRepository
+from app.services import number_blocks as number_blocks_module
+from app.services import reservation as reservation_module
+from app.services.number_blocks import NumberBlockPool
+from app.services.reservation import ReservationService
+from app.utils.numbering import MAX_GOLDEN, is_golden
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def count_statements(session: AsyncSession):
+    """Считает SQL-запросы, отправленные в БД внутри блока. SAVEPOINT'ы savepoint_session не считаются."""
+    counter = {"n": 0}
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")):
+            counter["n"] += 1
+
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", _on_execute)
+
+
+async def _make_user(session: AsyncSession, username: str) -> User:
+    user = User(username=username)
+    session.add(user)
+    await session.flush()
+    return user
+
+
+@pytest.fixture
+def claim_in_savepoint(savepoint_session: AsyncSession, monkeypatch):
+    """
+    claim_counter_block коммитит сдвиг счетчика на собственном соединении. В тестах тот же UPDATE
+    выполняется в savepoint транзакции savepoint_session и откатывается вместе с ней.
+    """
+    async def _claim_counter_block(bind, count: int, skip_golden: bool = True) -> list[int]:
+        conn = await savepoint_session.connection()
+        params = {"n": count, "skip_golden": skip_golden}
+        async with conn.begin_nested():
+            await conn.execute(text(
+                "INSERT INTO doc_counter (id, base_start, next_normal_start) VALUES (1, 1, 1) "
+                "ON CONFLICT (id) DO NOTHING"
+            ))
+            start, end = (await conn.execute(_CLAIM_BLOCK_SQL, params)).one()
+        return [n for n in range(start, end) if not (skip_golden and is_golden(n))]
+
+    monkeypatch.setattr(counter_module, "claim_counter_block", _claim_counter_block)
+    monkeypatch.setattr(number_blocks_module, "claim_counter_block", _claim_counter_block)
+
+
+BENCHMARK_COUNTS = (1, 100, 1000)
+# Задержка на 1000 номеров не должна превышать задержку на один номер больше чем во столько раз
+# (пол в 5 мс сглаживает шум, когда один номер резервируется за доли миллисекунды)
+FLATNESS_FACTOR = 10
+LATENCY_FLOOR = 0.005
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+class TestReservationBenchmark:
+    """
+    Бенчмарк резервирования на 1, 100 и 1000 номеров: число запросов не должно расти вместе с количеством,
+    а задержка — оставаться почти постоянной. Задержки попадают в отчет pytest (record_property) и в лог.
+    """
+
+    @staticmethod
+    def _check_flat(latencies: dict[int, float], record_property, scenario: str) -> None:
+        for count, elapsed in latencies.items():
+            record_property(f"{scenario}_{count}_ms", round(elapsed * 1000, 1))
+            logger.info("reserve %s count=%d: %.1f ms", scenario, count, elapsed * 1000)
+        baseline = max(latencies[BENCHMARK_COUNTS[0]], LATENCY_FLOOR)
+        assert latencies[BENCHMARK_COUNTS[-1]] <= baseline * FLATNESS_FACTOR, latencies
+
+    async def test_reserve_from_released_pool(self, savepoint_session: AsyncSession, default_equipment,
+                                              record_property):
+        user = await _make_user(savepoint_session, "bench_released")
+        svc = ReservationService(savepoint_session)
+        await svc.start_session(user_id=user.id, equipment_id=default_equipment.id, requested_count=1, ttl_seconds=60)
+        latencies: dict[int, float] = {}
+
+        for count in BENCHMARK_COUNTS:
+            # Наполняем пул released: резервируем новые номера и отменяем сессию
+            first_id, _ = await svc.start_session(
+                user_id=user.id, equipment_id=default_equipment.id, requested_count=count, ttl_seconds=60
+            )
+            await svc.cancel_session(first_id)
+
+            with count_statements(savepoint_session) as stmts:
+                started = time.perf_counter()
+                _, numbers = await svc.start_session(
+                    user_id=user.id, equipment_id=default_equipment.id, requested_count=count, ttl_seconds=60
+                )
+                latencies[count] = time.perf_counter() - started
+
+            assert len(numbers) == count
+            assert len(set(numbers)) == count
+            assert all(n % 100 != 0 for n in numbers)
+            # Пул released обслуживается одним UPDATE независимо от размера
+            assert stmts["n"] <= 8
+
+        self._check_flat(latencies, record_property, "released")
+
+    async def test_reserve_new_numbers(self, savepoint_session: AsyncSession, default_equipment, record_property):
+        user = await _make_user(savepoint_session, "bench_new")
+        svc = ReservationService(savepoint_session)
+        await svc.start_session(user_id=user.id, equipment_id=default_equipment.id, requested_count=1, ttl_seconds=60)
+        latencies: dict[int, float] = {}
+
+        for count in BENCHMARK_COUNTS:
+            with count_statements(savepoint_session) as stmts:
+                started = time.perf_counter()
+                _, numbers = await svc.start_session(
+                    user_id=user.id, equipment_id=default_equipment.id, requested_count=count, ttl_seconds=60
+                )
+                latencies[count] = time.perf_counter() - started
+
+            assert len(set(numbers)) == count
+            # Новые номера вставляются одним INSERT ... ON CONFLICT DO NOTHING
+            assert stmts["n"] <= 10
+
+        self._check_flat(latencies, record_property, "new")
+
+
+@pytest.mark.asyncio
+class TestCreateAndReserveNew:
+    async def test_conflict_is_skipped_without_losing_transaction(
+            self, savepoint_session: AsyncSession, default_equipment
+    ):
+        user = await _make_user(savepoint_session, "conflict_user")
+        counter = await CounterRepository(savepoint_session).get_for_update()
+        start = max(counter.next_normal_start, counter.base_start)
+        taken = start if start % 100 else start + 1
+        savepoint_session.add(DocNumber(numeric=taken, is_golden=False, status=DocNumStatus.assigned))
+        await savepoint_session.commit()
+
+        svc = ReservationService(savepoint_session)
+        session_id, numbers = await svc.start_session(
+            user_id=user.id, equipment_id=default_equipment.id, requested_count=5, ttl_seconds=60
+        )
+
+        assert len(numbers) == 5
+        assert taken not in numbers
+        assert await SessionsRepository(savepoint_session).get(session_id) is not None
+
+
+@pytest.mark.asyncio
+class TestGoldenAllocator:
+    async def test_find_free_golden_skips_occupied(self, db_session: AsyncSession):
+        repo = DocNumbersRepository(db_session)
+        start = 900000
+        db_session.add(DocNumber(numeric=start, is_golden=True, status=DocNumStatus.assigned))
+        db_session.add(DocNumber(numeric=start + 200, is_golden=True, status=DocNumStatus.released))
+        await db_session.flush()
+
+        free = await repo.find_free_golden(start, 3, stop=MAX_GOLDEN)
+
+        assert free == [start + 100, start + 200, start + 300]
+
+    async def test_find_free_golden_respects_upper_bound(self, db_session: AsyncSession):
+        repo = DocNumbersRepository(db_session)
+        free = await repo.find_free_golden(MAX_GOLDEN - 100, 10, stop=MAX_GOLDEN)
+        assert free == [MAX_GOLDEN - 100, MAX_GOLDEN]
+
+
+    async def test_concurrent_golden_reservations_get_full_quantity(
+            self, test_db_url: str, default_equipment, monkeypatch
+    ):
+        # гонка возможна только без блокировки счетчика; обе транзакции должны коммититься по-настоящему
+        monkeypatch.setattr(settings, "number_allocator", "claim")
+        engine = create_async_engine(test_db_url)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        # обе транзакции выбирают кандидатов до того, как любая из них их зарезервирует
+        both_found = asyncio.Barrier(2)
+        usernames = ["golden_race_1", "golden_race_2"]
+        session_ids: list[str] = []
+
+        async def reserve(username: str) -> list[int]:
+            async with session_factory() as session:
+                user = await _make_user(session, username)
+                svc = ReservationService(session)
+                find_free_golden = svc.numbers_repo.find_free_golden
+                first_call = True
+
+                async def find_together(*args, **kwargs):
+                    nonlocal first_call
+                    found = await find_free_golden(*args, **kwargs)
+                    if first_call:
+                        first_call = False
+                        await asyncio.wait_for(both_found.wait(), timeout=10)
+                    return found
+
+                monkeypatch.setattr(svc.numbers_repo, "find_free_golden", find_together)
+                session_id, numbers = await svc.reserve_golden_numbers(
+                    user_id=user.id, equipment_id=default_equipment.id, quantity=3, ttl_seconds=60
+                )
+                session_ids.append(session_id)
+                return numbers
+
+        try:
+            first, second = await asyncio.gather(*(reserve(name) for name in usernames))
+        finally:
+            async with session_factory() as session:
+                await session.execute(delete(DocNumber).where(DocNumber.session_id.in_(session_ids)))
+                await session.execute(delete(Session).where(Session.id.in_(session_ids)))
+                await session.execute(delete(User).where(User.username.in_(usernames)))
+                await session.commit()
+            await engine.dispose()
+
+        assert len(first) == len(second) == 3
+        assert not set(first) & set(second)
+        assert all(n % 100 == 0 for n in first + second)
+
+
+@pytest.mark.asyncio
+class TestLazyExpiry:
+    async def test_candidate_query_treats_expired_reservations_as_free(self, db_session: AsyncSession):
+        repo = DocNumbersRepository(db_session)
+        start = 950001
+        expired_at = datetime.utcnow() - timedelta(minutes=5)
+        for num in range(start, start + 3):
+            db_session.add(DocNumber(numeric=num, is_golden=False, status=DocNumStatus.reserved, expires_at=expired_at))
+        await db_session.flush()
+
+        assert await repo.fetch_released_for_update(base_start=start, limit=3) == []
+        picked = await repo.fetch_released_for_update(base_start=start, limit=3, include_expired=True)
+        assert [n.numeric for n in picked] == [start, start + 1, start + 2]
+
+    async def test_lazy_mode_skips_global_release_expired(
+            self, savepoint_session: AsyncSession, default_equipment, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "reservation_lazy_expiry", True)
+        user = await _make_user(savepoint_session, "lazy_user")
+        svc = ReservationService(savepoint_session)
+        called = False
+
+        async def _release_expired(*args, **kwargs):
+            nonlocal called
+            called = True
+            return 0
+
+        monkeypatch.setattr(svc.numbers_repo, "release_expired", _release_expired)
+        _, numbers = await svc.start_session(
+            user_id=user.id, equipment_id=default_equipment.id, requested_count=3, ttl_seconds=60
+        )
+
+        assert len(numbers) == 3
+        assert called is False
+
+
+@pytest.mark.asyncio
+class TestClaimAllocator:
+    async def test_claim_block_returns_disjoint_ranges_without_golden(
+            self, savepoint_session: AsyncSession, claim_in_savepoint
+    ):
+        repo = CounterRepository(savepoint_session)
+
+        first = await repo.claim_block(150)
+        second = await repo.claim_block(150)
+
+        assert len(first) == len(second) == 150
+        assert not set(first) & set(second)
+        assert all(n % 100 != 0 for n in first + second)
+        assert min(second) > max(first)
+
+    async def test_start_session_in_claim_mode(
+            self, savepoint_session: AsyncSession, claim_in_savepoint, default_equipment, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "number_allocator", "claim")
+        user = await _make_user(savepoint_session, "claim_user")
+        svc = ReservationService(savepoint_session)
+
+        _, numbers = await svc.start_session(
+            user_id=user.id, equipment_id=default_equipment.id, requested_count=250, ttl_seconds=60
+        )
+
+        assert len(set(numbers)) == 250
+        assert all(n % 100 != 0 for n in numbers)
+
+
+@pytest.mark.asyncio
+class TestNumberBlockPool:
+    async def test_take_serves_from_block_and_returns_unused_to_released_pool(
+            self, savepoint_session: AsyncSession, claim_in_savepoint
+    ):
+        pool = NumberBlockPool(block_size=20, low_water=0, ttl_seconds=60)
+
+        taken = await pool.take(savepoint_session.bind, 5)
+        assert len(taken) == 5
+        assert len(pool) == 15
+        assert all(n % 100 != 0 for n in taken)
+
+        unused = list(pool._numbers)
+        assert await pool.release_unused() == 15
+        assert len(pool) == 0
+
+        released = await savepoint_session.execute(
+            select(DocNumber.numeric).where(DocNumber.numeric.in_(unused), DocNumber.status == DocNumStatus.released)
+        )
+        assert sorted(released.scalars().all()) == sorted(unused)
+
+    async def test_release_stale_keeps_fresh_blocks(self, monkeypatch):
+        pool = NumberBlockPool(block_size=5, low_water=0, ttl_seconds=60)
+        now = datetime.utcnow()
+        pool._numbers = deque([(n, now - timedelta(seconds=120)) for n in range(1, 4)] +
+                              [(n, now - timedelta(seconds=10)) for n in range(4, 7)])
+        released: list[int] = []
+
+        async def _release(numbers):
+            released.extend(numbers)
+            return len(numbers)
+
+        monkeypatch.setattr(pool, "_release", _release)
+
+        assert await pool.release_stale(now) == 3
+        assert released == [1, 2, 3]
+        assert [n for n, _ in pool._numbers] == [4, 5, 6]
+        assert await pool.release_stale(now) == 0
+
+    async def test_numbers_return_to_block_when_reservation_fails(
+            self, db_session: AsyncSession, default_equipment, monkeypatch
+    ):
+        pool = NumberBlockPool(block_size=10, low_water=0, ttl_seconds=60)
+
+        async def _claim_counter_block(bind, count, skip_golden=True):
+            return list(range(980001, 980001 + count))
+
+        async def _no_released(*args, **kwargs):
+            return []
+
+        async def _failing_commit():
+            raise RuntimeError("сбой коммита")
+
+        monkeypatch.setattr(number_blocks_module, "claim_counter_block", _claim_counter_block)
+        monkeypatch.setattr(reservation_module, "number_blocks", pool)
+        monkeypatch.setattr(settings, "number_allocator", "block")
+        user = await _make_user(db_session, "block_rollback_user")
+        svc = ReservationService(db_session)
+        monkeypatch.setattr(svc.numbers_repo, "fetch_released_for_update", _no_released)
+        monkeypatch.setattr(db_session, "commit", _failing_commit)
+
+        with pytest.raises(RuntimeError):
+            await svc.start_session(
+                user_id=user.id, equipment_id=default_equipment.id, requested_count=3, ttl_seconds=60
+            )
+
+        assert len(pool) == 10
+        assert [n for n, _ in pool._numbers][:3] == [980001, 980002, 980003]